@@ -102,15 +102,16 @@ print(biomasa_df_processed.columns)
 for col in biomasa_df_processed.select_dtypes(include=['number']):
     biomasa_df[col] = biomasa_df[col].round(2)
 
-# Descargar el dataframe filtrado
-biomasa_df_processed .to_excel('biomasa_filtrado.xlsx', index=False)
+# Guardar el dataframe filtrado en el almacén columnar (ver almacen.py)
+from almacen import guardar_tabla, cargar_tabla
+guardar_tabla(biomasa_df_processed, 'biomasa_filtrado')
 
 biomasa_filtrado = biomasa_df_processed .drop(columns=['Gasifying agent '])
 
-# Descargar el dataframe filtrado
-biomasa_filtrado.to_excel('biomasa_filtrado_numerico.xlsx', index=False)
+# Guardar el dataframe filtrado numérico
+guardar_tabla(biomasa_filtrado, 'biomasa_filtrado_numerico')
 
-df = pd.read_excel('biomasa_filtrado_numerico.xlsx')
+df = cargar_tabla('biomasa_filtrado_numerico')
 X = df.drop('End-use application', axis=1)  # Todas las columnas excepto la clase
 y = df['End-use application']  # Variable objetivo
 
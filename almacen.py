@@ -0,0 +1,161 @@
+"""
+Almacén columnar de tablas (biomasas, conjuntos de entrenamiento).
+
+Cada tabla es un directorio con un .npy por columna, que se abre
+memory-mapped, y un esquema.json con nombre, tipo y sha256 de cada columna.
+Excel queda solo como fuente de importación:
+
+    python almacen.py biomass_compositions.xlsx biomass_compositions
+    python almacen.py "DATABASE BIOMASA RESIDUAL FINAL COPIA.xlsm" base_literatura --hoja "Literature review"
+    python almacen.py --verificar biomass_compositions
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from calculos import COLUMNAS_NORM
+
+ARCHIVO_ESQUEMA = "esquema.json"
+VERSION_ESQUEMA = 1
+
+# Columnas obligatorias de la tabla de biomasas y su tipo
+ESQUEMA_BIOMASA = {"Biomass residue": "str", **{col: "float64" for col in COLUMNAS_NORM}}
+
+
+def _sha256(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(1 << 20), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def _tipo(serie):
+    if pd.api.types.is_bool_dtype(serie):
+        return "bool"
+    if pd.api.types.is_integer_dtype(serie) and not serie.isna().any():
+        return "int64"
+    if pd.api.types.is_numeric_dtype(serie):
+        return "float64"
+    return "str"
+
+
+def validar(tipos, esquema):
+    faltantes = [col for col in esquema if col not in tipos]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {faltantes}")
+    for col, tipo in esquema.items():
+        # Un entero se acepta donde se espera un float
+        if tipos[col] != tipo and not (tipo == "float64" and tipos[col] == "int64"):
+            raise ValueError(f"La columna {col!r} es {tipos[col]}, se esperaba {tipo}")
+
+
+def guardar_tabla(df, directorio, esquema=None, origen=None):
+    """Escribe `df` columna a columna; el esquema.json se escribe al final."""
+    os.makedirs(directorio, exist_ok=True)
+    tipos = {str(col): _tipo(df[col]) for col in df.columns}
+    if esquema is not None:
+        validar(tipos, esquema)
+
+    columnas = []
+    for i, col in enumerate(df.columns):
+        tipo = tipos[str(col)]
+        if tipo == "str":
+            valores = df[col].fillna("").astype(str).to_numpy(dtype=str)
+        else:
+            valores = df[col].to_numpy(dtype=tipo)
+        archivo = archivo_columna(i)
+        np.save(os.path.join(directorio, archivo), np.ascontiguousarray(valores))
+        columnas.append({"nombre": str(col), "archivo": archivo, "dtype": tipo})
+    return escribir_esquema(directorio, columnas, len(df), origen)
+
+
+def archivo_columna(i):
+    return f"col_{i:03d}.npy"
+
+
+def escribir_esquema(directorio, columnas, n_filas, origen=None):
+    """Esquema de columnas ya escritas en `directorio` (lista de dicts nombre/archivo/dtype)."""
+    columnas = [{**col, "sha256": _sha256(os.path.join(directorio, col["archivo"]))} for col in columnas]
+    meta = {
+        "version": VERSION_ESQUEMA,
+        "n_filas": n_filas,
+        "columnas": columnas,
+        "origen": None if origen is None else os.path.basename(origen),
+        "origen_sha256": None if origen is None else _sha256(origen),
+    }
+    with open(os.path.join(directorio, ARCHIVO_ESQUEMA), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def leer_esquema(directorio):
+    with open(os.path.join(directorio, ARCHIVO_ESQUEMA), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != VERSION_ESQUEMA:
+        raise ValueError(f"Versión de esquema no soportada: {meta.get('version')}")
+    return meta
+
+
+def cargar_columnas(directorio, columnas=None, esquema=None, verificar_hashes=False):
+    """
+    Dict nombre -> array memory-mapped (sin copia) de las columnas pedidas.
+    Con `verificar_hashes` también se comprueba el sha256 de cada columna
+    (lee los archivos completos).
+    """
+    meta = leer_esquema(directorio)
+    if esquema is not None:
+        validar({c["nombre"]: c["dtype"] for c in meta["columnas"]}, esquema)
+    resultado = {}
+    for col in meta["columnas"]:
+        if columnas is not None and col["nombre"] not in columnas:
+            continue
+        ruta = os.path.join(directorio, col["archivo"])
+        if verificar_hashes and _sha256(ruta) != col["sha256"]:
+            raise ValueError(f"El sha256 de {col['archivo']} ({col['nombre']!r}) no coincide con el esquema")
+        valores = np.load(ruta, mmap_mode="r", allow_pickle=False)
+        if len(valores) != meta["n_filas"]:
+            raise ValueError(f"La columna {col['nombre']!r} no tiene {meta['n_filas']} filas")
+        resultado[col["nombre"]] = valores
+    return resultado
+
+
+def cargar_tabla(directorio, columnas=None, esquema=None, verificar_hashes=False):
+    datos = cargar_columnas(directorio, columnas, esquema, verificar_hashes)
+    return pd.DataFrame({col: np.asarray(valores) for col, valores in datos.items()})
+
+
+def convertir_excel(ruta_excel, directorio, hoja=0, esquema=None):
+    df = pd.read_excel(ruta_excel, sheet_name=hoja)
+    return guardar_tabla(df, directorio, esquema, origen=ruta_excel)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte una hoja de Excel al almacén columnar o verifica una tabla")
+    parser.add_argument("rutas", nargs="+", help="EXCEL DIRECTORIO para importar, o DIRECTORIO con --verificar")
+    parser.add_argument("--hoja", default=0, help="Nombre o índice de la hoja")
+    parser.add_argument("--biomasa", action="store_true", help="Validar contra el esquema de biomasas")
+    parser.add_argument("--verificar", action="store_true", help="Cargar la tabla y comprobar el sha256 de cada columna")
+    args = parser.parse_args(argv)
+    esquema = ESQUEMA_BIOMASA if args.biomasa else None
+
+    if args.verificar:
+        datos = cargar_columnas(args.rutas[0], esquema=esquema, verificar_hashes=True)
+        print(f"{args.rutas[0]}: {len(datos)} columnas verificadas")
+        return
+
+    if len(args.rutas) != 2:
+        parser.error("se esperan EXCEL y DIRECTORIO")
+    args.excel, args.directorio = args.rutas
+    hoja = int(args.hoja) if str(args.hoja).isdigit() else args.hoja
+    meta = convertir_excel(args.excel, args.directorio, hoja, esquema)
+    print(f"{args.excel} -> {args.directorio}: {meta['n_filas']} filas, {len(meta['columnas'])} columnas")
+
+
+if __name__ == "__main__":
+    main()
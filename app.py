@@ -1,8 +1,24 @@
+# El cronómetro va antes que cualquier otra importación (ver perfil.py)
+from perfil import ACTIVO as PERFIL_ACTIVO, Cronometro
+cronometro = Cronometro()
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
-import matplotlib.pyplot as plt
+
+# matplotlib (gráficos) y joblib/sklearn (pickle) se importan solo en las
+# secciones que los usan, no al arrancar
+from cache import cargar_predictor, cargar_biomasa, cargar_ensamble, cargar_dominio
+from calculos import (
+    rebalance_composition, calcular_fracciones_agente, calcular_lhv,
+    calcular_energia_syngas, sugerir_aplicacion, COLUMNAS_MODELO,
+)
+from barrido import barrer, cerrar_figura, figura_mapas
+from tabla_precalculada import cargar_tabla
+from incertidumbre import predecir_bandas, tabla_bandas
+from regiones import IndiceRegiones, intervalos
+from prediccion_lote import predecir_lote
+from graficos import pasteles_biomasa
 
 # --- Estilos personalizados ---
 st.markdown("""
@@ -12,81 +28,32 @@ st.markdown("""
     }
     </style>
 """, unsafe_allow_html=True)
+cronometro.marca("importaciones")
 
-# Cargar el modelo entrenado
+# Cargar el modelo entrenado (una sola instancia compartida por el proceso);
+# se usa el artefacto regressor_bootstrap/ (o el árbol compilado .npz) si está al día con el pickle
 try:
-    modelo = joblib.load("regressor_bootstrap.pkl")
+    modelo = cargar_predictor("regressor_bootstrap.pkl")
 except FileNotFoundError:
     st.error("Model file 'regressor_bootstrap.pkl' not found. Please upload the model file.")
     st.stop()
 
-# Cargar archivo de composición de biomasa
-df_biomasa = pd.read_excel("biomass_compositions.xlsx")
-
-# --- Funciones ---
-def rebalance_composition(biomass_data, new_moisture):
-    old_moisture = biomass_data.get('Moisture content', 0)
-    dry_basis_factor = (100 - old_moisture)
-
-    # Rebalanceo de análisis próximo
-    vm_dry = biomass_data['VM [%] _norm'] * dry_basis_factor / 100
-    fc_dry = biomass_data['FC [%] _norm'] * dry_basis_factor / 100
-    ash_dry = biomass_data['Ash [%] _norm'] * dry_basis_factor / 100
-    proximate_dry_sum = vm_dry + fc_dry + ash_dry
-    scale_factor_proximate = (100 - new_moisture) / proximate_dry_sum
-    biomass_data['VM [%] _norm'] = vm_dry * scale_factor_proximate
-    biomass_data['FC [%] _norm'] = fc_dry * scale_factor_proximate
-    biomass_data['Ash [%] _norm'] = ash_dry * scale_factor_proximate
-
-    # Rebalanceo de análisis último
-    c_dry = biomass_data['C_norm'] * dry_basis_factor / 100
-    h_dry = biomass_data['H_norm'] * dry_basis_factor / 100
-    o_dry = biomass_data['O_norm'] * dry_basis_factor / 100
-    n_dry = biomass_data['N_norm'] * dry_basis_factor / 100
-    s_dry = biomass_data['S_norm'] * dry_basis_factor / 100
-    cl_dry = biomass_data['Cl_norm'] * dry_basis_factor / 100
-    ultimate_dry_sum = c_dry + h_dry + o_dry + n_dry + s_dry + cl_dry + ash_dry
-    scale_factor_ultimate = (100 - new_moisture) / ultimate_dry_sum
-    biomass_data['C_norm'] = c_dry * scale_factor_ultimate
-    biomass_data['H_norm'] = h_dry * scale_factor_ultimate
-    biomass_data['O_norm'] = o_dry * scale_factor_ultimate
-    biomass_data['N_norm'] = n_dry * scale_factor_ultimate
-    biomass_data['S_norm'] = s_dry * scale_factor_ultimate
-    biomass_data['Cl_norm'] = cl_dry * scale_factor_ultimate
-
-    biomass_data['Intrinsic moisture content [%]'] = new_moisture
-    return biomass_data
-
-def calcular_fracciones_agente(tipo, ratio):
-    if tipo == "Aire":
-        return {"O2": ratio / (1 + 3.76), "N2": ratio * 3.76 / (1 + 3.76), "H2O": 0}
-    elif tipo == "Oxígeno":
-        return {"O2": ratio, "N2": 0, "H2O": 0}
-    elif tipo == "Vapor de agua":
-        return {"O2": 0, "N2": 0, "H2O": ratio}
-    elif tipo == "Mezcla O2 + H2O":
-        return {"O2": ratio * 0.5, "N2": 0, "H2O": ratio * 0.5}
-    else:
-        return {"O2": 0, "N2": 0, "H2O": 0}
-
-def calcular_lhv(C, H, O, N, S, ash, moisture):
-    lhv = 0.349 * C + 1.178 * H + 0.1005 * S - 0.1034 * O - 0.0151 * N - 0.0211 * ash - 0.244 * moisture
-    return max(3.5, lhv)
-
-def sugerir_aplicacion(h2_co, fuel_energy):
-    if fuel_energy >= 3.0 and h2_co < 1.8:
-        return "Heat/Power"
-    elif 3.0 <= fuel_energy <= 18 and 1.8 <= h2_co < 3:
-        return "Methanol/Biofuels"
-    elif 3.0 <= fuel_energy <= 18 and h2_co >= 3:
-        return "Methane"
-    else:
-        return "Other"
+# Ensamble bootstrap para bandas de incertidumbre (opcional, lo genera entrenamiento.py)
+ensamble = cargar_ensamble()
+# Dominio de entrenamiento para avisar de extrapolaciones (opcional, ver dominio.py)
+dominio = cargar_dominio()
+cronometro.marca("modelo")
+
+# Cargar composición de biomasa: almacén columnar importado de biomass_compositions.xlsx
+# (o el Excel si el almacén no está al día); se vuelve a leer solo si cambia
+df_biomasa = cargar_biomasa()
+cronometro.marca("biomasa")
 
 # --- Interfaz ---
 st.title("Predictor para la composición del gas de síntesis")
 
 st.sidebar.header("Parámetros de entrada")
+modo = st.sidebar.radio("Modo:", ["Predicción puntual", "Mapa de operación", "Comparar biomasas"])
 biomasa_nombres = df_biomasa["Biomass residue"].tolist()
 biomasa_seleccionada = st.sidebar.selectbox("Selecciona tipo de biomasa:", biomasa_nombres)
 fila_biomasa_original = df_biomasa[df_biomasa["Biomass residue"] == biomasa_seleccionada].iloc[0].copy()
@@ -106,6 +73,12 @@ elif tipo_agente == "Oxígeno":
 else:
     ratio_agente = st.sidebar.selectbox("SBR (vapor/biomasa)", sbr_range)
 
+if modo == "Predicción puntual":
+    mostrar_bandas = st.sidebar.checkbox(
+        "Bandas de incertidumbre", disabled=ensamble is None,
+        help="Percentiles 5–95 de un ensamble bootstrap de árboles"
+             if ensamble is not None else "Requiere regressor_bootstrap_ensamble.npz (entrenamiento.py --ensamble)")
+
 fila_biomasa = rebalance_composition(fila_biomasa_original.copy(), humedad_objetivo)
 fracciones_agente = calcular_fracciones_agente(tipo_agente, ratio_agente)
 
@@ -130,40 +103,77 @@ with col2:
     )
     st.metric("Poder calorífico biomasa (LHV) [MJ/kg]", f"{lhv_mostrado:.2f}")
 
-# Gráfico de pastel
+# Gráficos de pastel (PNG en caché por biomasa y humedad, ver graficos.py)
+png_ultimo, png_proximo = pasteles_biomasa(fila_biomasa, humedad_objetivo)
 st.subheader("Distribución composición análisis último (wt%) - Biomasa")
-composicion_biomasa = {
-    "C": fila_biomasa["C_norm"],
-    "H": fila_biomasa["H_norm"],
-    "O": fila_biomasa["O_norm"],
-    "N + S + Cl": fila_biomasa["N_norm"] + fila_biomasa["S_norm"] + fila_biomasa["Cl_norm"],
-    "Cenizas": fila_biomasa["Ash [%] _norm"],
-    "Humedad": humedad_objetivo
-}
-labels = list(composicion_biomasa.keys())
-sizes = list(composicion_biomasa.values())
-fig1, ax1 = plt.subplots()
-ax1.pie(sizes, labels=labels, autopct='%1.1f%%')
-ax1.axis('equal')
-st.pyplot(fig1)
-
-# Gráfico de pastel
+st.image(png_ultimo)
 st.subheader("Distribución composición análisis próximo (wt%) - Biomasa")
-composicion_biomasa = {
-    "FC": fila_biomasa["FC [%] _norm"],
-    "VM": fila_biomasa["VM [%] _norm"],
-    "Cenizas": fila_biomasa["Ash [%] _norm"],
-    "Humedad": humedad_objetivo
-}
-labels = list(composicion_biomasa.keys())
-sizes = list(composicion_biomasa.values())
-fig1, ax1 = plt.subplots()
-ax1.pie(sizes, labels=labels, autopct='%1.1f%%')
-ax1.axis('equal')
-st.pyplot(fig1)
+st.image(png_proximo)
+
+# Mapa de operación: una sola predicción en lote sobre toda la malla
+if modo == "Mapa de operación":
+    st.subheader("Mapa de operación syngas")
+    etiqueta_ratio = "SBR (vapor/biomasa)" if tipo_agente == "Vapor de agua" else "ABR (agente/biomasa)"
+    ejes = st.radio("Ejes del mapa:", ["Temperatura × ratio", "Temperatura × humedad"], horizontal=True)
+    resultado = barrer(modelo, df_biomasa[df_biomasa["Biomass residue"] == biomasa_seleccionada], tipo_agente)
+    if ejes == "Temperatura × ratio":
+        indice = int(np.abs(resultado["humedades"] - humedad_objetivo).argmin())
+        st.caption(f"Humedad fija: {resultado['humedades'][indice]:.1f} %")
+        fig_mapa = figura_mapas(resultado, "ratio", indice, etiqueta_ratio)
+    else:
+        indice = int(np.abs(resultado["ratios"] - ratio_agente).argmin())
+        st.caption(f"{etiqueta_ratio} fijo: {resultado['ratios'][indice]:.2f}")
+        fig_mapa = figura_mapas(resultado, "humedad", indice, etiqueta_ratio)
+    st.pyplot(fig_mapa)
+    cerrar_figura(fig_mapa)
+
+    # Regiones exactas del árbol: intervalos de temperatura y ratio a la humedad elegida
+    with st.expander("Regiones exactas del modelo"):
+        variable_region = st.selectbox("Variable:", ["CH4", "H2", "CO", "H2/CO", "Energía"])
+        minimo_region = st.number_input(f"{variable_region} mínimo:", value=0.0)
+        try:
+            indice_regiones = IndiceRegiones.desde_arbol(modelo)
+        except ValueError as e:
+            st.info(str(e))
+        else:
+            regiones_operacion = intervalos(
+                indice_regiones, df_biomasa[df_biomasa["Biomass residue"] == biomasa_seleccionada], tipo_agente,
+                {variable_region: (minimo_region, None)}, humedad=humedad_objetivo)
+            st.caption(f"{len(regiones_operacion)} regiones con {variable_region} ≥ {minimo_region} "
+                       f"(humedad {humedad_objetivo:.1f} %); cada intervalo es (mín, máx]")
+            st.dataframe(regiones_operacion.drop(columns=["Humedad min", "Humedad max"]).round(3), hide_index=True)
+
+# Comparación: todas las biomasas en las condiciones actuales con una sola predicción
+elif modo == "Comparar biomasas":
+    st.subheader("Comparación de biomasas")
+    escenarios = pd.DataFrame({
+        "biomasa": biomasa_nombres,
+        "humedad": humedad_objetivo,
+        "temperatura": float(temperatura),
+        "agente": tipo_agente,
+        "ratio": float(ratio_agente),
+    })
+    comparacion = predecir_lote(escenarios, modelo, df_biomasa, dominio=dominio)
+    columnas = ["biomasa", "H2_dry", "CO_dry", "CH4_dry", "H2 to CO ratio",
+                "Fuel gas energy content [MJ/Nm3]", "End-use application"]
+    nombres = ["Biomasa", "H₂ (mol%)", "CO (mol%)", "CH₄ (mol%)", "Relación H₂/CO",
+               "Contenido energético [MJ/Nm³]", "Aplicación"]
+    if dominio is not None:
+        columnas.append("Out of domain")
+        nombres.append("Fuera de dominio")
+    comparacion = comparacion[columnas]
+    comparacion.columns = nombres
+    orden = st.selectbox("Ordenar por:", comparacion.columns[1:], index=4)
+    comparacion = comparacion.sort_values(orden, ascending=orden == "Aplicación", kind="stable")
+    st.caption(f"{len(comparacion)} biomasas a {temperatura} °C, humedad {humedad_objetivo:.1f} %, "
+               f"{tipo_agente} (ratio {ratio_agente}); haz clic en una columna para reordenar")
+    if dominio is not None and comparacion["Fuera de dominio"].any():
+        st.warning(f"{int(comparacion['Fuera de dominio'].sum())} biomasas quedan fuera del dominio de "
+                   "entrenamiento en estas condiciones: sus predicciones son extrapolaciones.")
+    st.dataframe(comparacion.round(2), hide_index=True)
 
 # Botón de predicción
-if st.button("Predecir composición syngas"):
+elif st.button("Predecir composición syngas"):
     entrada = pd.DataFrame([{
         'Gasification temperature [°C]': temperatura,
         'O2_gasifying agent (wt/wt)': fracciones_agente["O2"],
@@ -183,8 +193,14 @@ if st.button("Predecir composición syngas"):
     }])
 
     try:
-        prediccion = modelo.predict(entrada)
-        h2, co, ch4 = prediccion[0]
+        # Búsqueda en la tabla precalculada si existe y está al día; si no, el modelo
+        prediccion = None
+        tabla = cargar_tabla()
+        if tabla is not None:
+            prediccion = tabla.buscar(biomasa_seleccionada, humedad_objetivo, temperatura, tipo_agente, ratio_agente)
+        if prediccion is None:
+            prediccion = modelo.predict(entrada)[0]
+        h2, co, ch4 = prediccion
 
         st.success("Predicción completada")
         col1, col2, col3 = st.columns(3)
@@ -194,7 +210,7 @@ if st.button("Predecir composición syngas"):
 
       
         h2_co = h2 / co if co != 0 else 0
-        fuel_energy = (0.126 * h2) + (0.108 * co) + (0.358 * ch4) + ((h2 / 100) * 1.2 * 2.45)
+        fuel_energy = calcular_energia_syngas(h2, co, ch4)
         aplicacion = sugerir_aplicacion(h2_co, fuel_energy)
 
         st.subheader("Predicción aplicación final syngas")
@@ -203,5 +219,30 @@ if st.button("Predecir composición syngas"):
         with col2: st.metric("Contenido energético syngas [MJ/Nm³]", f"{fuel_energy:.2f}")
         st.info(f"**Aplicación uso final syngas:** {aplicacion}")
 
+        if dominio is not None:
+            fila_modelo = entrada[COLUMNAS_MODELO].to_numpy(dtype=float)
+            marcas = dominio.evaluar(fila_modelo)
+            if marcas["fuera_dominio"][0]:
+                motivos = dominio.motivos(fila_modelo[0])
+                detalle = "; ".join(motivos) if motivos else (
+                    f"combinación alejada de los datos de entrenamiento "
+                    f"(distancia relativa {marcas['distancia'][0]:.2f})")
+                st.warning(f"Escenario fuera del dominio de entrenamiento, la predicción es una "
+                           f"extrapolación: {detalle}")
+
+        if mostrar_bandas:
+            # Todos los árboles del ensamble en una sola pasada
+            bandas, probabilidades = predecir_bandas(ensamble, entrada)
+            st.subheader(f"Incertidumbre (ensamble de {ensamble.n_arboles} árboles)")
+            st.dataframe(tabla_bandas(bandas).round(2))
+            st.caption("Probabilidad de cada aplicación según los miembros del ensamble")
+            st.bar_chart(pd.Series({app: float(p[0]) for app, p in probabilidades.items()}, name="Probabilidad"))
+
     except Exception as e:
         st.error(f"Error en la predicción: {str(e)}")
+
+# Modo perfil: tiempos de esta ejecución (la primera tras arrancar es la fría)
+cronometro.marca("render")
+if PERFIL_ACTIVO:
+    with st.sidebar.expander("Perfil de arranque (ms)"):
+        st.table(pd.Series(cronometro.informe(), name="ms"))
@@ -0,0 +1,238 @@
+"""
+Árbol de decisión compilado a arrays planos de NumPy.
+
+Convierte el `tree_` de un DecisionTreeRegressor ajustado (feature, threshold,
+hijos y valores) en un predictor que no necesita importar sklearn. El recorrido
+es vectorizado: todas las filas bajan un nivel por iteración. Igual que sklearn,
+las entradas se convierten a float32 antes de comparar con los umbrales, por lo
+que las predicciones coinciden bit a bit.
+
+`BosqueCompilado` hace lo mismo con varios árboles a la vez (random forest,
+extra-trees o un ensamble bootstrap).
+
+Exportar el modelo de la app:
+    python arbol_compilado.py regressor_bootstrap.pkl regressor_bootstrap.npz
+"""
+
+import hashlib
+import sys
+
+import numpy as np
+
+RUTA_ARBOL = "regressor_bootstrap.npz"
+HOJA = -2  # valor de sklearn para `feature` en las hojas
+BLOQUE = 8192
+
+
+class ArbolCompilado:
+    def __init__(self, feature, threshold, left, right, value, feature_names=None, origen_sha256="",
+                 max_depth=None):
+        # Sin copia si ya tienen el tipo (arrays memory-mapped del artefacto)
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.intp)
+        self.right = np.ascontiguousarray(right, dtype=np.intp)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.feature_names = None if feature_names is None else [str(n) for n in feature_names]
+        self.origen_sha256 = str(origen_sha256)
+        # El manifiesto del artefacto ya trae la profundidad: solo se calcula si falta
+        self.max_depth = self._profundidad() if max_depth is None else int(max_depth)
+        self.n_features = (len(self.feature_names) if self.feature_names is not None
+                           else int(self.feature.max()) + 1)
+        self.n_outputs = self.value.shape[1]
+        # Arrays derivados para el recorrido: se construyen al primer uso
+        self._recorrido = None
+        self._lista = None
+
+    def _profundidad(self):
+        """Niveles del árbol (o del árbol más profundo), recorridos nivel a nivel."""
+        internos = self.feature != HOJA
+        es_hijo = np.zeros(len(self.feature), dtype=bool)
+        es_hijo[self.left[internos]] = True
+        es_hijo[self.right[internos]] = True
+        nivel = np.flatnonzero(~es_hijo)  # raíces
+        profundidad = -1
+        while len(nivel):
+            profundidad += 1
+            nivel = nivel[internos[nivel]]
+            nivel = np.concatenate([self.left[nivel], self.right[nivel]])
+        return max(profundidad, 0)
+
+    def _arrays_recorrido(self):
+        if self._recorrido is None:
+            # Las hojas apuntan a sí mismas: así el recorrido no necesita máscaras
+            hojas = self.feature == HOJA
+            indices = np.arange(len(self.feature))
+            feature = np.where(hojas, 0, self.feature)
+            left = np.where(hojas, indices, self.left)
+            right = np.where(hojas, indices, self.right)
+            # hijos[2 * nodo + ir_izquierda]: derecho en posición par, izquierdo en impar
+            hijos = np.stack([right, left], axis=1).ravel()
+            self._recorrido = (feature, left, right, hijos)
+        return self._recorrido
+
+    def _listas(self):
+        # Copias como listas de Python para el camino de una sola fila
+        if self._lista is None:
+            feature, left, right, _ = self._arrays_recorrido()
+            self._lista = (feature.tolist(), self.threshold.tolist(), left.tolist(), right.tolist())
+        return self._lista
+
+    @classmethod
+    def desde_sklearn(cls, modelo, origen_sha256=""):
+        arbol = modelo.tree_
+        # value tiene forma (n_nodos, n_salidas, 1) en regresión
+        value = arbol.value.reshape(arbol.node_count, -1)
+        return cls(arbol.feature, arbol.threshold, arbol.children_left, arbol.children_right,
+                   value, getattr(modelo, "feature_names_in_", None), origen_sha256)
+
+    def _validar(self, X):
+        if hasattr(X, "columns") and self.feature_names is not None:
+            if [str(c) for c in X.columns] != self.feature_names:
+                raise ValueError("Las columnas de entrada no coinciden con las del modelo")
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Se esperaban {self.n_features} columnas, se recibió forma {X.shape}")
+        if np.isnan(X).any():
+            raise ValueError("La entrada contiene NaN")
+        return X
+
+    def hojas(self, X):
+        """Índice de la hoja alcanzada por cada fila."""
+        X = self._validar(X)
+        feature, _, _, hijos = self._arrays_recorrido()
+        resultado = np.empty(len(X), dtype=np.intp)
+        # Por bloques para que los índices intermedios quepan en caché
+        for inicio in range(0, len(X), BLOQUE):
+            plano = X[inicio:inicio + BLOQUE].ravel()
+            base = np.arange(len(plano) // self.n_features) * self.n_features
+            nodo = np.zeros(len(base), dtype=np.intp)
+            for _ in range(self.max_depth):
+                ir_izquierda = plano[base + feature[nodo]] <= self.threshold[nodo]
+                nodo = hijos[2 * nodo + ir_izquierda]
+            resultado[inicio:inicio + len(base)] = nodo
+        return resultado
+
+    def predict(self, X):
+        return self.value[self.hojas(X)]
+
+    def predecir_fila(self, x):
+        """Camino rápido para una sola fila, sin operaciones vectorizadas."""
+        x = np.asarray(x, dtype=np.float32).tolist()
+        feature, threshold, left, right = self._listas()
+        nodo = 0
+        for _ in range(self.max_depth):
+            nodo = left[nodo] if x[feature[nodo]] <= threshold[nodo] else right[nodo]
+        return self.value[nodo]
+
+    def guardar(self, ruta):
+        with open(ruta, "wb") as f:
+            np.savez(
+                f, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                value=self.value, feature_names=np.array(self.feature_names or [], dtype=str),
+                origen_sha256=np.array(self.origen_sha256),
+            )
+
+    @classmethod
+    def cargar(cls, ruta):
+        # allow_pickle=False: el archivo solo puede contener arrays numéricos y de texto
+        with np.load(ruta, allow_pickle=False) as datos:
+            nombres = datos["feature_names"].tolist() or None
+            return cls(datos["feature"], datos["threshold"], datos["left"], datos["right"],
+                       datos["value"], nombres, datos["origen_sha256"].item())
+
+
+class BosqueCompilado(ArbolCompilado):
+    """
+    Varios árboles (un bosque o un ensamble bootstrap) en un solo juego de
+    arrays: los hijos usan índices globales y `raices` marca el primer nodo de
+    cada árbol. Todas las filas recorren todos los árboles a la vez.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, raices, feature_names=None, origen_sha256="",
+                 max_depth=None):
+        self.raices = np.ascontiguousarray(raices, dtype=np.intp)
+        super().__init__(feature, threshold, left, right, value, feature_names, origen_sha256, max_depth)
+
+    @property
+    def n_arboles(self):
+        return len(self.raices)
+
+    @classmethod
+    def desde_sklearn(cls, modelos, origen_sha256=""):
+        """`modelos` es una lista de DecisionTreeRegressor o un bosque ajustado (estimators_)."""
+        nombres = getattr(modelos, "feature_names_in_", None)
+        modelos = getattr(modelos, "estimators_", modelos)
+        arboles = [ArbolCompilado.desde_sklearn(m) for m in modelos]
+        return cls.desde_arboles(arboles, nombres if nombres is not None else arboles[0].feature_names,
+                                 origen_sha256)
+
+    @classmethod
+    def desde_arboles(cls, arboles, feature_names=None, origen_sha256=""):
+        tamanos = [len(a.feature) for a in arboles]
+        raices = np.concatenate([[0], np.cumsum(tamanos)[:-1]])
+        # Los hijos de las hojas (-1) se dejan igual; el resto se desplaza al índice global
+        left = np.concatenate([np.where(a.feature == HOJA, a.left, a.left + r) for a, r in zip(arboles, raices)])
+        right = np.concatenate([np.where(a.feature == HOJA, a.right, a.right + r) for a, r in zip(arboles, raices)])
+        return cls(np.concatenate([a.feature for a in arboles]), np.concatenate([a.threshold for a in arboles]),
+                   left, right, np.concatenate([a.value for a in arboles]), raices, feature_names, origen_sha256)
+
+    def hojas(self, X):
+        """Índice global de la hoja alcanzada por cada fila en cada árbol: forma (n_arboles, n_filas)."""
+        X = self._validar(X)
+        feature, _, _, hijos = self._arrays_recorrido()
+        resultado = np.empty((self.n_arboles, len(X)), dtype=np.intp)
+        filas_bloque = max(1, BLOQUE * 8 // self.n_arboles)
+        for inicio in range(0, len(X), filas_bloque):
+            plano = X[inicio:inicio + filas_bloque].ravel()
+            base = np.arange(len(plano) // self.n_features) * self.n_features
+            nodo = np.repeat(self.raices[:, None], len(base), axis=1)
+            for _ in range(self.max_depth):
+                ir_izquierda = plano[base + feature[nodo]] <= self.threshold[nodo]
+                nodo = hijos[2 * nodo + ir_izquierda]
+            resultado[:, inicio:inicio + len(base)] = nodo
+        return resultado
+
+    def predict_miembros(self, X):
+        """Predicción de cada árbol: forma (n_arboles, n_filas, n_salidas)."""
+        return self.value[self.hojas(X)]
+
+    def predict(self, X):
+        # Suma árbol a árbol y división final, como RandomForestRegressor
+        return self.predict_miembros(X).sum(axis=0) / self.n_arboles
+
+    def predecir_fila(self, x):
+        return self.predict(np.asarray(x, dtype=np.float32).reshape(1, -1))[0]
+
+    def guardar(self, ruta):
+        with open(ruta, "wb") as f:
+            np.savez(
+                f, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                value=self.value, raices=self.raices,
+                feature_names=np.array(self.feature_names or [], dtype=str),
+                origen_sha256=np.array(self.origen_sha256),
+            )
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta, allow_pickle=False) as datos:
+            nombres = datos["feature_names"].tolist() or None
+            return cls(datos["feature"], datos["threshold"], datos["left"], datos["right"],
+                       datos["value"], datos["raices"], nombres, datos["origen_sha256"].item())
+
+
+def exportar(ruta_modelo, ruta_salida=RUTA_ARBOL):
+    import joblib
+
+    with open(ruta_modelo, "rb") as f:
+        origen_sha256 = hashlib.sha256(f.read()).hexdigest()
+    arbol = ArbolCompilado.desde_sklearn(joblib.load(ruta_modelo), origen_sha256)
+    arbol.guardar(ruta_salida)
+    return arbol
+
+
+if __name__ == "__main__":
+    origen = sys.argv[1] if len(sys.argv) > 1 else "regressor_bootstrap.pkl"
+    destino = sys.argv[2] if len(sys.argv) > 2 else RUTA_ARBOL
+    arbol = exportar(origen, destino)
+    print(f"{origen} -> {destino}: {len(arbol.feature)} nodos, profundidad {arbol.max_depth}")
@@ -0,0 +1,209 @@
+"""
+Artefacto del modelo: arrays del árbol memory-mapped más un manifiesto.
+
+El modelo compilado (ArbolCompilado o BosqueCompilado) se guarda como un
+directorio con un .npy por array (feature, threshold, hijos, valores y, en
+bosques, raíces) y un manifiesto.json que se escribe al final con:
+versión del formato, nombres de las columnas de entrada en el orden en que
+la app construye `entrada`, objetivos, métricas de entrenamiento, sha256 de
+los datos, pickle de origen y versión de sklearn, y forma, tipo y sha256 de
+cada array.
+
+Al cargar no se ejecuta código (allow_pickle=False) y los arrays se abren con
+mmap_mode="r", sin copiarlos. Antes de devolver el modelo se comprueba el
+manifiesto (versión, columnas, objetivos, forma y tipo de cada array) y que el
+árbol sea coherente (hijos e índices de columna dentro de rango).
+
+    python artefacto.py regressor_bootstrap.pkl regressor_bootstrap
+    python artefacto.py regressor_bootstrap.pkl regressor_bootstrap --resumen artefactos_entrenamiento/resumen.json
+    python artefacto.py --verificar regressor_bootstrap
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from arbol_compilado import HOJA, ArbolCompilado, BosqueCompilado
+from calculos import COLUMNAS_MODELO, OBJETIVOS
+
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+VERSION_ARTEFACTO = 1
+DIRECTORIO_ARTEFACTO = "regressor_bootstrap"
+RUTA_ARTEFACTO = os.path.join(DIRECTORIO_ARTEFACTO, ARCHIVO_MANIFIESTO)
+ARRAYS = {"feature": "int64", "threshold": "float64", "left": "int64", "right": "int64", "value": "float64"}
+
+
+def _sha256(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(1 << 20), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def _directorio(ruta):
+    # Se acepta el directorio o la ruta del manifiesto (la que usa la caché)
+    return os.path.dirname(ruta) if os.path.basename(ruta) == ARCHIVO_MANIFIESTO else ruta
+
+
+def guardar_artefacto(modelo, directorio, metricas=None, datos_sha256=None, origen=None, sklearn_version=None):
+    """Escribe los arrays de `modelo` (compilado) y después el manifiesto."""
+    os.makedirs(directorio, exist_ok=True)
+    arrays = {nombre: getattr(modelo, nombre).astype(dtype, copy=False) for nombre, dtype in ARRAYS.items()}
+    if isinstance(modelo, BosqueCompilado):
+        arrays["raices"] = modelo.raices.astype("int64", copy=False)
+
+    descripcion = {}
+    for nombre, valores in arrays.items():
+        archivo = f"{nombre}.npy"
+        np.save(os.path.join(directorio, archivo), np.ascontiguousarray(valores))
+        descripcion[nombre] = {"archivo": archivo, "dtype": str(valores.dtype), "forma": list(valores.shape),
+                               "sha256": _sha256(os.path.join(directorio, archivo))}
+
+    manifiesto = {
+        "version": VERSION_ARTEFACTO,
+        "tipo": "bosque" if isinstance(modelo, BosqueCompilado) else "arbol",
+        "columnas": list(modelo.feature_names or COLUMNAS_MODELO),
+        "objetivos": list(OBJETIVOS),
+        "metricas": metricas,
+        "datos_sha256": datos_sha256,
+        "origen": None if origen is None else os.path.basename(origen),
+        "origen_sha256": modelo.origen_sha256 or (None if origen is None else _sha256(origen)),
+        "sklearn_version": sklearn_version,
+        "profundidad": modelo.max_depth,
+        "arrays": descripcion,
+    }
+    with open(os.path.join(directorio, ARCHIVO_MANIFIESTO), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    return manifiesto
+
+
+def leer_manifiesto(ruta):
+    with open(os.path.join(_directorio(ruta), ARCHIVO_MANIFIESTO), encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    if manifiesto.get("version") != VERSION_ARTEFACTO:
+        raise ValueError(f"Versión de artefacto no soportada: {manifiesto.get('version')}")
+    return manifiesto
+
+
+def _validar_arbol(arrays, n_columnas, n_objetivos):
+    feature, left, right, value = arrays["feature"], arrays["left"], arrays["right"], arrays["value"]
+    n_nodos = len(feature)
+    if not (len(arrays["threshold"]) == len(left) == len(right) == len(value) == n_nodos):
+        raise ValueError("Los arrays del árbol no tienen el mismo número de nodos")
+    if value.ndim != 2 or value.shape[1] != n_objetivos:
+        raise ValueError(f"Se esperaban {n_objetivos} objetivos, los valores tienen forma {value.shape}")
+    internos = feature != HOJA
+    if ((feature[internos] < 0) | (feature[internos] >= n_columnas)).any():
+        raise ValueError("Índice de columna fuera de rango")
+    # En sklearn los hijos siempre tienen índice mayor que el padre: así no hay ciclos
+    nodos = np.flatnonzero(internos)
+    for hijos in (left[internos], right[internos]):
+        if ((hijos <= nodos) | (hijos >= n_nodos)).any():
+            raise ValueError("Índice de hijo fuera de rango")
+    if "raices" in arrays:
+        raices = arrays["raices"]
+        if len(raices) == 0 or raices[0] != 0 or (np.diff(raices) <= 0).any() or raices[-1] >= n_nodos:
+            raise ValueError("Raíces del bosque no válidas")
+
+
+def cargar_artefacto(ruta, columnas=COLUMNAS_MODELO, objetivos=OBJETIVOS, verificar_hashes=False):
+    """
+    Modelo compilado con sus arrays memory-mapped (sin copia). `ruta` es el
+    directorio o su manifiesto. Con `verificar_hashes` también se comprueba el
+    sha256 de cada array (lee los archivos completos) y la profundidad.
+    """
+    directorio = _directorio(ruta)
+    manifiesto = leer_manifiesto(directorio)
+    if columnas is not None and manifiesto["columnas"] != list(columnas):
+        raise ValueError("Las columnas del artefacto no coinciden con las que construye la app")
+    if objetivos is not None and manifiesto["objetivos"] != list(objetivos):
+        raise ValueError(f"Objetivos del artefacto inesperados: {manifiesto['objetivos']}")
+
+    esperados = dict(ARRAYS, **({"raices": "int64"} if manifiesto["tipo"] == "bosque" else {}))
+    if set(manifiesto["arrays"]) != set(esperados):
+        raise ValueError(f"Arrays del artefacto inesperados: {sorted(manifiesto['arrays'])}")
+    arrays = {}
+    for nombre, info in manifiesto["arrays"].items():
+        ruta_array = os.path.join(directorio, info["archivo"])
+        if verificar_hashes and _sha256(ruta_array) != info["sha256"]:
+            raise ValueError(f"El sha256 de {info['archivo']} no coincide con el manifiesto")
+        valores = np.load(ruta_array, mmap_mode="r", allow_pickle=False)
+        if str(valores.dtype) != esperados[nombre] or list(valores.shape) != info["forma"]:
+            raise ValueError(f"{info['archivo']} no tiene la forma o el tipo del manifiesto")
+        arrays[nombre] = valores
+    _validar_arbol(arrays, len(manifiesto["columnas"]), len(manifiesto["objetivos"]))
+    profundidad = manifiesto.get("profundidad")
+    if not isinstance(profundidad, int) or not 0 <= profundidad < len(arrays["feature"]):
+        raise ValueError(f"Profundidad del artefacto no válida: {profundidad}")
+
+    parametros = [arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"], arrays["value"]]
+    # La profundidad sale del manifiesto: la carga no recorre los nodos
+    if manifiesto["tipo"] == "bosque":
+        modelo = BosqueCompilado(*parametros, arrays["raices"], manifiesto["columnas"], manifiesto["origen_sha256"],
+                                 profundidad)
+    else:
+        modelo = ArbolCompilado(*parametros, manifiesto["columnas"], manifiesto["origen_sha256"],
+                                profundidad)
+    if verificar_hashes and modelo._profundidad() != profundidad:
+        raise ValueError("La profundidad del manifiesto no coincide con el árbol")
+    modelo.manifiesto = manifiesto
+    return modelo
+
+
+def exportar(ruta_modelo, directorio=DIRECTORIO_ARTEFACTO, metricas=None, datos_sha256=None):
+    """Convierte un pickle de sklearn (árbol o bosque) en artefacto."""
+    import warnings
+
+    import joblib
+    import sklearn
+
+    with warnings.catch_warnings(record=True) as avisos:
+        warnings.simplefilter("always")
+        modelo = joblib.load(ruta_modelo)
+    # sklearn avisa si el pickle es de otra versión; si no, es la instalada
+    version = next((str(a.message.original_sklearn_version) for a in avisos
+                    if hasattr(a.message, "original_sklearn_version")), sklearn.__version__)
+    origen_sha256 = _sha256(ruta_modelo)
+    if hasattr(modelo, "estimators_"):
+        compilado = BosqueCompilado.desde_sklearn(modelo, origen_sha256)
+    else:
+        compilado = ArbolCompilado.desde_sklearn(modelo, origen_sha256)
+    return guardar_artefacto(compilado, directorio, metricas, datos_sha256, ruta_modelo, version)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta o verifica el artefacto del modelo")
+    parser.add_argument("rutas", nargs="+", help="MODELO.pkl DIRECTORIO para exportar, o DIRECTORIO con --verificar")
+    parser.add_argument("--resumen", default=None, help="resumen.json de entrenamiento.py con las métricas")
+    parser.add_argument("--verificar", action="store_true", help="Cargar y comprobar también los sha256")
+    args = parser.parse_args(argv)
+
+    if args.verificar:
+        inicio = time.perf_counter()
+        modelo = cargar_artefacto(args.rutas[0], verificar_hashes=True)
+        print(f"{args.rutas[0]}: {len(modelo.feature)} nodos, cargado y verificado en "
+              f"{(time.perf_counter() - inicio) * 1000:.1f} ms")
+        return
+
+    ruta_modelo, directorio = (args.rutas + [DIRECTORIO_ARTEFACTO])[:2]
+    metricas = datos_sha256 = None
+    if args.resumen:
+        with open(args.resumen, encoding="utf-8") as f:
+            resumen = json.load(f)
+        exportado = resumen.get("exportado") or {}
+        for candidato in resumen.get("candidatos", []):
+            if (candidato["estrategia"], candidato["familia"]) == (exportado.get("estrategia"), exportado.get("familia")):
+                metricas = candidato["metricas"]
+        datos_sha256 = resumen.get("datos_sha256")
+    manifiesto = exportar(ruta_modelo, directorio, metricas, datos_sha256)
+    print(f"{ruta_modelo} -> {directorio}: {manifiesto['arrays']['feature']['forma'][0]} nodos "
+          f"({manifiesto['tipo']}, sklearn {manifiesto['sklearn_version']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Barrido del mapa de operación: evalúa el modelo sobre una malla densa de
+temperatura × ratio del agente × humedad para una biomasa, con una sola
+llamada a `predict`.
+"""
+
+import numpy as np
+
+from calculos import (
+    COLUMNAS_MODELO, calcular_energia_syngas, fracciones_agente_columnas,
+    lhv_columnas, rebalance_tabla, relacion_h2_co_columnas,
+)
+from prediccion_lote import predecir_matriz
+
+# Mismos límites que los selectores de la app, con más resolución
+RANGOS_RATIO = {
+    "Aire": (0.14, 0.30),
+    "Oxígeno": (0.2, 0.4),
+    "Vapor de agua": (0.84, 1.1),
+}
+TEMPERATURAS = np.arange(600, 1001, 10, dtype=np.float64)
+HUMEDADES = np.arange(0.0, 30.01, 1.0)
+N_RATIOS = 33
+
+
+def ratios_agente(agente, n=N_RATIOS):
+    inicio, fin = RANGOS_RATIO[agente]
+    return np.linspace(inicio, fin, n)
+
+
+def malla_entrada(fila_biomasa, agente, temperaturas, ratios, humedades):
+    """
+    Matriz de entrada (n_humedad * n_temperatura * n_ratio, 15) en orden C,
+    es decir, el resultado de `predict` se puede reordenar a
+    (n_humedad, n_temperatura, n_ratio).
+    """
+    forma = (len(humedades), len(temperaturas), len(ratios))
+    # Composición rebalanceada: una fila por humedad
+    comp = rebalance_tabla(fila_biomasa, humedades)
+    comp = {col: valores[0][:, None, None] for col, valores in comp.items()}
+    lhv = lhv_columnas(comp['C_norm'], comp['H_norm'], comp['O_norm'], comp['N_norm'],
+                       comp['S_norm'], comp['Ash [%] _norm'], np.asarray(humedades)[:, None, None])
+    fracciones = fracciones_agente_columnas(agente, np.asarray(ratios)[None, None, :])
+
+    columnas = {
+        'Gasification temperature [°C]': np.asarray(temperaturas, dtype=np.float64)[None, :, None],
+        'O2_gasifying agent (wt/wt)': fracciones["O2"],
+        'N2_gasifying agent (wt/wt)': fracciones["N2"],
+        'Steam_gasifying agent (wt/wt)': fracciones["H2O"],
+        'Biomass Energy Content (LHV) [MJ/kg]': lhv,
+        **comp,
+    }
+    X = np.empty(forma + (len(COLUMNAS_MODELO),), dtype=np.float64)
+    for j, col in enumerate(COLUMNAS_MODELO):
+        X[..., j] = columnas[col]
+    return X.reshape(-1, len(COLUMNAS_MODELO))
+
+
+def barrer(modelo, fila_biomasa, agente, temperaturas=TEMPERATURAS, ratios=None, humedades=HUMEDADES):
+    """
+    `fila_biomasa` es un DataFrame de una fila de la tabla de biomasas.
+    Devuelve un dict de arrays (n_humedad, n_temperatura, n_ratio) con
+    H2, CO, CH4, la relación H2/CO y la energía del syngas, más los ejes.
+    """
+    ratios = ratios_agente(agente) if ratios is None else np.asarray(ratios, dtype=np.float64)
+    forma = (len(humedades), len(temperaturas), len(ratios))
+    prediccion = predecir_matriz(modelo, malla_entrada(fila_biomasa, agente, temperaturas, ratios, humedades))
+    h2, co, ch4 = (prediccion[:, i].reshape(forma) for i in range(3))
+    return {
+        "H2": h2,
+        "CO": co,
+        "CH4": ch4,
+        "H2/CO": relacion_h2_co_columnas(h2, co),
+        "Energía": calcular_energia_syngas(h2, co, ch4),
+        "temperaturas": np.asarray(temperaturas),
+        "ratios": ratios,
+        "humedades": np.asarray(humedades),
+    }
+
+
+TITULOS_MAPA = {
+    "H2": "H₂ (mol%)",
+    "CO": "CO (mol%)",
+    "CH4": "CH₄ (mol%)",
+    "H2/CO": "Relación H₂/CO",
+    "Energía": "Energía syngas [MJ/Nm³]",
+}
+
+
+def figura_mapas(resultado, ejes, indice_fijo, etiqueta_ratio):
+    """
+    Dibuja los cinco mapas de calor en una figura.
+    `ejes` es "ratio" (temperatura × ratio a humedad fija) o
+    "humedad" (temperatura × humedad a ratio fijo).
+    """
+    import matplotlib.pyplot as plt
+
+    temperaturas = resultado["temperaturas"]
+    if ejes == "ratio":
+        eje_y, etiqueta_y = resultado["ratios"], etiqueta_ratio
+    else:
+        eje_y, etiqueta_y = resultado["humedades"], "Humedad (%)"
+
+    fig, axes = plt.subplots(2, 3, figsize=(15, 8))
+    for ax, (clave, titulo) in zip(axes.flat, TITULOS_MAPA.items()):
+        valores = resultado[clave]
+        if ejes == "ratio":
+            mapa = valores[indice_fijo].T          # (n_ratio, n_temperatura)
+        else:
+            mapa = valores[:, :, indice_fijo]      # (n_humedad, n_temperatura)
+        im = ax.pcolormesh(temperaturas, eje_y, mapa, shading="nearest", cmap="viridis")
+        fig.colorbar(im, ax=ax)
+        ax.set_title(titulo)
+        ax.set_xlabel("Temperatura (°C)")
+        ax.set_ylabel(etiqueta_y)
+    axes.flat[-1].axis("off")
+    fig.tight_layout()
+    return fig
+
+
+def cerrar_figura(fig):
+    """Libera una figura de `figura_mapas` una vez mostrada (pyplot guarda todas las abiertas)."""
+    import matplotlib.pyplot as plt
+
+    plt.close(fig)
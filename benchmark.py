@@ -0,0 +1,282 @@
+"""
+Benchmarks de los caminos críticos de preprocesamiento, inferencia y entrenamiento.
+
+Grupos:
+    calculo        rebalance, fracciones del agente, LHV y aplicación (versión
+                   escalar de la app con 1 fila y versión por columnas con
+                   1 a 10^6 filas)
+    modelo         carga del modelo (artefacto, .npz y pickle) y predicción
+                   (compilado, sklearn y predecir_lote completo), y
+                   evaluación del dominio de entrenamiento
+    entrenamiento  limpieza y etiquetado, remuestreo (SMOTE, Bootstrap, KDE) y
+                   búsqueda de hiperparámetros del árbol sobre datos sintéticos
+
+Cada resultado (mediana en ms) se añade como una línea JSON al historial junto
+con el commit, la máquina y las versiones de las librerías. Antes de guardar se
+compara con la mediana de las últimas ejecuciones de la misma máquina: un caso
+es una regresión si tarda más que la referencia por encima de su tolerancia
+(UMBRALES). Con --fallar el script termina con código 1 si hay regresiones.
+
+    python benchmark.py
+    python benchmark.py --grupos calculo modelo --tamanos 1 1000 1000000
+    python benchmark.py --grupos entrenamiento --filas 5000 --procesos 4 --fallar
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from arbol_compilado import RUTA_ARBOL, ArbolCompilado
+from artefacto import RUTA_ARTEFACTO, cargar_artefacto
+from cache import RUTA_MODELO, cargar_biomasa, cargar_predictor
+from dominio import Dominio
+from calculos import (
+    AGENTES, APLICACIONES, COLUMNAS_MODELO, OBJETIVOS,
+    aplicacion_columnas, calcular_fracciones_agente, calcular_lhv,
+    columnas_biomasa, fracciones_agente_columnas, lhv_columnas, rebalance_columnas,
+    rebalance_composition, sugerir_aplicacion,
+)
+
+GRUPOS = ("calculo", "modelo", "entrenamiento")
+TAMANOS = (1, 100, 10_000, 1_000_000)
+FILAS_ENTRENAMIENTO = 2_000
+HISTORIAL = "benchmark_historial.jsonl"
+VENTANA = 5          # ejecuciones anteriores que forman la referencia
+TIEMPO_MINIMO = 0.2  # segundos de medición por caso
+TOLERANCIA = 0.25
+# Tolerancia por prefijo del caso, para los más ruidosos
+UMBRALES = {"carga_pickle": 0.5, "remuestreo": 0.5, "busqueda": 0.5}
+
+
+def medir(funcion, tiempo_minimo=TIEMPO_MINIMO, minimo=3, maximo=10_000):
+    """Mediana y mínimo (ms) de llamadas repetidas a `funcion`, tras una de calentamiento."""
+    funcion()
+    tiempos = []
+    inicio = time.perf_counter()
+    while len(tiempos) < minimo or (time.perf_counter() - inicio < tiempo_minimo and len(tiempos) < maximo):
+        t = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t) * 1000)
+    return {"mediana_ms": statistics.median(tiempos), "min_ms": min(tiempos), "repeticiones": len(tiempos)}
+
+
+# --- Casos ---
+def _escenarios(n, df_biomasa, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "biomasa": df_biomasa["Biomass residue"].to_numpy()[rng.integers(0, len(df_biomasa), n)],
+        "humedad": rng.uniform(0, 30, n),
+        "temperatura": rng.uniform(600, 1000, n),
+        "agente": np.array(AGENTES)[rng.integers(0, len(AGENTES), n)],
+        "ratio": rng.uniform(0.1, 1.1, n),
+    })
+
+
+def casos_calculo(tamanos):
+    df_biomasa = cargar_biomasa()
+    fila = df_biomasa.iloc[0].copy()
+    rebalanceada = rebalance_composition(fila.copy(), 10.0)
+    yield "rebalance_composition", 1, lambda: rebalance_composition(fila.copy(), 10.0)
+    yield "calcular_fracciones_agente", 1, lambda: calcular_fracciones_agente("Aire", 0.22)
+    yield "calcular_lhv", 1, lambda: calcular_lhv(
+        rebalanceada["C_norm"], rebalanceada["H_norm"], rebalanceada["O_norm"], rebalanceada["N_norm"],
+        rebalanceada["S_norm"], rebalanceada["Ash [%] _norm"], 10.0)
+    yield "sugerir_aplicacion", 1, lambda: sugerir_aplicacion(1.2, 8.0)
+
+    composicion, old_moisture = columnas_biomasa(df_biomasa)
+    for n in tamanos:
+        rng = np.random.default_rng(n)
+        codigos = rng.integers(0, len(df_biomasa), n)
+        comp = {col: valores[codigos] for col, valores in composicion.items()}
+        humedad, viejas = rng.uniform(0, 30, n), old_moisture[codigos]
+        agentes, ratios = np.array(AGENTES)[rng.integers(0, len(AGENTES), n)], rng.uniform(0.1, 1.1, n)
+        fila_n = rebalance_columnas(comp, humedad, viejas)
+        h2_co, energia = rng.uniform(0, 5, n), rng.uniform(0, 20, n)
+        yield "rebalance_columnas", n, lambda: rebalance_columnas(comp, humedad, viejas)
+        yield "fracciones_agente_columnas", n, lambda: fracciones_agente_columnas(agentes, ratios)
+        yield "lhv_columnas", n, lambda: lhv_columnas(
+            fila_n["C_norm"], fila_n["H_norm"], fila_n["O_norm"], fila_n["N_norm"],
+            fila_n["S_norm"], fila_n["Ash [%] _norm"], humedad)
+        yield "aplicacion_columnas", n, lambda: aplicacion_columnas(h2_co, energia)
+
+
+def casos_modelo(tamanos):
+    import joblib
+
+    from prediccion_lote import construir_entrada, predecir_lote
+
+    df_biomasa = cargar_biomasa()
+    if os.path.exists(RUTA_ARTEFACTO):
+        yield "carga_artefacto", 1, lambda: cargar_artefacto(RUTA_ARTEFACTO)
+    if os.path.exists(RUTA_ARBOL):
+        yield "carga_npz", 1, lambda: ArbolCompilado.cargar(RUTA_ARBOL)
+    yield "carga_pickle", 1, lambda: joblib.load(RUTA_MODELO)
+
+    compilado = cargar_predictor()
+    sklearn = joblib.load(RUTA_MODELO)
+    # Dominio de una tabla del tamaño de la base de literatura
+    dominio = Dominio.construir(tabla_sintetica(FILAS_ENTRENAMIENTO)[COLUMNAS_MODELO].to_numpy())
+    X1 = construir_entrada(_escenarios(1, df_biomasa), df_biomasa)
+    yield "predecir_fila", 1, lambda: compilado.predecir_fila(X1[0])
+    for n in tamanos:
+        escenarios = _escenarios(n, df_biomasa, semilla=n)
+        X = construir_entrada(escenarios, df_biomasa)
+        X_df = pd.DataFrame(X, columns=COLUMNAS_MODELO)
+        yield "predict_compilado", n, lambda: compilado.predict(X)
+        yield "predict_sklearn", n, lambda: sklearn.predict(X_df)
+        yield "predecir_lote", n, lambda: predecir_lote(escenarios, compilado, df_biomasa)
+        yield "dominio_evaluar", n, lambda: dominio.evaluar(X)
+
+
+def tabla_sintetica(n, semilla=0):
+    """Tabla con la forma de la base de literatura ya imputada: columnas del modelo, objetivos y clase."""
+    from limpieza import CLASE
+
+    rng = np.random.default_rng(semilla)
+    datos = {col: rng.uniform(0, 1, n) for col in COLUMNAS_MODELO}
+    datos['Gasification temperature [°C]'] = rng.uniform(600, 1000, n)
+    datos.update({objetivo: rng.uniform(1, 40, n) for objetivo in OBJETIVOS})
+    # Clases desbalanceadas como en la base real
+    datos[CLASE] = rng.choice(APLICACIONES, n, p=[0.6, 0.2, 0.05, 0.15])
+    return pd.DataFrame(datos)
+
+
+def casos_entrenamiento(filas, procesos):
+    import remuestreo
+    from busqueda import buscar
+    from entrenamiento import ESTRATEGIAS, FAMILIAS, predictores_y_objetivos, remuestrear
+    from limpieza import AGENTE, CLASE, ENERGIA, H2_CO, limpiar
+
+    df = tabla_sintetica(filas)
+    rng = np.random.default_rng(filas)
+    crudo = df.drop(columns=[CLASE]).assign(**{
+        AGENTE: rng.choice(["Air ", "Steam", "Oxygen "], filas),
+        H2_CO: rng.uniform(0, 5, filas),
+        ENERGIA: rng.uniform(0, 20, filas),
+    })
+    yield "limpiar", filas, lambda: limpiar(crudo)
+
+    def remuestrear_sin_cache(estrategia):
+        # Sin la caché de ajustes, para medir también el ajuste (vecinos de SMOTE)
+        remuestreo._ajustes.clear()
+        return remuestrear(df, estrategia)
+
+    for estrategia in ESTRATEGIAS:
+        yield f"remuestreo_{estrategia}", filas, lambda: remuestrear_sin_cache(estrategia)
+    X, y = predictores_y_objetivos(df)
+    conjuntos = {"bootstrap": (X.to_numpy(), y.to_numpy())}
+    yield "busqueda_arbol", filas, lambda: buscar(conjuntos, {"arbol": FAMILIAS["arbol"]}, procesos=procesos)
+
+
+def ejecutar(grupos=GRUPOS, tamanos=TAMANOS, filas=FILAS_ENTRENAMIENTO, procesos=1, tiempo_minimo=TIEMPO_MINIMO):
+    casos = {
+        "calculo": lambda: casos_calculo(tamanos),
+        "modelo": lambda: casos_modelo(tamanos),
+        "entrenamiento": lambda: casos_entrenamiento(filas, procesos),
+    }
+    resultados = {}
+    for grupo in grupos:
+        for nombre, n, funcion in casos[grupo]():
+            clave = f"{nombre}[{n}]"
+            # La búsqueda tarda segundos: una medición basta
+            minimo = 1 if grupo == "entrenamiento" else 3
+            resultados[clave] = {"grupo": grupo, "n": n, **medir(funcion, tiempo_minimo, minimo)}
+            print(f"  {clave:<36} {resultados[clave]['mediana_ms']:12.4f} ms")
+    return resultados
+
+
+# --- Historial y regresiones ---
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def contexto():
+    import sklearn
+
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "maquina": f"{platform.node()}|{platform.machine()}|{os.cpu_count()}",
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def leer_historial(ruta):
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def tolerancia_de(clave, tolerancia=TOLERANCIA):
+    return next((t for prefijo, t in UMBRALES.items() if clave.startswith(prefijo)), tolerancia)
+
+
+def comparar(resultados, historial, maquina, ventana=VENTANA, tolerancia=TOLERANCIA):
+    """Casos más lentos que la mediana de las últimas `ventana` ejecuciones de la misma máquina."""
+    anteriores = [h for h in historial if h["contexto"]["maquina"] == maquina][-ventana:]
+    regresiones = []
+    for clave, actual in resultados.items():
+        previos = [h["resultados"][clave]["mediana_ms"] for h in anteriores if clave in h["resultados"]]
+        if not previos:
+            continue
+        referencia = statistics.median(previos)
+        limite = referencia * (1 + tolerancia_de(clave, tolerancia))
+        if actual["mediana_ms"] > limite:
+            regresiones.append({"caso": clave, "actual_ms": actual["mediana_ms"],
+                                "referencia_ms": referencia, "limite_ms": limite})
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de preprocesamiento, inferencia y entrenamiento")
+    parser.add_argument("--grupos", nargs="+", choices=GRUPOS, default=list(GRUPOS))
+    parser.add_argument("--tamanos", nargs="+", type=int, default=list(TAMANOS), help="Filas por lote")
+    parser.add_argument("--filas", type=int, default=FILAS_ENTRENAMIENTO, help="Filas de los datos sintéticos")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos de la búsqueda de hiperparámetros")
+    parser.add_argument("--tiempo", type=float, default=TIEMPO_MINIMO, help="Segundos de medición por caso")
+    parser.add_argument("--historial", default=HISTORIAL)
+    parser.add_argument("--ventana", type=int, default=VENTANA)
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--no-guardar", action="store_true", help="No añadir esta ejecución al historial")
+    parser.add_argument("--fallar", action="store_true", help="Código de salida 1 si hay regresiones")
+    args = parser.parse_args(argv)
+
+    info = contexto()
+    print(f"Benchmarks ({info['commit'] or 'sin commit'}, {info['maquina']}):")
+    resultados = ejecutar(args.grupos, args.tamanos, args.filas, args.procesos, args.tiempo)
+    regresiones = comparar(resultados, leer_historial(args.historial), info["maquina"],
+                           args.ventana, args.tolerancia)
+    if not args.no_guardar:
+        with open(args.historial, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"contexto": info, "resultados": resultados, "regresiones": regresiones},
+                               ensure_ascii=False) + "\n")
+
+    if regresiones:
+        print(f"\n{len(regresiones)} regresiones:")
+        for r in regresiones:
+            print(f"  {r['caso']:<36} {r['actual_ms']:.4f} ms (referencia {r['referencia_ms']:.4f} ms, "
+                  f"límite {r['limite_ms']:.4f} ms)")
+    else:
+        print("\nSin regresiones")
+    if regresiones and args.fallar:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Búsqueda de hiperparámetros compartida entre estrategias de remuestreo y
+familias de modelos.
+
+En lugar de un GridSearchCV por estrategia y familia, todos los ajustes
+estrategia × familia × candidato × pliegue se envían como tareas
+independientes a un mismo pool de procesos: cada proceso libre toma la siguiente tarea pendiente,
+así que ningún grupo deja núcleos ociosos mientras otro termina.
+
+Con `halving=True` se aplica successive halving: cada ronda evalúa los
+candidatos con una fracción de las filas y solo el mejor tercio pasa a la
+siguiente, que usa el triple de filas; la última ronda usa todas.
+
+Cada ajuste terminado se añade a un registro .jsonl; si la búsqueda se
+interrumpe, al repetirla se leen esos resultados y solo se ejecuta lo que falta.
+Sin halving, el resultado coincide con GridSearchCV(cv=5,
+scoring='neg_mean_squared_error').
+"""
+
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold, ParameterGrid
+
+PLIEGUES = 5
+FACTOR = 3
+MIN_FILAS_POR_PLIEGUE = 10
+
+_conjuntos = {}
+_estimadores = {}
+
+
+def _inicializar(conjuntos, estimadores):
+    # Los datos y estimadores se envían una vez por proceso, no en cada tarea
+    _conjuntos.update(conjuntos)
+    _estimadores.update(estimadores)
+
+
+def _ajustar_pliegue(estrategia, familia, parametros, n_filas, pliegue):
+    X, y, orden = _conjuntos[estrategia]
+    filas = orden[:n_filas]
+    entrenamiento, validacion = list(KFold(PLIEGUES).split(filas))[pliegue]
+    modelo = clone(_estimadores[familia]).set_params(**parametros)
+    modelo.fit(X[filas[entrenamiento]], y[filas[entrenamiento]])
+    return -mean_squared_error(y[filas[validacion]], modelo.predict(X[filas[validacion]]))
+
+
+def _clave_trabajo(grupo, parametros, n_filas, pliegue):
+    return json.dumps([*grupo, parametros, n_filas, pliegue], sort_keys=True)
+
+
+def _leer_registro(ruta):
+    resultados = {}
+    if ruta and os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    fila = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue  # última línea cortada por una interrupción
+                resultados[fila["clave"]] = fila["puntaje"]
+    return resultados
+
+
+def _rondas(n_filas, n_candidatos, halving):
+    """Número de filas de cada ronda (la última siempre usa todas)."""
+    if not halving:
+        return [n_filas]
+    minimo = PLIEGUES * MIN_FILAS_POR_PLIEGUE
+    necesarias = 1 + int(math.floor(math.log(max(n_candidatos, 1), FACTOR)))
+    posibles = 1 + int(math.floor(math.log(max(n_filas / minimo, 1), FACTOR)))
+    n_rondas = max(1, min(necesarias, posibles))
+    return [n_filas // FACTOR ** (n_rondas - 1 - i) for i in range(n_rondas - 1)] + [n_filas]
+
+
+def buscar(conjuntos, espacios, registro=None, procesos=None, halving=False, semilla=42):
+    """
+    `conjuntos` es un dict estrategia -> (X, y) con arrays de NumPy y
+    `espacios` un dict familia -> (estimador, param_grid).
+    Devuelve resultado[estrategia][familia] = {"parametros", "puntaje", "evaluados"}.
+    """
+    candidatos = {familia: list(ParameterGrid(grid)) for familia, (_, grid) in espacios.items()}
+    estimadores = {familia: estimador for familia, (estimador, _) in espacios.items()}
+    rng = np.random.default_rng(semilla)
+    datos = {}
+    for estrategia, (X, y) in conjuntos.items():
+        X, y = np.asarray(X), np.asarray(y)
+        # Sin halving se respeta el orden original (mismos pliegues que GridSearchCV);
+        # con halving las rondas parciales toman un subconjunto aleatorio fijo
+        orden = rng.permutation(len(X)) if halving else np.arange(len(X))
+        datos[estrategia] = (X, y, orden)
+
+    # Un grupo es una combinación (estrategia, familia) con su propia poda
+    grupos = [(estrategia, familia) for estrategia in datos for familia in espacios]
+    hechos = _leer_registro(registro)
+    vivos = {g: list(range(len(candidatos[g[1]]))) for g in grupos}
+    rondas = {g: _rondas(len(datos[g[0]][0]), len(candidatos[g[1]]), halving) for g in grupos}
+    puntajes = {}
+
+    archivo = open(registro, "a+", encoding="utf-8") if registro else None
+    if archivo and archivo.tell() > 0:
+        # Si la última línea quedó cortada, la siguiente escritura empieza en una línea nueva
+        archivo.seek(archivo.tell() - 1)
+        if archivo.read(1) != "\n":
+            archivo.write("\n")
+    try:
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar,
+                                 initargs=(datos, estimadores)) as pool:
+            for ronda in range(max(len(r) for r in rondas.values())):
+                # Todos los grupos que siguen activos comparten la misma cola de tareas
+                pendientes = {}
+                for grupo, indices in vivos.items():
+                    if ronda >= len(rondas[grupo]):
+                        continue
+                    n_filas = rondas[grupo][ronda]
+                    for i in indices:
+                        for pliegue in range(PLIEGUES):
+                            parametros = candidatos[grupo[1]][i]
+                            clave = _clave_trabajo(grupo, parametros, n_filas, pliegue)
+                            if clave not in hechos:
+                                futuro = pool.submit(_ajustar_pliegue, *grupo, parametros, n_filas, pliegue)
+                                pendientes[futuro] = clave
+                for futuro in as_completed(pendientes):
+                    clave = pendientes[futuro]
+                    hechos[clave] = futuro.result()
+                    if archivo:
+                        archivo.write(json.dumps({"clave": clave, "puntaje": hechos[clave]}) + "\n")
+                        archivo.flush()
+
+                # Promedio por candidato y poda para la siguiente ronda
+                for grupo, indices in vivos.items():
+                    if ronda >= len(rondas[grupo]):
+                        continue
+                    n_filas = rondas[grupo][ronda]
+                    medias = [np.mean([hechos[_clave_trabajo(grupo, candidatos[grupo[1]][i], n_filas, p)]
+                                       for p in range(PLIEGUES)]) for i in indices]
+                    puntajes[grupo] = dict(zip(indices, medias))
+                    if ronda < len(rondas[grupo]) - 1:
+                        n_siguiente = max(1, math.ceil(len(indices) / FACTOR))
+                        # orden estable: ante empates gana el candidato que aparece antes en la grilla
+                        mejores = sorted(range(len(indices)), key=lambda k: (-medias[k], indices[k]))[:n_siguiente]
+                        vivos[grupo] = sorted(indices[k] for k in mejores)
+    finally:
+        if archivo:
+            archivo.close()
+
+    resultado = {}
+    for (estrategia, familia), finales in puntajes.items():
+        mejor = max(finales, key=lambda i: (finales[i], -i))
+        resultado.setdefault(estrategia, {})[familia] = {
+            "parametros": candidatos[familia][mejor],
+            "puntaje": float(finales[mejor]),
+            "evaluados": sum(1 for clave in hechos if json.loads(clave)[:2] == [estrategia, familia]),
+        }
+    return resultado
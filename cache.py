@@ -0,0 +1,206 @@
+"""
+Caché de recursos compartida por todo el proceso.
+
+Streamlit vuelve a ejecutar app.py en cada interacción, pero los módulos
+importados viven mientras viva el proceso; por eso el modelo y la tabla de
+biomasas se guardan aquí y se comparten entre reruns y sesiones.
+Cada entrada se invalida si cambia el mtime/tamaño del archivo y, además,
+su hash de contenido (un `touch` o un checkout idéntico no fuerza recarga).
+"""
+
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from almacen import ARCHIVO_ESQUEMA, ESQUEMA_BIOMASA, cargar_tabla, leer_esquema
+from arbol_compilado import RUTA_ARBOL, ArbolCompilado, BosqueCompilado
+from artefacto import RUTA_ARTEFACTO, cargar_artefacto
+from dominio import RUTA_DOMINIO, Dominio
+from imputacion import RUTA_IMPUTACION, Imputador
+
+RUTA_MODELO = "regressor_bootstrap.pkl"
+# Ensamble bootstrap para las bandas de incertidumbre (ver incertidumbre.py)
+RUTA_ENSAMBLE = "regressor_bootstrap_ensamble.npz"
+RUTA_BIOMASA_EXCEL = "biomass_compositions.xlsx"
+# Almacén columnar importado desde el Excel (ver almacen.py)
+RUTA_BIOMASA = os.path.join("biomass_compositions", ARCHIVO_ESQUEMA)
+
+
+def _hash_archivo(ruta, bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+_hashes = {}
+
+
+def hash_archivo(ruta):
+    """sha256 del archivo, recalculado solo si cambian su mtime o tamaño."""
+    ruta = os.path.abspath(ruta)
+    info = os.stat(ruta)
+    clave = (ruta, info.st_mtime_ns, info.st_size)
+    if clave not in _hashes:
+        _hashes[clave] = _hash_archivo(ruta)
+    return _hashes[clave]
+
+
+class CacheArchivo:
+    """Guarda el resultado de `cargador(ruta)` mientras el archivo no cambie."""
+
+    def __init__(self, cargador):
+        self._cargador = cargador
+        self._entradas = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obtener(self, ruta):
+        ruta = os.path.abspath(ruta)
+        # os.stat lanza FileNotFoundError igual que el cargador original
+        info = os.stat(ruta)
+        firma = (info.st_mtime_ns, info.st_size)
+        with self._lock:
+            entrada = self._entradas.get(ruta)
+            if entrada is not None and entrada["firma"] == firma:
+                self.hits += 1
+                return entrada["valor"]
+
+            digest = _hash_archivo(ruta)
+            if entrada is not None and entrada["sha256"] == digest:
+                # Solo cambió el mtime: el contenido es el mismo
+                entrada["firma"] = firma
+                self.hits += 1
+                return entrada["valor"]
+
+            self.misses += 1
+            valor = self._cargador(ruta)
+            self._entradas[ruta] = {"firma": firma, "sha256": digest, "valor": valor}
+            return valor
+
+    def invalidar(self, ruta=None):
+        with self._lock:
+            if ruta is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(os.path.abspath(ruta), None)
+
+    def estadisticas(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entradas": len(self._entradas)}
+
+
+def _cargar_pickle(ruta):
+    # joblib (y sklearn, al deserializar) solo se importan si hace falta el pickle
+    import joblib
+
+    return joblib.load(ruta)
+
+
+cache_modelos = CacheArchivo(_cargar_pickle)
+
+
+def _leer_biomasa(ruta):
+    if ruta.endswith(".json"):
+        return cargar_tabla(os.path.dirname(ruta), esquema=ESQUEMA_BIOMASA)
+    return pd.read_excel(ruta)
+
+
+cache_tablas = CacheArchivo(_leer_biomasa)
+cache_arboles = CacheArchivo(ArbolCompilado.cargar)
+cache_artefactos = CacheArchivo(cargar_artefacto)
+cache_ensambles = CacheArchivo(BosqueCompilado.cargar)
+cache_imputadores = CacheArchivo(Imputador.cargar)
+cache_dominios = CacheArchivo(Dominio.cargar)
+
+
+def cargar_modelo(ruta=RUTA_MODELO):
+    return cache_modelos.obtener(ruta)
+
+
+def cargar_arbol(ruta=RUTA_ARBOL):
+    return cache_arboles.obtener(ruta)
+
+
+def cargar_artefacto_modelo(ruta=RUTA_ARTEFACTO):
+    return cache_artefactos.obtener(ruta)
+
+
+def cargar_predictor(ruta_modelo=RUTA_MODELO, ruta_arbol=RUTA_ARBOL, ruta_artefacto=RUTA_ARTEFACTO):
+    """
+    Artefacto memory-mapped (artefacto.py) o árbol compilado (sin sklearn) si
+    existen y fueron exportados desde el pickle actual; en otro caso, el modelo
+    de sklearn.
+    """
+    if os.path.exists(ruta_artefacto):
+        modelo = cargar_artefacto_modelo(ruta_artefacto)
+        if not os.path.exists(ruta_modelo) or modelo.origen_sha256 == hash_archivo(ruta_modelo):
+            return modelo
+    if os.path.exists(ruta_arbol):
+        arbol = cargar_arbol(ruta_arbol)
+        if not os.path.exists(ruta_modelo) or arbol.origen_sha256 == hash_archivo(ruta_modelo):
+            return arbol
+    return cargar_modelo(ruta_modelo)
+
+
+def cargar_ensamble(ruta_ensamble=RUTA_ENSAMBLE, ruta_modelo=RUTA_MODELO):
+    """Ensamble bootstrap entrenado junto con el pickle actual, o None si no existe o es de otro modelo."""
+    if not os.path.exists(ruta_ensamble):
+        return None
+    ensamble = cache_ensambles.obtener(ruta_ensamble)
+    if os.path.exists(ruta_modelo) and ensamble.origen_sha256 != hash_archivo(ruta_modelo):
+        return None
+    return ensamble
+
+
+def cargar_dominio(ruta_dominio=RUTA_DOMINIO, ruta_modelo=RUTA_MODELO):
+    """Dominio de entrenamiento del pickle actual (ver dominio.py), o None si no existe o es de otro modelo."""
+    if not os.path.exists(ruta_dominio):
+        return None
+    dominio = cache_dominios.obtener(ruta_dominio)
+    if os.path.exists(ruta_modelo) and dominio.origen_sha256 != hash_archivo(ruta_modelo):
+        return None
+    return dominio
+
+
+def cargar_imputador(ruta=RUTA_IMPUTACION, ruta_modelo=RUTA_MODELO):
+    """Imputador exportado junto al pickle actual (ver imputacion.py), o None si no existe o es de otro modelo."""
+    if not os.path.exists(ruta):
+        return None
+    imputador = cache_imputadores.obtener(ruta)
+    if os.path.exists(ruta_modelo) and imputador.origen_sha256 != hash_archivo(ruta_modelo):
+        return None
+    return imputador
+
+
+def ruta_biomasa(ruta_excel=RUTA_BIOMASA_EXCEL, ruta_almacen=RUTA_BIOMASA):
+    """
+    El almacén columnar si existe y fue importado desde el Excel actual
+    (o el Excel ya no está); en otro caso, el Excel.
+    """
+    if os.path.exists(ruta_almacen):
+        origen = leer_esquema(os.path.dirname(ruta_almacen))["origen_sha256"]
+        if not os.path.exists(ruta_excel) or origen == hash_archivo(ruta_excel):
+            return ruta_almacen
+    return ruta_excel
+
+
+def cargar_biomasa(ruta=None):
+    # La tabla es compartida: quien la modifique debe trabajar sobre una copia
+    return cache_tablas.obtener(ruta or ruta_biomasa())
+
+
+def estadisticas():
+    return {
+        "modelo": cache_modelos.estadisticas(),
+        "arbol": cache_arboles.estadisticas(),
+        "artefacto": cache_artefactos.estadisticas(),
+        "ensamble": cache_ensambles.estadisticas(),
+        "imputador": cache_imputadores.estadisticas(),
+        "dominio": cache_dominios.estadisticas(),
+        "biomasa": cache_tablas.estadisticas(),
+    }
@@ -0,0 +1,206 @@
+"""
+Cálculos de dominio compartidos por la app y el modo por lotes.
+
+Las funciones escalares son las que usa app.py para una sola biomasa; las
+variantes `*_columnas` hacen lo mismo sobre arrays de NumPy completos.
+"""
+
+import numpy as np
+
+# Orden exacto de las variables con las que se entrenó el modelo
+COLUMNAS_MODELO = [
+    'Gasification temperature [°C]',
+    'O2_gasifying agent (wt/wt)',
+    'N2_gasifying agent (wt/wt)',
+    'Steam_gasifying agent (wt/wt)',
+    'C_norm', 'H_norm', 'O_norm', 'N_norm', 'S_norm', 'Cl_norm',
+    'VM [%] _norm', 'Ash [%] _norm', 'FC [%] _norm',
+    'Biomass Energy Content (LHV) [MJ/kg]',
+    'Intrinsic moisture content [%]',
+]
+OBJETIVOS = ['H2_dry', 'CO_dry', 'CH4_dry']
+
+COLUMNAS_PROXIMO = ['VM [%] _norm', 'FC [%] _norm', 'Ash [%] _norm']
+COLUMNAS_ULTIMO = ['C_norm', 'H_norm', 'O_norm', 'N_norm', 'S_norm', 'Cl_norm']
+COLUMNAS_NORM = COLUMNAS_PROXIMO + COLUMNAS_ULTIMO
+
+AGENTES = ["Aire", "Oxígeno", "Vapor de agua", "Mezcla O2 + H2O"]
+APLICACIONES = ["Heat/Power", "Methanol/Biofuels", "Methane", "Other"]
+LHV_MINIMO = 3.5  # MJ/kg
+
+# Reglas de aplicación final según H2/CO y energía del syngas, compartidas por
+# la app (`sugerir_aplicacion`, energía calculada en MJ/Nm3) y el etiquetado de
+# la base de literatura (entrenamiento, HHV en MJ/m3): cambian los límites de
+# energía y el nombre del resto
+H2_CO_METANOL = 1.8
+H2_CO_METANO = 3.0
+CRITERIO_APP = {"energia": (3.0, 18.0), "otra": APLICACIONES[3]}
+CRITERIO_LITERATURA = {"energia": (1.23, 18.44), "otra": "Others"}
+
+# Rangos (mínimo, máximo) de H2/CO y energía [MJ/Nm3] de cada aplicación en `sugerir_aplicacion`
+RANGOS_APLICACION = {
+    "Heat/Power": {"H2/CO": (None, H2_CO_METANOL), "Energía": (CRITERIO_APP["energia"][0], None)},
+    "Methanol/Biofuels": {"H2/CO": (H2_CO_METANOL, H2_CO_METANO), "Energía": CRITERIO_APP["energia"]},
+    "Methane": {"H2/CO": (H2_CO_METANO, None), "Energía": CRITERIO_APP["energia"]},
+}
+
+
+# --- Funciones escalares (una biomasa) ---
+def rebalance_composition(biomass_data, new_moisture):
+    old_moisture = biomass_data.get('Moisture content', 0)
+    dry_basis_factor = (100 - old_moisture)
+
+    # Rebalanceo de análisis próximo
+    vm_dry = biomass_data['VM [%] _norm'] * dry_basis_factor / 100
+    fc_dry = biomass_data['FC [%] _norm'] * dry_basis_factor / 100
+    ash_dry = biomass_data['Ash [%] _norm'] * dry_basis_factor / 100
+    proximate_dry_sum = vm_dry + fc_dry + ash_dry
+    scale_factor_proximate = (100 - new_moisture) / proximate_dry_sum
+    biomass_data['VM [%] _norm'] = vm_dry * scale_factor_proximate
+    biomass_data['FC [%] _norm'] = fc_dry * scale_factor_proximate
+    biomass_data['Ash [%] _norm'] = ash_dry * scale_factor_proximate
+
+    # Rebalanceo de análisis último
+    c_dry = biomass_data['C_norm'] * dry_basis_factor / 100
+    h_dry = biomass_data['H_norm'] * dry_basis_factor / 100
+    o_dry = biomass_data['O_norm'] * dry_basis_factor / 100
+    n_dry = biomass_data['N_norm'] * dry_basis_factor / 100
+    s_dry = biomass_data['S_norm'] * dry_basis_factor / 100
+    cl_dry = biomass_data['Cl_norm'] * dry_basis_factor / 100
+    ultimate_dry_sum = c_dry + h_dry + o_dry + n_dry + s_dry + cl_dry + ash_dry
+    scale_factor_ultimate = (100 - new_moisture) / ultimate_dry_sum
+    biomass_data['C_norm'] = c_dry * scale_factor_ultimate
+    biomass_data['H_norm'] = h_dry * scale_factor_ultimate
+    biomass_data['O_norm'] = o_dry * scale_factor_ultimate
+    biomass_data['N_norm'] = n_dry * scale_factor_ultimate
+    biomass_data['S_norm'] = s_dry * scale_factor_ultimate
+    biomass_data['Cl_norm'] = cl_dry * scale_factor_ultimate
+
+    biomass_data['Intrinsic moisture content [%]'] = new_moisture
+    return biomass_data
+
+def calcular_fracciones_agente(tipo, ratio):
+    if tipo == "Aire":
+        return {"O2": ratio / (1 + 3.76), "N2": ratio * 3.76 / (1 + 3.76), "H2O": 0}
+    elif tipo == "Oxígeno":
+        return {"O2": ratio, "N2": 0, "H2O": 0}
+    elif tipo == "Vapor de agua":
+        return {"O2": 0, "N2": 0, "H2O": ratio}
+    elif tipo == "Mezcla O2 + H2O":
+        return {"O2": ratio * 0.5, "N2": 0, "H2O": ratio * 0.5}
+    else:
+        return {"O2": 0, "N2": 0, "H2O": 0}
+
+def calcular_lhv(C, H, O, N, S, ash, moisture):
+    lhv = 0.349 * C + 1.178 * H + 0.1005 * S - 0.1034 * O - 0.0151 * N - 0.0211 * ash - 0.244 * moisture
+    return max(LHV_MINIMO, lhv)
+
+def calcular_energia_syngas(h2, co, ch4):
+    return (0.126 * h2) + (0.108 * co) + (0.358 * ch4) + ((h2 / 100) * 1.2 * 2.45)
+
+def clasificar_aplicacion(h2_co, fuel_energy, criterio=CRITERIO_APP):
+    minimo, maximo = criterio["energia"]
+    if fuel_energy >= minimo and h2_co < H2_CO_METANOL:
+        return "Heat/Power"
+    elif minimo <= fuel_energy <= maximo and H2_CO_METANOL <= h2_co < H2_CO_METANO:
+        return "Methanol/Biofuels"
+    elif minimo <= fuel_energy <= maximo and h2_co >= H2_CO_METANO:
+        return "Methane"
+    else:
+        return criterio["otra"]
+
+def sugerir_aplicacion(h2_co, fuel_energy):
+    return clasificar_aplicacion(h2_co, fuel_energy, CRITERIO_APP)
+
+
+# --- Variantes por columnas (arrays de NumPy) ---
+def rebalance_columnas(composicion, new_moisture, old_moisture=0.0):
+    """
+    `composicion` es un dict columna -> array con las columnas `_norm`;
+    devuelve un dict nuevo con las columnas rebalanceadas a `new_moisture`.
+    Los argumentos se combinan con broadcasting de NumPy y las operaciones
+    siguen el mismo orden que `rebalance_composition`.
+    """
+    dry_basis_factor = 100 - np.asarray(old_moisture, dtype=np.float64)
+    new_moisture = np.asarray(new_moisture, dtype=np.float64)
+    seco = {col: np.asarray(composicion[col], dtype=np.float64) * dry_basis_factor / 100
+            for col in COLUMNAS_NORM}
+
+    # Rebalanceo de análisis próximo
+    proximate_dry_sum = seco['VM [%] _norm'] + seco['FC [%] _norm'] + seco['Ash [%] _norm']
+    scale_factor_proximate = (100 - new_moisture) / proximate_dry_sum
+
+    # Rebalanceo de análisis último (las cenizas cuentan en la suma pero no se reescalan aquí)
+    ultimate_dry_sum = seco['C_norm']
+    for col in COLUMNAS_ULTIMO[1:]:
+        ultimate_dry_sum = ultimate_dry_sum + seco[col]
+    ultimate_dry_sum = ultimate_dry_sum + seco['Ash [%] _norm']
+    scale_factor_ultimate = (100 - new_moisture) / ultimate_dry_sum
+
+    resultado = {col: seco[col] * scale_factor_proximate for col in COLUMNAS_PROXIMO}
+    resultado.update({col: seco[col] * scale_factor_ultimate for col in COLUMNAS_ULTIMO})
+    resultado['Intrinsic moisture content [%]'] = np.ascontiguousarray(
+        np.broadcast_to(new_moisture, resultado['C_norm'].shape), dtype=np.float64)
+    return resultado
+
+def columnas_biomasa(df_biomasa):
+    """Columnas `_norm` de la tabla de biomasas como arrays float64 contiguos, más la humedad de origen."""
+    composicion = {col: np.ascontiguousarray(df_biomasa[col].to_numpy(dtype=np.float64))
+                   for col in COLUMNAS_NORM}
+    # Igual que rebalance_composition: sin 'Moisture content' se asume base seca
+    if 'Moisture content' in df_biomasa.columns:
+        old_moisture = np.ascontiguousarray(df_biomasa['Moisture content'].to_numpy(dtype=np.float64))
+    else:
+        old_moisture = np.zeros(len(df_biomasa))
+    return composicion, old_moisture
+
+def rebalance_tabla(df_biomasa, humedades):
+    """
+    Rebalancea todas las biomasas de `df_biomasa` de una vez.
+
+    - `humedades` escalar: cada columna resultante tiene forma (n_biomasas,).
+    - `humedades` 1-D de largo m: malla de forma (n_biomasas, m).
+    - `humedades` 2-D de forma (n_biomasas, k): una humedad por celda.
+    """
+    composicion, old_moisture = columnas_biomasa(df_biomasa)
+    humedades = np.asarray(humedades, dtype=np.float64)
+    if humedades.ndim > 0:
+        composicion = {col: valores[:, None] for col, valores in composicion.items()}
+        old_moisture = old_moisture[:, None]
+    return rebalance_columnas(composicion, humedades, old_moisture)
+
+def fracciones_agente_columnas(tipo, ratio):
+    tipo = np.asarray(tipo)
+    ratio = np.asarray(ratio, dtype=np.float64)
+    es_aire = tipo == "Aire"
+    es_oxigeno = tipo == "Oxígeno"
+    es_vapor = tipo == "Vapor de agua"
+    es_mezcla = tipo == "Mezcla O2 + H2O"
+    o2 = np.select([es_aire, es_oxigeno, es_mezcla], [ratio / (1 + 3.76), ratio, ratio * 0.5], 0.0)
+    n2 = np.where(es_aire, ratio * 3.76 / (1 + 3.76), 0.0)
+    h2o = np.select([es_vapor, es_mezcla], [ratio, ratio * 0.5], 0.0)
+    return {"O2": o2, "N2": n2, "H2O": h2o}
+
+def lhv_sin_minimo(C, H, O, N, S, ash, moisture):
+    return 0.349 * C + 1.178 * H + 0.1005 * S - 0.1034 * O - 0.0151 * N - 0.0211 * ash - 0.244 * moisture
+
+def lhv_columnas(C, H, O, N, S, ash, moisture):
+    return np.maximum(LHV_MINIMO, lhv_sin_minimo(C, H, O, N, S, ash, moisture))
+
+def relacion_h2_co_columnas(h2, co):
+    h2 = np.asarray(h2, dtype=np.float64)
+    co = np.asarray(co, dtype=np.float64)
+    return np.divide(h2, co, out=np.zeros(np.broadcast(h2, co).shape), where=co != 0)
+
+def aplicacion_columnas(h2_co, fuel_energy, criterio=CRITERIO_APP):
+    """Versión de `clasificar_aplicacion` por columnas (NaN cae en la clase restante, como en la escalar)."""
+    h2_co = np.asarray(h2_co)
+    fuel_energy = np.asarray(fuel_energy)
+    minimo, maximo = criterio["energia"]
+    en_rango = (minimo <= fuel_energy) & (fuel_energy <= maximo)
+    condiciones = [
+        (fuel_energy >= minimo) & (h2_co < H2_CO_METANOL),
+        en_rango & (H2_CO_METANOL <= h2_co) & (h2_co < H2_CO_METANO),
+        en_rango & (h2_co >= H2_CO_METANO),
+    ]
+    return np.select(condiciones, APLICACIONES[:3], criterio["otra"])
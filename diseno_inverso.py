@@ -0,0 +1,314 @@
+"""
+Diseño inverso: condiciones de operación que producen un syngas objetivo.
+
+Busca, para cada biomasa y agente, temperatura, ratio del agente y humedad
+que cumplan las restricciones (p. ej. la aplicación "Methanol/Biofuels", o
+H2/CO en [1.8, 3)) y devuelve el frente de Pareto de los objetivos (por
+defecto, máxima energía y mínima temperatura), ordenado por el primero.
+
+El modelo es constante a trozos: solo cambia cuando una variable cruza un
+umbral de un árbol. La temperatura solo entra en la columna de temperatura,
+el ratio en las fracciones O2/N2/H2O y la humedad en la composición y el LHV,
+y todas son lineales en su variable; así, los umbrales de los árboles se
+traducen en puntos de corte exactos sobre cada eje y basta evaluar un punto
+por celda. Si la malla de celdas es demasiado grande, o el modelo no es de
+árboles, se evalúa una malla gruesa y se refina alrededor de los mejores
+puntos mientras quede tiempo. Cada combinación biomasa × agente es una tarea
+independiente del pool de procesos.
+
+    python diseno_inverso.py --aplicacion "Methanol/Biofuels"
+    python diseno_inverso.py --h2co 1.8 3 --objetivo Energía:max --objetivo Humedad:max --presupuesto 5
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from barrido import RANGOS_RATIO, malla_entrada
+from cache import RUTA_MODELO, cargar_biomasa, cargar_predictor
+from calculos import (
+    LHV_MINIMO, RANGOS_APLICACION, aplicacion_columnas, calcular_energia_syngas, relacion_h2_co_columnas,
+)
+from prediccion_lote import predecir_matriz
+from regiones import COLUMNA_LHV, coeficientes
+
+RANGO_TEMPERATURA = (600.0, 1000.0)
+RANGO_HUMEDAD = (0.0, 30.0)
+AGENTES_BUSQUEDA = list(RANGOS_RATIO)
+OBJETIVOS_POR_DEFECTO = [("Energía", "max"), ("Temperatura", "min")]
+PRESUPUESTO_S = 10.0
+MAX_PUNTOS = 200_000   # evaluaciones por malla
+N_FINO = 401           # puntos por eje si el modelo no es de árboles
+N_MEJORES = 5          # puntos alrededor de los que se refina
+VARIABLES = ["Temperatura", "Ratio", "Humedad", "H2", "CO", "CH4", "H2/CO", "Energía"]
+
+
+# --- Puntos de corte ---
+def umbrales(modelo):
+    """Dict columna -> umbrales ordenados de todos los árboles del modelo, o None si no es de árboles."""
+    arboles = getattr(modelo, "estimators_", None)
+    if arboles is None:
+        arboles = [modelo]
+    pares = []
+    for arbol in arboles:
+        arbol = getattr(arbol, "tree_", arbol)
+        if not hasattr(arbol, "threshold"):
+            return None
+        internos = np.asarray(arbol.feature) >= 0
+        pares.append((np.asarray(arbol.feature)[internos], np.asarray(arbol.threshold)[internos]))
+    feature = np.concatenate([f for f, _ in pares])
+    threshold = np.concatenate([t for _, t in pares])
+    return {int(j): np.unique(threshold[feature == j]) for j in np.unique(feature)}
+
+
+def _celdas(cortes, inicio, fin):
+    """Un punto (el centro) por cada intervalo entre cortes dentro de [inicio, fin]."""
+    bordes = np.unique(np.concatenate([[inicio, fin], cortes[(cortes > inicio) & (cortes < fin)]]))
+    return (bordes[:-1] + bordes[1:]) / 2
+
+
+def ejes_exactos(umbrales_modelo, fila_biomasa, agente):
+    """Centros de las celdas de temperatura, ratio y humedad en las que el modelo es constante."""
+    # Cada columna es a + b·v de una sola variable (ver regiones.coeficientes)
+    variable, a, b = coeficientes(fila_biomasa, agente)
+    cortes = [[], [], []]
+    for j, umbrales_j in umbrales_modelo.items():
+        if b[j] == 0:
+            continue
+        if j == COLUMNA_LHV:
+            umbrales_j = umbrales_j[umbrales_j >= LHV_MINIMO]  # por debajo del mínimo no hay cruce
+        cortes[variable[j]].append((umbrales_j - a[j]) / b[j])
+    rangos = (RANGO_TEMPERATURA, RANGOS_RATIO[agente], RANGO_HUMEDAD)
+    return tuple(_celdas(np.concatenate([np.empty(0)] + c), *r) for c, r in zip(cortes, rangos))
+
+
+def ejes_uniformes(agente, n=N_FINO):
+    return (np.linspace(*RANGO_TEMPERATURA, n), np.linspace(*RANGOS_RATIO[agente], n),
+            np.linspace(*RANGO_HUMEDAD, n))
+
+
+# --- Evaluación ---
+def _evaluar(modelo, fila_biomasa, agente, temperaturas, ratios, humedades):
+    """Tabla de puntos (variables de operación y del syngas) de la malla humedad × temperatura × ratio."""
+    prediccion = predecir_matriz(modelo, malla_entrada(fila_biomasa, agente, temperaturas, ratios, humedades))
+    h2, co, ch4 = prediccion[:, 0], prediccion[:, 1], prediccion[:, 2]
+    H, T, R = np.meshgrid(humedades, temperaturas, ratios, indexing="ij")
+    return {
+        "Temperatura": T.ravel(), "Ratio": R.ravel(), "Humedad": H.ravel(),
+        "H2": h2, "CO": co, "CH4": ch4,
+        "H2/CO": relacion_h2_co_columnas(h2, co),
+        "Energía": calcular_energia_syngas(h2, co, ch4),
+    }
+
+
+def _distancia(puntos, rangos):
+    """Distancia relativa de cada punto a los rangos [mínimo, máximo); 0 si los cumple."""
+    distancia = np.zeros(len(puntos["H2"]))
+    for variable, (minimo, maximo) in rangos.items():
+        v = puntos[variable]
+        escala = max(abs(minimo or 0), abs(maximo or 0), 1.0)
+        if minimo is not None:
+            distancia += np.maximum(0, minimo - v) / escala
+        if maximo is not None:
+            # Intervalo semiabierto: el máximo ya no cumple
+            distancia += np.where(v >= maximo, (v - maximo) / escala + 1e-9, 0)
+    return distancia
+
+
+def _violacion(puntos, restricciones, aplicacion):
+    """0 si el punto cumple todo; si no, cuánto le falta."""
+    violacion = _distancia(puntos, restricciones or {})
+    if aplicacion is not None:
+        # Decide la regla exacta de sugerir_aplicacion; los rangos solo miden la distancia
+        distinta = aplicacion_columnas(puntos["H2/CO"], puntos["Energía"]) != aplicacion
+        falta = np.maximum(_distancia(puntos, RANGOS_APLICACION[aplicacion]), 1e-9)
+        violacion = violacion + np.where(distinta, falta, 0.0)
+    return violacion
+
+
+def _orientados(puntos, objetivos):
+    """Objetivos como matriz (n, k) a maximizar."""
+    return np.column_stack([puntos[v] if sentido == "max" else -puntos[v] for v, sentido in objetivos])
+
+
+def frente_pareto(valores):
+    """Máscara de los puntos no dominados de `valores` (n, k), todos a maximizar."""
+    valores = np.asarray(valores, dtype=np.float64)
+    unicos, inverso = np.unique(valores, axis=0, return_inverse=True)
+    orden = np.lexsort(unicos.T[::-1])[::-1]  # primer objetivo descendente
+    frente = []
+    for i in orden:
+        v = unicos[i]
+        if frente:
+            otros = unicos[frente]
+            if ((otros >= v).all(axis=1) & (otros > v).any(axis=1)).any():
+                continue
+        frente.append(i)
+    en_frente = np.zeros(len(unicos), dtype=bool)
+    en_frente[frente] = True
+    return en_frente[inverso.ravel()]
+
+
+def _reducir(puntos, objetivos, restricciones, aplicacion, n_cercanos=N_MEJORES):
+    """Se queda con el frente de Pareto de los puntos factibles o, si no hay, con los más cercanos."""
+    violacion = _violacion(puntos, restricciones, aplicacion)
+    factibles = violacion == 0
+    if factibles.any():
+        indices = np.flatnonzero(factibles)
+        indices = indices[frente_pareto(_orientados({k: v[indices] for k, v in puntos.items()}, objetivos))]
+    else:
+        indices = np.argsort(violacion, kind="stable")[:n_cercanos]
+    reducido = {k: v[indices] for k, v in puntos.items()}
+    reducido["violacion"] = violacion[indices]
+    return reducido
+
+
+def _submuestra(inicio, fin, k):
+    """Hasta k índices repartidos en [inicio, fin], incluidos los extremos."""
+    return np.unique(np.linspace(inicio, fin, min(k, fin - inicio + 1)).round().astype(np.intp))
+
+
+def buscar_combinacion(modelo, fila_biomasa, agente, objetivos, restricciones, aplicacion, limite,
+                       umbrales_modelo=None, max_puntos=MAX_PUNTOS):
+    """Frente local de una biomasa y un agente; `limite` es el instante (time.time) en que hay que parar."""
+    ejes = (ejes_exactos(umbrales_modelo, fila_biomasa, agente) if umbrales_modelo is not None
+            else ejes_uniformes(agente))
+    k = max(2, int(max_puntos ** (1 / 3)))
+    cajas = [tuple((0, len(eje) - 1) for eje in ejes)]
+    resultados, evaluados, completo = [], 0, True
+    while cajas:
+        nuevas = []
+        for caja in cajas:
+            if time.time() > limite:
+                completo = False
+                break
+            indices = [_submuestra(a, b, k) for a, b in caja]
+            puntos = _evaluar(modelo, fila_biomasa, agente, *(eje[i] for eje, i in zip(ejes, indices)))
+            evaluados += len(puntos["H2"])
+            resultados.append(_reducir(puntos, objetivos, restricciones, aplicacion))
+            if all(len(i) == b - a + 1 for i, (a, b) in zip(indices, caja)):
+                continue  # la caja se evaluó completa: no hay nada que refinar
+            # Refinar entre los vecinos de la malla gruesa de los mejores puntos
+            violacion = _violacion(puntos, restricciones, aplicacion)
+            puntaje = _orientados(puntos, objetivos)[:, 0]
+            for p in np.lexsort((-puntaje, violacion))[:N_MEJORES]:
+                posicion = np.unravel_index(p, tuple(len(i) for i in (indices[2], indices[0], indices[1])))
+                # _evaluar ordena la malla humedad × temperatura × ratio
+                posicion = (posicion[1], posicion[2], posicion[0])
+                nuevas.append(tuple((int(i[max(q - 1, 0)]), int(i[min(q + 1, len(i) - 1)]))
+                                    for i, q in zip(indices, posicion)))
+        cajas = list(dict.fromkeys(nuevas)) if completo else []
+
+    fusionado = {k: np.concatenate([r[k] for r in resultados]) for k in resultados[0]}
+    return _reducir(fusionado, objetivos, restricciones, aplicacion), evaluados, completo
+
+
+def _tarea(modelo, fila_biomasa, agente, objetivos, restricciones, aplicacion, limite, umbrales_modelo, max_puntos):
+    if time.time() > limite:
+        return None, 0, False
+    return buscar_combinacion(modelo, fila_biomasa, agente, objetivos, restricciones, aplicacion,
+                              limite, umbrales_modelo, max_puntos)
+
+
+def optimizar(modelo, df_biomasa, aplicacion=None, restricciones=None, objetivos=OBJETIVOS_POR_DEFECTO,
+              biomasas=None, agentes=AGENTES_BUSQUEDA, presupuesto_s=PRESUPUESTO_S, procesos=1,
+              max_puntos=MAX_PUNTOS):
+    """
+    Devuelve (frente, info). `frente` es un DataFrame con biomasa, agente,
+    condiciones de operación y syngas predicho, ordenado por el primer
+    objetivo; si ningún punto cumple las restricciones contiene los más
+    cercanos (violacion > 0). `info` resume evaluaciones, tiempo y si la
+    búsqueda terminó dentro del presupuesto.
+    """
+    inicio = time.time()
+    limite = inicio + presupuesto_s
+    umbrales_modelo = umbrales(modelo)
+    nombres = df_biomasa["Biomass residue"].tolist() if biomasas is None else list(biomasas)
+    tareas = [(nombre, agente) for nombre in nombres for agente in agentes]
+    filas = {nombre: df_biomasa[df_biomasa["Biomass residue"] == nombre] for nombre in nombres}
+    argumentos = [(modelo, filas[nombre], agente, objetivos, restricciones, aplicacion, limite,
+                   umbrales_modelo, max_puntos) for nombre, agente in tareas]
+
+    if procesos == 1:
+        salidas = [_tarea(*a) for a in argumentos]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            salidas = list(pool.map(_tarea, *zip(*argumentos)))
+
+    partes = []
+    for (nombre, agente), (puntos, _, _) in zip(tareas, salidas):
+        if puntos is not None:
+            partes.append(pd.DataFrame(puntos).assign(biomasa=nombre, agente=agente))
+    info = {
+        "evaluados": int(sum(s[1] for s in salidas)),
+        "combinaciones": len(tareas),
+        "completo": all(s[2] for s in salidas),
+        "exacto": umbrales_modelo is not None,
+        "segundos": time.time() - inicio,
+    }
+    if not partes:
+        return pd.DataFrame(columns=["biomasa", "agente"] + VARIABLES + ["Aplicación", "violacion"]), info
+
+    todos = pd.concat(partes, ignore_index=True)
+    factibles = todos[todos["violacion"] == 0]
+    if len(factibles):
+        frente = factibles[frente_pareto(_orientados({v: factibles[v].to_numpy() for v in VARIABLES}, objetivos))]
+        orden = [v for v, _ in objetivos]
+        # Celdas equivalentes de una misma biomasa y agente: basta una
+        frente = frente.drop_duplicates(["biomasa", "agente"] + orden)
+        frente = frente.sort_values(orden, ascending=[s == "min" for _, s in objetivos], kind="stable")
+    else:
+        frente = todos.sort_values("violacion", kind="stable").head(N_MEJORES)
+    frente = frente.assign(**{"Aplicación": aplicacion_columnas(frente["H2/CO"].to_numpy(),
+                                                               frente["Energía"].to_numpy())})
+    return frente[["biomasa", "agente"] + VARIABLES + ["Aplicación", "violacion"]].reset_index(drop=True), info
+
+
+def _objetivo(texto):
+    variable, _, sentido = texto.rpartition(":")
+    if variable not in VARIABLES or sentido not in ("max", "min"):
+        raise argparse.ArgumentTypeError(f"Objetivo inválido: {texto!r} (p. ej. Energía:max)")
+    return variable, sentido
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca condiciones de operación para un syngas objetivo")
+    parser.add_argument("--aplicacion", choices=list(RANGOS_APLICACION), default=None)
+    parser.add_argument("--h2co", nargs=2, type=float, metavar=("MIN", "MAX"), help="H2/CO en [MIN, MAX)")
+    parser.add_argument("--energia", nargs=2, type=float, metavar=("MIN", "MAX"), help="Energía [MJ/Nm3] en [MIN, MAX)")
+    parser.add_argument("--objetivo", type=_objetivo, action="append", default=None,
+                        help="Variable:max|min, en orden de prioridad (por defecto Energía:max Temperatura:min)")
+    parser.add_argument("--biomasa", action="append", default=None, help="Limitar a estas biomasas")
+    parser.add_argument("--agente", action="append", choices=AGENTES_BUSQUEDA, default=None)
+    parser.add_argument("--presupuesto", type=float, default=PRESUPUESTO_S, help="Tiempo máximo (s)")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--modelo", default=RUTA_MODELO)
+    parser.add_argument("--salida", default=None, help="CSV con el frente de Pareto")
+    args = parser.parse_args(argv)
+
+    restricciones = {}
+    if args.h2co:
+        restricciones["H2/CO"] = tuple(args.h2co)
+    if args.energia:
+        restricciones["Energía"] = tuple(args.energia)
+    frente, info = optimizar(cargar_predictor(args.modelo), cargar_biomasa(), args.aplicacion, restricciones,
+                             args.objetivo or OBJETIVOS_POR_DEFECTO, args.biomasa, args.agente or AGENTES_BUSQUEDA,
+                             args.presupuesto, args.procesos)
+
+    estado = "completa" if info["completo"] else "cortada por el presupuesto"
+    metodo = "celdas exactas del árbol" if info["exacto"] else "refinamiento de malla"
+    print(f"{info['evaluados']} puntos evaluados en {info['segundos']:.1f} s ({metodo}, búsqueda {estado})")
+    if len(frente) and frente["violacion"].iloc[0] > 0:
+        print("Ningún punto cumple las restricciones; se muestran los más cercanos")
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(frente.round(3).to_string())
+    if args.salida:
+        frente.to_csv(args.salida, index=False)
+
+
+if __name__ == "__main__":
+    main()
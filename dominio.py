@@ -0,0 +1,101 @@
+"""
+Dominio de aplicabilidad del modelo: detecta escenarios fuera de los datos de entrenamiento.
+
+El árbol extrapola sin avisar cuando una biomasa rebalanceada o un punto de
+operación cae lejos de las filas con que se entrenó. Al exportar el modelo,
+entrenamiento.py guarda junto a él (regressor_bootstrap_dominio.npz) un índice
+construido con las filas originales de entrenamiento (sin las sintéticas):
+
+- rango (mínimo, máximo) de cada columna del modelo;
+- un KD-tree sobre las filas estandarizadas: la distancia al vecino más
+  cercano se divide por el umbral (cuantil 99 de esa distancia entre las
+  propias filas de entrenamiento), así que una distancia relativa > 1 es un
+  punto más aislado que casi todo el entrenamiento.
+
+Un escenario está fuera de dominio si alguna columna sale de su rango o si su
+distancia relativa supera 1. `evaluar` trabaja sobre la matriz de entrada
+completa (una consulta al KD-tree por fila, O(log n) en promedio cuando las
+filas de entrenamiento forman grupos, como las familias de biomasa), así que
+la app, el modo por lotes y el servicio marcan cada predicción sin volver a
+pasar por el modelo.
+"""
+
+import numpy as np
+
+from calculos import COLUMNAS_MODELO
+
+RUTA_DOMINIO = "regressor_bootstrap_dominio.npz"
+CUANTIL = 0.99
+
+
+class Dominio:
+    def __init__(self, minimo, maximo, centro, escala, puntos, umbral, origen_sha256=""):
+        self.minimo = np.asarray(minimo, dtype=np.float64)
+        self.maximo = np.asarray(maximo, dtype=np.float64)
+        self.centro = np.asarray(centro, dtype=np.float64)
+        self.escala = np.asarray(escala, dtype=np.float64)
+        self.puntos = np.asarray(puntos, dtype=np.float64)
+        self.umbral = float(umbral)
+        self.origen_sha256 = str(origen_sha256)
+        self._arbol = None
+
+    @classmethod
+    def construir(cls, X, cuantil=CUANTIL, origen_sha256=""):
+        """Índice de las filas `X` (n, columnas del modelo); se ignoran las filas con faltantes."""
+        X = np.asarray(X, dtype=np.float64)
+        X = X[~np.isnan(X).any(axis=1)]
+        centro = X.mean(axis=0)
+        escala = X.std(axis=0)
+        escala = np.where(escala > 0, escala, 1.0)
+        puntos = np.unique((X - centro) / escala, axis=0)
+        dominio = cls(X.min(axis=0), X.max(axis=0), centro, escala, puntos, 1.0, origen_sha256)
+        if len(puntos) > 1:
+            # k=2: el primer vecino de cada fila es ella misma
+            distancias, _ = dominio.arbol.query(puntos, k=2)
+            dominio.umbral = max(float(np.quantile(distancias[:, 1], cuantil)), 1e-9)
+        return dominio
+
+    @property
+    def arbol(self):
+        # scipy solo se importa si se usa el dominio
+        if self._arbol is None:
+            from scipy.spatial import cKDTree
+
+            self._arbol = cKDTree(self.puntos)
+        return self._arbol
+
+    def evaluar(self, X):
+        """
+        Para cada fila de `X` (n, columnas del modelo): máscara (n, columnas) de
+        valores fuera de rango, distancia relativa al vecino más cercano y si
+        la fila está fuera de dominio.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        fuera_rango = (X < self.minimo) | (X > self.maximo)
+        # workers=-1: la consulta se reparte entre todos los núcleos
+        distancia, _ = self.arbol.query(np.nan_to_num((X - self.centro) / self.escala), workers=-1)
+        distancia = distancia / self.umbral
+        return {
+            "fuera_rango": fuera_rango,
+            "distancia": distancia,
+            "fuera_dominio": fuera_rango.any(axis=1) | (distancia > 1),
+        }
+
+    def motivos(self, fila):
+        """Columnas fuera de rango de una fila, como texto para la interfaz."""
+        fila = np.asarray(fila, dtype=np.float64)
+        return [f"{col}: {v:.2f} (entrenamiento {lo:.2f}–{hi:.2f})"
+                for col, v, lo, hi in zip(COLUMNAS_MODELO, fila, self.minimo, self.maximo) if not lo <= v <= hi]
+
+    def guardar(self, ruta):
+        with open(ruta, "wb") as f:
+            np.savez(f, minimo=self.minimo, maximo=self.maximo, centro=self.centro, escala=self.escala,
+                     puntos=self.puntos, umbral=np.array(self.umbral), origen_sha256=np.array(self.origen_sha256))
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta, allow_pickle=False) as datos:
+            if datos["minimo"].shape != (len(COLUMNAS_MODELO),):
+                raise ValueError("El dominio no tiene las columnas del modelo")
+            return cls(datos["minimo"], datos["maximo"], datos["centro"], datos["escala"], datos["puntos"],
+                       datos["umbral"].item(), datos["origen_sha256"].item())
@@ -0,0 +1,498 @@
+"""
+Pipeline de entrenamiento del modelo de composición de syngas.
+
+Versión ejecutable del notebook "Preproccesing and ML modeling.py":
+
+    cargar -> limpiar -> imputar -> separar prueba -> remuestrear -> buscar hiperparámetros
+           -> evaluar e informe (evaluacion.py) -> medir latencia -> exportar
+
+Las ramas SMOTE, Bootstrap y KDE se remuestrean en paralelo en un pool de
+procesos, y la búsqueda de hiperparámetros de todas las estrategias y familias
+de modelos (árbol, random forest, extra-trees, gradient boosting) comparte un
+único pool de ajustes (busqueda.py). Un 20 % de las filas originales se separa
+antes de remuestrear y solo se usa para evaluar. Se exporta el modelo con
+mejor R² medio que cumple el presupuesto de latencia y memoria. Cada etapa guarda su resultado en
+artefactos_entrenamiento/etapas/ bajo una clave derivada de sus entradas y
+parámetros; al volver a ejecutar con los mismos datos se reutilizan las etapas
+ya terminadas.
+
+    python entrenamiento.py "DATABASE BIOMASA RESIDUAL FINAL COPIA.xlsm"
+    python entrenamiento.py datos.xlsm --exportar kde --procesos 3
+    python entrenamiento.py datos.xlsm --familias arbol hgb --latencia-fila 1 --memoria 5
+    python entrenamiento.py datos.xlsm --incremental
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import ExtraTreesRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+import remuestreo
+from almacen import cargar_tabla, guardar_tabla
+from arbol_compilado import ArbolCompilado, BosqueCompilado, exportar as exportar_arbol
+from artefacto import ARCHIVO_MANIFIESTO, exportar as exportar_artefacto
+from busqueda import buscar
+from calculos import COLUMNAS_MODELO, OBJETIVOS
+from dominio import Dominio
+from evaluacion import DIRECTORIO_INFORME, evaluar_predicciones, generar_informe, predecir
+from imputacion import ESTRATEGIAS_IMPUTACION, Imputador
+from incertidumbre import PERCENTILES, cobertura
+from limpieza import AGENTE, CLASE, limpiar, perfil_nulos
+
+VERSION_PIPELINE = 4
+DIRECTORIO_ARTEFACTOS = "artefactos_entrenamiento"
+SEMILLA = 42
+
+ESTRATEGIAS = ('smote', 'bootstrap', 'kde')
+CLASES_MINORITARIAS_SMOTE = {'Methane': 100, 'Methanol/Biofuels': 100}
+ANCHO_BANDA_KDE = 0.5
+
+FRACCION_PRUEBA = 0.2
+
+PARAM_GRID = {
+    'max_depth': [3, 5, 7, 10, None],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'min_impurity_decrease': [0.0, 0.1],
+}
+PARAM_GRID_BOSQUE = {
+    'n_estimators': [50, 100],
+    'max_depth': [7, 10, None],
+    'min_samples_leaf': [1, 2],
+}
+PARAM_GRID_HGB = {
+    'estimator__max_iter': [100, 200],
+    'estimator__learning_rate': [0.05, 0.1],
+    'estimator__max_leaf_nodes': [15, 31],
+}
+
+# familia -> (estimador base, grilla); HistGradientBoosting es de una sola salida
+FAMILIAS = {
+    'arbol': (DecisionTreeRegressor(random_state=SEMILLA), PARAM_GRID),
+    'bosque': (RandomForestRegressor(random_state=SEMILLA, n_jobs=1), PARAM_GRID_BOSQUE),
+    'extra': (ExtraTreesRegressor(random_state=SEMILLA, n_jobs=1), PARAM_GRID_BOSQUE),
+    'hgb': (MultiOutputRegressor(HistGradientBoostingRegressor(random_state=SEMILLA)), PARAM_GRID_HGB),
+}
+
+# Límites por defecto del modelo exportado (camino de la app: predict sobre un DataFrame)
+PRESUPUESTO = {'latencia_fila_ms': 2.0, 'latencia_lote_ms': 100.0, 'memoria_mb': 20.0}
+FILAS_LOTE = 10_000
+
+# Árboles del ensamble bootstrap para las bandas de incertidumbre
+N_ENSAMBLE = 100
+
+
+# --- Caché de etapas ---
+def _sha256_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(1 << 20), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def _guardar_json(valor, ruta):
+    os.makedirs(ruta, exist_ok=True)
+    with open(os.path.join(ruta, "valor.json"), "w", encoding="utf-8") as f:
+        json.dump(valor, f, ensure_ascii=False, indent=2)
+
+
+def _cargar_json(ruta):
+    with open(os.path.join(ruta, "valor.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _guardar_modelo(modelo, ruta):
+    os.makedirs(ruta, exist_ok=True)
+    joblib.dump(modelo, os.path.join(ruta, "modelo.pkl"))
+
+
+def _cargar_modelo(ruta):
+    return joblib.load(os.path.join(ruta, "modelo.pkl"))
+
+
+SERIALIZADORES = {
+    "tabla": (guardar_tabla, cargar_tabla),
+    "json": (_guardar_json, _cargar_json),
+    "modelo": (_guardar_modelo, _cargar_modelo),
+}
+
+
+class Etapas:
+    """Ejecuta etapas guardando su salida en disco bajo una clave de contenido."""
+
+    def __init__(self, directorio=DIRECTORIO_ARTEFACTOS, forzar=False):
+        self.directorio = os.path.join(directorio, "etapas")
+        self.forzar = forzar
+        os.makedirs(self.directorio, exist_ok=True)
+
+    @staticmethod
+    def clave(nombre, *partes):
+        texto = json.dumps([nombre, VERSION_PIPELINE, partes], sort_keys=True, default=str)
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+    def ruta(self, nombre, clave):
+        return os.path.join(self.directorio, f"{nombre}-{clave}")
+
+    def ejecutar(self, nombre, clave, tipo, funcion):
+        guardar, cargar = SERIALIZADORES[tipo]
+        ruta = self.ruta(nombre, clave)
+        if not self.forzar and os.path.exists(ruta):
+            print(f"[{nombre}] en caché ({clave})")
+            return cargar(ruta)
+
+        inicio = time.perf_counter()
+        resultado = funcion()
+        # Se escribe en un directorio temporal y se renombra: nunca queda una etapa a medias
+        temporal = tempfile.mkdtemp(prefix=f".{nombre}-", dir=self.directorio)
+        guardar(resultado, temporal)
+        shutil.rmtree(ruta, ignore_errors=True)
+        os.replace(temporal, ruta)
+        print(f"[{nombre}] {time.perf_counter() - inicio:.1f} s ({clave})")
+        return resultado
+
+
+# --- Etapas ---
+def cargar_datos(ruta, hoja=0):
+    return pd.read_excel(ruta, sheet_name=hoja)
+
+
+def _separar(df):
+    return df.drop(columns=[CLASE]), df[CLASE]
+
+
+def dividir(df):
+    """Separa las filas de prueba antes de remuestrear, para que no se filtren copias sintéticas."""
+    entrenamiento, prueba = train_test_split(df, test_size=FRACCION_PRUEBA, random_state=SEMILLA)
+    return entrenamiento.reset_index(drop=True), prueba.reset_index(drop=True)
+
+
+def parametros_remuestreo(estrategia):
+    """(objetivo, parámetros del muestreador) de cada estrategia, como en el notebook."""
+    if estrategia == 'smote':
+        return CLASES_MINORITARIAS_SMOTE, {}
+    if estrategia == 'kde':
+        return None, {'ancho_banda': ANCHO_BANDA_KDE}
+    if estrategia == 'bootstrap':
+        return None, {}
+    raise ValueError(f"Estrategia de remuestreo desconocida: {estrategia}")
+
+
+def remuestrear(df, estrategia):
+    """Sobremuestrea las clases minoritarias; devuelve la tabla completa con la columna de clase."""
+    X, y = _separar(df)
+    objetivo, parametros = parametros_remuestreo(estrategia)
+    X_res, y_res = remuestreo.remuestrear(X.to_numpy(dtype=np.float64), y.to_numpy(), estrategia, objetivo,
+                                          semilla=SEMILLA, **parametros)
+    return pd.DataFrame(X_res, columns=X.columns).assign(**{CLASE: y_res})
+
+
+def predictores_y_objetivos(df):
+    return df[COLUMNAS_MODELO], df[OBJETIVOS]
+
+
+def buscar_hiperparametros(remuestreados, familias=tuple(FAMILIAS), registro=None, procesos=None, halving=False):
+    """Una sola búsqueda para todas las estrategias y familias (ver busqueda.py)."""
+    conjuntos = {}
+    for estrategia, df in remuestreados.items():
+        X, y = predictores_y_objetivos(df)
+        conjuntos[estrategia] = (X.to_numpy(), y.to_numpy())
+    espacios = {familia: FAMILIAS[familia] for familia in familias}
+    return buscar(conjuntos, espacios, registro=registro, procesos=procesos, halving=halving)
+
+
+def ajustar(df, familia, parametros):
+    X, y = predictores_y_objetivos(df)
+    return clone(FAMILIAS[familia][0]).set_params(**parametros).fit(X, y)
+
+
+def ajustar_ensamble(df, parametros, n=N_ENSAMBLE):
+    """`n` árboles con los mismos hiperparámetros, cada uno sobre una remuestra bootstrap de `df`."""
+    X, y = predictores_y_objetivos(df)
+    rng = np.random.default_rng(SEMILLA)
+    arboles = []
+    for i in range(n):
+        filas = rng.integers(0, len(X), len(X))
+        arboles.append(DecisionTreeRegressor(**parametros, random_state=SEMILLA + i).fit(X.iloc[filas], y.iloc[filas]))
+    return arboles
+
+
+def predictor_servicio(modelo):
+    """Lo que realmente ejecuta la app: árboles, random forest y extra-trees se sirven compilados."""
+    if isinstance(modelo, DecisionTreeRegressor):
+        return ArbolCompilado.desde_sklearn(modelo)
+    if _es_arbol_o_bosque(modelo):
+        return BosqueCompilado.desde_sklearn(modelo)
+    return modelo
+
+
+def medir_servicio(modelo, df, repeticiones=50):
+    """Latencia de una fila y de un lote de FILAS_LOTE filas (mediana, ms) y tamaño serializado (MB)."""
+    X, _ = predictores_y_objetivos(df)
+    predictor = predictor_servicio(modelo)
+    fila = X.iloc[[0]]
+    lote = X.iloc[np.arange(FILAS_LOTE) % len(X)]
+    predictor.predict(fila)  # calentamiento
+
+    def mediana(X_medir, n):
+        tiempos = []
+        for _ in range(n):
+            inicio = time.perf_counter()
+            predictor.predict(X_medir)
+            tiempos.append(time.perf_counter() - inicio)
+        return float(np.median(tiempos)) * 1000
+
+    return {
+        "latencia_fila_ms": mediana(fila, repeticiones),
+        "latencia_lote_ms": mediana(lote, max(3, repeticiones // 10)),
+        "memoria_mb": len(pickle.dumps(modelo)) / 2 ** 20,
+    }
+
+
+def seleccionar(candidatos, presupuesto=PRESUPUESTO):
+    """Mejor R² medio de prueba entre los candidatos que cumplen todos los límites; None si ninguno."""
+    validos = [c for c in candidatos if all(c["servicio"][k] <= limite for k, limite in presupuesto.items())]
+    if not validos:
+        return None
+    return max(validos, key=lambda c: (c["metricas"]["r2_medio"], -c["servicio"]["latencia_fila_ms"]))
+
+
+# --- Orquestación ---
+def _remuestreo(directorio, forzar, datos, clave_datos, estrategia):
+    """Remuestreo de una estrategia (se ejecuta en un proceso del pool)."""
+    etapas = Etapas(directorio, forzar)
+    clave_r = etapas.clave("remuestreo", clave_datos, estrategia, CLASES_MINORITARIAS_SMOTE, ANCHO_BANDA_KDE, SEMILLA)
+    remuestreado = etapas.ejecutar(f"remuestreo_{estrategia}", clave_r, "tabla",
+                                   lambda: remuestrear(datos, estrategia))
+    return remuestreado, clave_r
+
+
+def preparar_datos(etapas, ruta_datos, hoja=0, imputacion="media"):
+    """Carga, limpieza e imputación; devuelve la tabla numérica, su clave y el imputador."""
+    clave_c = etapas.clave("carga", _sha256_archivo(ruta_datos), hoja)
+    crudo = etapas.ejecutar("carga", clave_c, "tabla", lambda: cargar_datos(ruta_datos, hoja))
+
+    clave_l = etapas.clave("limpieza", clave_c)
+    limpio = etapas.ejecutar("limpieza", clave_l, "tabla", lambda: limpiar(crudo))
+    print(limpio[CLASE].value_counts().to_string())
+    nulos = perfil_nulos(limpio)
+    print(nulos[nulos['null'] > 0].to_string(index=False, float_format="{:.1f}".format))
+
+    clave_i = etapas.clave("imputacion", clave_l, imputacion)
+    estado = etapas.ejecutar("imputador", clave_i, "json", lambda: Imputador(imputacion).ajustar(limpio).a_dict())
+    imputador = Imputador.desde_dict(estado)
+    imputado = etapas.ejecutar("imputacion", clave_i, "tabla",
+                               lambda: imputador.transformar(limpio).drop(columns=[AGENTE]))
+    return imputado, clave_i, imputador
+
+
+def resumen_dominio(dominio, X_prueba):
+    """Cuántas filas de prueba quedan fuera del dominio de las de entrenamiento."""
+    fuera = dominio.evaluar(X_prueba)["fuera_dominio"]
+    return {"filas_entrenamiento": len(dominio.puntos), "umbral": dominio.umbral,
+            "prueba_fuera": int(fuera.sum()), "fraccion_prueba_fuera": float(fuera.mean()) if len(fuera) else 0.0}
+
+
+def exportar(modelo_ruta, salida, metricas=None, datos_sha256=None, imputador=None, dominio=None):
+    # El modelo se publica como pickle plano más el artefacto memory-mapped con
+    # manifiesto (lo que carga la app) y, si es un árbol simple, su versión compilada.
+    # Gradient boosting (MultiOutputRegressor de HGB) no tiene compilado: solo pickle.
+    # El imputador y el dominio van al lado para rellenar y marcar igual los escenarios
+    modelo = joblib.load(modelo_ruta)
+    with open(salida, 'wb') as file:
+        pickle.dump(modelo, file)
+    if imputador is not None:
+        imputador.origen_sha256 = _sha256_archivo(salida)
+        imputador.guardar(os.path.splitext(salida)[0] + "_imputacion.json")
+    if dominio is not None:
+        dominio.origen_sha256 = _sha256_archivo(salida)
+        dominio.guardar(os.path.splitext(salida)[0] + "_dominio.npz")
+    ruta_arbol = os.path.splitext(salida)[0] + ".npz"
+    directorio_artefacto = os.path.splitext(salida)[0]
+    if isinstance(modelo, DecisionTreeRegressor):
+        exportar_arbol(salida, ruta_arbol)
+    elif os.path.exists(ruta_arbol):
+        os.remove(ruta_arbol)  # árbol de un modelo anterior
+    if _es_arbol_o_bosque(modelo):
+        exportar_artefacto(salida, directorio_artefacto, metricas, datos_sha256)
+    elif os.path.exists(os.path.join(directorio_artefacto, ARCHIVO_MANIFIESTO)):
+        shutil.rmtree(directorio_artefacto)  # artefacto de un modelo anterior
+
+
+def _es_arbol_o_bosque(modelo):
+    # Random forest y extra-trees: sus estimadores son árboles de decisión
+    return isinstance(modelo, DecisionTreeRegressor) or (
+        hasattr(modelo, "estimators_") and all(isinstance(e, DecisionTreeRegressor) for e in modelo.estimators_))
+
+
+def exportar_ensamble(arboles, salida, prueba):
+    """Guarda el ensamble junto al modelo exportado y mide la cobertura de su banda en las filas de prueba."""
+    ruta = os.path.splitext(salida)[0] + "_ensamble.npz"
+    ensamble = BosqueCompilado.desde_sklearn(arboles, _sha256_archivo(salida))
+    ensamble.guardar(ruta)
+    X, y = predictores_y_objetivos(prueba)
+    banda = f"p{PERCENTILES[0]}-p{PERCENTILES[-1]}"
+    return {"ruta": ruta, "n_arboles": len(arboles),
+            "cobertura": {banda: dict(zip(OBJETIVOS, cobertura(ensamble, X, y).tolist()))}}
+
+
+def ejecutar_pipeline(ruta_datos, hoja=0, directorio=DIRECTORIO_ARTEFACTOS, salida="regressor_bootstrap.pkl",
+                      estrategia_exportada=None, procesos=None, forzar=False, halving=False,
+                      familias=tuple(FAMILIAS), presupuesto=PRESUPUESTO, n_ensamble=N_ENSAMBLE, imputacion="media"):
+    etapas = Etapas(directorio, forzar)
+    datos, clave_datos, imputador = preparar_datos(etapas, ruta_datos, hoja, imputacion)
+
+    clave_d = etapas.clave("division", clave_datos, FRACCION_PRUEBA, SEMILLA)
+    entrenamiento, prueba = dividir(datos)
+
+    procesos = procesos or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(procesos, len(ESTRATEGIAS))) as pool:
+        futuros = {estrategia: pool.submit(_remuestreo, directorio, forzar, entrenamiento, clave_d, estrategia)
+                   for estrategia in ESTRATEGIAS}
+        remuestreados = {estrategia: futuro.result() for estrategia, futuro in futuros.items()}
+    claves_r = {estrategia: clave for estrategia, (_, clave) in remuestreados.items()}
+    remuestreados = {estrategia: df for estrategia, (df, _) in remuestreados.items()}
+
+    # Búsqueda compartida: todos los ajustes de todas las estrategias y familias en un mismo pool
+    espacios = {familia: FAMILIAS[familia] for familia in familias}
+    clave_b = etapas.clave("busqueda", claves_r, espacios, halving)
+    os.makedirs(os.path.join(directorio, "busqueda"), exist_ok=True)
+    registro = os.path.join(directorio, "busqueda", f"{clave_b}.jsonl")
+    busqueda = etapas.ejecutar("busqueda", clave_b, "json",
+                               lambda: buscar_hiperparametros(remuestreados, familias, registro, procesos, halving))
+
+    dominio = Dominio.construir(predictores_y_objetivos(entrenamiento)[0].to_numpy())
+    return finalizar(etapas, directorio, ruta_datos, clave_datos, remuestreados, claves_r, busqueda,
+                     prueba, familias, salida, estrategia_exportada, presupuesto, n_ensamble, imputador, procesos,
+                     dominio)
+
+
+def finalizar(etapas, directorio, ruta_datos, clave_datos, remuestreados, claves_r, busqueda, prueba,
+              familias, salida, estrategia_exportada=None, presupuesto=PRESUPUESTO, n_ensamble=N_ENSAMBLE,
+              imputador=None, procesos=None, dominio=None):
+    """Ajusta y evalúa cada estrategia × familia con sus mejores hiperparámetros, elige y exporta."""
+    X_prueba, y_prueba = predictores_y_objetivos(prueba)
+    X_prueba, y_prueba = X_prueba.to_numpy(dtype=np.float64), y_prueba.to_numpy(dtype=np.float64)
+    candidatos, predicciones = [], {}
+    for estrategia, remuestreado in remuestreados.items():
+        for familia in familias:
+            parametros = busqueda[estrategia][familia]["parametros"]
+            nombre = f"{estrategia}_{familia}"
+            clave_m = etapas.clave("modelo", claves_r[estrategia], familia, parametros)
+            modelo = etapas.ejecutar(f"modelo_{nombre}", clave_m, "modelo",
+                                     lambda: ajustar(remuestreado, familia, parametros))
+            predicciones[f"{estrategia} / {familia}"] = predecir(modelo, X_prueba)
+            # La latencia depende de la máquina: se mide en cada ejecución
+            candidatos.append({
+                "estrategia": estrategia,
+                "familia": familia,
+                "parametros": parametros,
+                "metricas": None,
+                "servicio": medir_servicio(modelo, prueba),
+                "modelo": os.path.join(etapas.ruta(f"modelo_{nombre}", clave_m), "modelo.pkl"),
+            })
+    # Métricas de todos los candidatos en una pasada, sobre las filas de prueba originales
+    metricas = evaluar_predicciones(y_prueba, predicciones)
+    for c in candidatos:
+        c["metricas"] = metricas[f"{c['estrategia']} / {c['familia']}"]
+
+    print(f"\nResultados sobre {len(prueba)} filas de prueba:")
+    for c in candidatos:
+        serv = c["servicio"]
+        print(f"\n{c['estrategia']} / {c['familia']}: {c['parametros']}")
+        for gas in OBJETIVOS:
+            m = c["metricas"][gas]
+            print(f"  {gas}: R^2={m['r2']:.2f}, MSE={m['mse']:.2f}, MAE={m['mae']:.2f}")
+        print(f"  1 fila {serv['latencia_fila_ms']:.3f} ms, {FILAS_LOTE} filas {serv['latencia_lote_ms']:.1f} ms, "
+              f"{serv['memoria_mb']:.2f} MB")
+
+    # Informe con gráficos de paridad; las filas de prueba quedan para evaluar otros modelos (evaluacion.py)
+    informe = os.path.join(directorio, DIRECTORIO_INFORME)
+    guardar_tabla(prueba, os.path.join(informe, "prueba"))
+    generar_informe(y_prueba, predicciones, informe, procesos)
+    print(f"\nInforme de evaluación en {os.path.join(informe, 'informe.html')}")
+
+    elegibles = [c for c in candidatos if estrategia_exportada in (None, c["estrategia"])]
+    elegido = seleccionar(elegibles, presupuesto)
+    resumen = {"datos": os.path.basename(ruta_datos), "datos_sha256": _sha256_archivo(ruta_datos),
+               "clave_datos": clave_datos, "filas_prueba": len(prueba),
+               "imputacion": None if imputador is None else imputador.estrategia,
+               "dominio": None if dominio is None else resumen_dominio(dominio, X_prueba),
+               "presupuesto": presupuesto, "exportado": None, "candidatos": candidatos}
+    if elegido is not None:
+        exportar(elegido["modelo"], salida, elegido["metricas"], resumen["datos_sha256"], imputador, dominio)
+        resumen["exportado"] = {"estrategia": elegido["estrategia"], "familia": elegido["familia"]}
+        if n_ensamble and "arbol" in busqueda[elegido["estrategia"]]:
+            # Bandas de incertidumbre: árboles con la configuración de árbol de la estrategia exportada
+            estrategia = elegido["estrategia"]
+            parametros = busqueda[estrategia]["arbol"]["parametros"]
+            clave_n = etapas.clave("ensamble", claves_r[estrategia], parametros, n_ensamble)
+            arboles = etapas.ejecutar("ensamble", clave_n, "modelo",
+                                      lambda: ajustar_ensamble(remuestreados[estrategia], parametros, n_ensamble))
+            resumen["ensamble"] = exportar_ensamble(arboles, salida, prueba)
+    with open(os.path.join(directorio, "resumen.json"), "w", encoding="utf-8") as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=2)
+
+    if elegido is None:
+        raise SystemExit(f"Ningún modelo cumple el presupuesto {presupuesto}; no se exportó nada")
+    print(f"\nModelo {elegido['estrategia']} / {elegido['familia']} exportado a {salida}")
+    if "ensamble" in resumen:
+        print(f"Ensamble de {n_ensamble} árboles exportado a {resumen['ensamble']['ruta']}")
+    return candidatos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrena el modelo de composición de syngas")
+    parser.add_argument("datos", help="Base de datos de literatura (.xlsm/.xlsx)")
+    parser.add_argument("--hoja", default=0, help="Nombre o índice de la hoja")
+    parser.add_argument("--directorio", default=DIRECTORIO_ARTEFACTOS, help="Directorio de artefactos intermedios")
+    parser.add_argument("--salida", default="regressor_bootstrap.pkl")
+    parser.add_argument("--exportar", choices=ESTRATEGIAS, default=None,
+                        help="Exportar solo modelos de esta estrategia (por defecto, la mejor)")
+    parser.add_argument("--familias", nargs="+", choices=list(FAMILIAS), default=list(FAMILIAS))
+    parser.add_argument("--latencia-fila", type=float, default=PRESUPUESTO["latencia_fila_ms"],
+                        help="Latencia máxima de una predicción (ms)")
+    parser.add_argument("--latencia-lote", type=float, default=PRESUPUESTO["latencia_lote_ms"],
+                        help=f"Latencia máxima de un lote de {FILAS_LOTE} filas (ms)")
+    parser.add_argument("--memoria", type=float, default=PRESUPUESTO["memoria_mb"],
+                        help="Tamaño máximo del modelo serializado (MB)")
+    parser.add_argument("--ensamble", type=int, default=N_ENSAMBLE,
+                        help="Árboles del ensamble bootstrap para bandas de incertidumbre (0 para omitirlo)")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--forzar", action="store_true", help="Ignorar la caché de etapas")
+    parser.add_argument("--halving", action="store_true", help="Successive halving en la búsqueda de hiperparámetros")
+    parser.add_argument("--imputacion", choices=ESTRATEGIAS_IMPUTACION, default="media",
+                        help="Relleno de las fracciones del agente por grupo de agente (ver imputacion.py)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Rehacer solo lo afectado por las filas nuevas o cambiadas (ver incremental.py)")
+    args = parser.parse_args(argv)
+
+    hoja = int(args.hoja) if str(args.hoja).isdigit() else args.hoja
+    presupuesto = {"latencia_fila_ms": args.latencia_fila, "latencia_lote_ms": args.latencia_lote,
+                   "memoria_mb": args.memoria}
+    if args.incremental:
+        from incremental import actualizar
+
+        actualizar(args.datos, hoja, args.directorio, args.salida, args.exportar, args.procesos,
+                   tuple(args.familias), presupuesto, args.ensamble, args.imputacion)
+        return
+    ejecutar_pipeline(args.datos, hoja, args.directorio, args.salida, args.exportar, args.procesos, args.forzar,
+                      args.halving, tuple(args.familias), presupuesto, args.ensamble, args.imputacion)
+
+
+if __name__ == "__main__":
+    main()
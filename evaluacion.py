@@ -0,0 +1,222 @@
+"""
+Evaluación de modelos e informe con gráficos de paridad.
+
+Las métricas (R², MSE, RMSE, MAE) de todos los modelos y objetivos se calculan
+en una sola pasada sobre un array (modelos, filas, objetivos). Las figuras
+(paridad de cada modelo y barras de cada métrica) se dibujan en paralelo en
+un pool de procesos con el backend Agg, y el informe queda en un directorio
+con los PNG, metricas.json e informe.html (las imágenes van incrustadas, así
+que el HTML se puede abrir o enviar solo).
+
+entrenamiento.py genera el informe en artefactos_entrenamiento/informe/ y
+guarda allí las filas de prueba; para evaluar otro modelo con las mismas
+filas y compararlo con los candidatos del último entrenamiento:
+
+    python evaluacion.py
+    python evaluacion.py --modelos nuevo.pkl --salida informe_nuevo
+"""
+
+import argparse
+import base64
+import html
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from calculos import COLUMNAS_MODELO, OBJETIVOS
+
+METRICAS = ("r2", "mse", "rmse", "mae")
+DIRECTORIO_INFORME = "informe"
+DPI = 120
+ETIQUETAS = {"H2_dry": "H$_2$", "CO_dry": "CO", "CH4_dry": "CH$_4$"}
+
+
+# --- Métricas ---
+def metricas(y, predicciones):
+    """
+    `y` (filas, objetivos) y `predicciones` (modelos, filas, objetivos).
+    Devuelve un dict métrica -> array (modelos, objetivos); R² como r2_score de sklearn.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    error = np.asarray(predicciones, dtype=np.float64) - y
+    cuadrados = (error ** 2).sum(axis=1)
+    total = ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Objetivo constante: 1 si la predicción es perfecta, 0 si no (igual que sklearn)
+        r2 = np.where(total > 0, 1 - cuadrados / total, np.where(cuadrados == 0, 1.0, 0.0))
+    mse = cuadrados / len(y)
+    return {"r2": r2, "mse": mse, "rmse": np.sqrt(mse), "mae": np.abs(error).mean(axis=1)}
+
+
+def evaluar_predicciones(y, predicciones, nombres_metricas=("r2", "mse", "mae")):
+    """`predicciones` es un dict nombre -> (filas, objetivos); devuelve nombre -> {gas: {...}, "r2_medio"}."""
+    nombres = list(predicciones)
+    valores = metricas(y, np.stack([predicciones[n] for n in nombres]))
+    resultado = {}
+    for i, nombre in enumerate(nombres):
+        resultado[nombre] = {gas: {m: float(valores[m][i, j]) for m in nombres_metricas}
+                             for j, gas in enumerate(OBJETIVOS)}
+        resultado[nombre]["r2_medio"] = float(valores["r2"][i].mean())
+    return resultado
+
+
+# --- Figuras (en los procesos del pool) ---
+def _inicializar():
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def figura_paridad(nombre, y, prediccion, valores, ruta):
+    import matplotlib.pyplot as plt
+
+    fig, ejes = plt.subplots(1, len(OBJETIVOS), figsize=(5 * len(OBJETIVOS), 4.6))
+    for j, (gas, ax) in enumerate(zip(OBJETIVOS, np.atleast_1d(ejes))):
+        real, predicho = y[:, j], prediccion[:, j]
+        minimo = min(real.min(), predicho.min()) - 1
+        maximo = max(real.max(), predicho.max()) + 1
+        ax.scatter(real, predicho, alpha=0.6, color="k", s=18)
+        ax.plot([minimo, maximo], [minimo, maximo], "g-", lw=1.5, zorder=0, label="y=x")
+        ax.text(0.95, 0.05, f"R2={valores['r2'][j]:.2f}\nRMSE={valores['rmse'][j]:.2f}\nMAE={valores['mae'][j]:.2f}",
+                transform=ax.transAxes, ha="right", va="bottom", bbox=dict(facecolor="white", alpha=0.5))
+        etiqueta = ETIQUETAS.get(gas, gas)
+        ax.set_xlabel(f"{etiqueta} real [vol.%]")
+        ax.set_ylabel(f"{etiqueta} predicho [vol.%]")
+        ax.set_xlim(minimo, maximo)
+        ax.set_ylim(minimo, maximo)
+        ax.legend(loc="upper left")
+    fig.suptitle(nombre)
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=DPI)
+    plt.close(fig)
+    return ruta
+
+
+def figura_barras(metrica, nombres, valores, ruta):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(min(14, max(6, 0.3 * len(nombres) * len(OBJETIVOS))), 4.5))
+    x = np.arange(len(OBJETIVOS))
+    ancho = 0.8 / len(nombres)
+    colores = plt.get_cmap("tab20")
+    for i, nombre in enumerate(nombres):
+        ax.bar(x + (i - (len(nombres) - 1) / 2) * ancho, valores[i], ancho, label=nombre, color=colores(i % 20))
+    ax.set_xticks(x, [ETIQUETAS.get(gas, gas) for gas in OBJETIVOS])
+    ax.set_ylabel(metrica.upper() if metrica != "r2" else "R$^2$")
+    ax.set_title(f"{metrica.upper() if metrica != 'r2' else 'R²'} por modelo y gas")
+    ax.legend(fontsize="small", ncol=max(1, len(nombres) // 6))
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=DPI)
+    plt.close(fig)
+    return ruta
+
+
+# --- Informe ---
+def _archivo(nombre):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in nombre.replace(" / ", "_"))
+
+
+def _html(titulo, filas, metricas_json, figuras, directorio):
+    celdas = "".join(f"<th>{html.escape(gas)} {m.upper()}</th>" for gas in OBJETIVOS for m in METRICAS)
+    cuerpo = []
+    for nombre, por_gas in metricas_json["modelos"].items():
+        valores = "".join(f"<td>{por_gas[gas][m]:.3f}</td>" for gas in OBJETIVOS for m in METRICAS)
+        cuerpo.append(f"<tr><td>{html.escape(nombre)}</td><td>{por_gas['r2_medio']:.3f}</td>{valores}</tr>")
+    imagenes = []
+    for ruta in figuras:
+        with open(os.path.join(directorio, ruta), "rb") as f:
+            datos = base64.b64encode(f.read()).decode()
+        imagenes.append(f'<figure><img src="data:image/png;base64,{datos}" alt="{html.escape(ruta)}"></figure>')
+    return f"""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>{html.escape(titulo)}</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse;font-size:0.85em}}
+td,th{{border:1px solid #ccc;padding:0.3em 0.5em;text-align:right}}td:first-child{{text-align:left}}
+img{{max-width:100%}}</style></head><body>
+<h1>{html.escape(titulo)}</h1>
+<p>{filas} filas de prueba, {len(metricas_json["modelos"])} modelos.</p>
+<table><tr><th>Modelo</th><th>R² medio</th>{celdas}</tr>
+{"".join(cuerpo)}
+</table>
+{"".join(imagenes)}
+</body></html>
+"""
+
+
+def generar_informe(y, predicciones, directorio, procesos=None, titulo="Evaluación sobre las filas de prueba"):
+    """
+    Escribe en `directorio` las figuras, metricas.json e informe.html para
+    `predicciones` (dict nombre -> array (filas, objetivos)) frente a `y`.
+    Devuelve las métricas por modelo.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    y = np.asarray(y, dtype=np.float64)
+    nombres = list(predicciones)
+    apiladas = np.stack([np.asarray(predicciones[n], dtype=np.float64) for n in nombres])
+    valores = metricas(y, apiladas)
+    metricas_json = {
+        "filas": len(y),
+        "objetivos": list(OBJETIVOS),
+        "modelos": evaluar_predicciones(y, predicciones, METRICAS),
+    }
+    with open(os.path.join(directorio, "metricas.json"), "w", encoding="utf-8") as f:
+        json.dump(metricas_json, f, ensure_ascii=False, indent=2)
+
+    # Primero las barras (comparación) y después la paridad de cada modelo
+    tareas = [(figura_barras, m, nombres, valores[m], f"barras_{m}.png") for m in ("r2", "mae", "mse")]
+    tareas += [(figura_paridad, n, y, apiladas[i], {m: valores[m][i] for m in METRICAS}, f"paridad_{_archivo(n)}.png")
+               for i, n in enumerate(nombres)]
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar) as pool:
+        futuros = [pool.submit(funcion, *argumentos[:-1], os.path.join(directorio, argumentos[-1]))
+                   for funcion, *argumentos in tareas]
+        figuras = [os.path.basename(futuro.result()) for futuro in futuros]
+
+    with open(os.path.join(directorio, "informe.html"), "w", encoding="utf-8") as f:
+        f.write(_html(titulo, len(y), metricas_json, figuras, directorio))
+    return metricas_json["modelos"]
+
+
+def predecir(modelo, X):
+    # Los modelos de sklearn se ajustaron con un DataFrame: se conservan los nombres de columna
+    if hasattr(modelo, "feature_names_in_"):
+        import pandas as pd
+
+        X = pd.DataFrame(X, columns=COLUMNAS_MODELO)
+    return np.asarray(modelo.predict(X), dtype=np.float64)
+
+
+def main(argv=None):
+    import joblib
+
+    from almacen import cargar_tabla
+
+    parser = argparse.ArgumentParser(description="Informe de evaluación sobre las filas de prueba del entrenamiento")
+    parser.add_argument("--directorio", default="artefactos_entrenamiento", help="Directorio de entrenamiento.py")
+    parser.add_argument("--modelos", nargs="*", default=[], help="Modelos (.pkl) a evaluar además de los candidatos")
+    parser.add_argument("--sin-candidatos", action="store_true", help="Evaluar solo --modelos")
+    parser.add_argument("--salida", default=None, help="Directorio del informe (por defecto, el del entrenamiento)")
+    parser.add_argument("--procesos", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    informe = os.path.join(args.directorio, DIRECTORIO_INFORME)
+    prueba = cargar_tabla(os.path.join(informe, "prueba"))
+    X, y = prueba[COLUMNAS_MODELO].to_numpy(dtype=np.float64), prueba[OBJETIVOS].to_numpy(dtype=np.float64)
+    rutas = {}
+    if not args.sin_candidatos:
+        with open(os.path.join(args.directorio, "resumen.json"), encoding="utf-8") as f:
+            for candidato in json.load(f)["candidatos"]:
+                rutas[f"{candidato['estrategia']} / {candidato['familia']}"] = candidato["modelo"]
+    rutas.update({os.path.basename(ruta): ruta for ruta in args.modelos})
+    predicciones = {nombre: predecir(joblib.load(ruta), X) for nombre, ruta in rutas.items()}
+    resultado = generar_informe(y, predicciones, args.salida or informe, args.procesos)
+    for nombre, valores in sorted(resultado.items(), key=lambda x: -x[1]["r2_medio"]):
+        print(f"{nombre:<30} R² medio {valores['r2_medio']:.3f}")
+    print(f"Informe en {os.path.join(args.salida or informe, 'informe.html')} "
+          f"({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
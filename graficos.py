@@ -0,0 +1,68 @@
+"""
+Gráficos de pastel de la composición de la biomasa, renderizados una sola vez.
+
+Las dos figuras dependen solo de la biomasa y de la humedad, así que los PNG
+se guardan en una caché LRU por proceso (compartida entre reruns y sesiones de
+Streamlit) con la composición rebalanceada como clave: mover la temperatura o
+el agente no vuelve a dibujarlos, y si cambia la tabla de biomasas cambia la
+clave. Cada figura se cierra después de guardarse, para que no se acumulen en
+pyplot.
+"""
+
+import io
+from functools import lru_cache
+
+MAX_GRAFICOS = 256
+DPI = 200  # el mismo que usa st.pyplot
+
+
+def composicion_ultimo(fila_biomasa, humedad):
+    return {
+        "C": fila_biomasa["C_norm"],
+        "H": fila_biomasa["H_norm"],
+        "O": fila_biomasa["O_norm"],
+        "N + S + Cl": fila_biomasa["N_norm"] + fila_biomasa["S_norm"] + fila_biomasa["Cl_norm"],
+        "Cenizas": fila_biomasa["Ash [%] _norm"],
+        "Humedad": humedad,
+    }
+
+
+def composicion_proximo(fila_biomasa, humedad):
+    return {
+        "FC": fila_biomasa["FC [%] _norm"],
+        "VM": fila_biomasa["VM [%] _norm"],
+        "Cenizas": fila_biomasa["Ash [%] _norm"],
+        "Humedad": humedad,
+    }
+
+
+@lru_cache(maxsize=MAX_GRAFICOS)
+def _pastel_png(etiquetas, valores):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    try:
+        ax.pie(valores, labels=etiquetas, autopct='%1.1f%%')
+        ax.axis('equal')
+        salida = io.BytesIO()
+        fig.savefig(salida, format="png", dpi=DPI, bbox_inches="tight")
+    finally:
+        plt.close(fig)
+    return salida.getvalue()
+
+
+def pastel_png(composicion):
+    """PNG del gráfico de pastel de `composicion` (etiqueta -> valor)."""
+    # Con los valores redondeados, la misma biomasa y humedad dan siempre la misma clave
+    return _pastel_png(tuple(composicion), tuple(round(float(v), 10) for v in composicion.values()))
+
+
+def pasteles_biomasa(fila_biomasa, humedad):
+    """(PNG análisis último, PNG análisis próximo) de una biomasa rebalanceada a `humedad`."""
+    return (pastel_png(composicion_ultimo(fila_biomasa, humedad)),
+            pastel_png(composicion_proximo(fila_biomasa, humedad)))
+
+
+def estadisticas():
+    info = _pastel_png.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "entradas": info.currsize}
@@ -0,0 +1,191 @@
+"""
+Imputación de las fracciones del agente gasificante por grupo de agente.
+
+Cada celda faltante de O2, N2 o vapor se rellena con un estadístico de las
+filas de su mismo agente (Air, Steam, ...):
+
+- "media" / "mediana": un groupby sobre la tabla da el estadístico de cada
+  agente y columna; si el agente no tiene valores (o no se conoce) se usa el
+  de toda la tabla;
+- "knn": media de los k vecinos más cercanos del mismo agente que sí tienen
+  el valor, con distancia euclídea sobre las columnas del modelo presentes en
+  ambas filas (como KNNImputer de sklearn), escaladas por su desviación.
+
+El imputador ajustado se guarda como JSON junto al modelo exportado
+(regressor_bootstrap_imputacion.json, con el sha256 del pickle) y
+prediccion_lote.py lo aplica a los escenarios con valores faltantes, así que
+entrenamiento y lotes rellenan igual.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from calculos import COLUMNAS_MODELO
+from limpieza import AGENTE
+
+ESTRATEGIAS_IMPUTACION = ("media", "mediana", "knn")
+COLUMNAS_AGENTE = ['O2_gasifying agent (wt/wt)', 'N2_gasifying agent (wt/wt)', 'Steam_gasifying agent (wt/wt)']
+K_VECINOS = 5
+FILAS_BLOQUE = 4096
+RUTA_IMPUTACION = "regressor_bootstrap_imputacion.json"
+# Agentes de la app -> agente de la base de literatura
+GRUPOS_APP = {"Aire": "Air", "Oxígeno": "Oxygen", "Vapor de agua": "Steam"}
+_AGREGACIONES = {"media": "mean", "mediana": "median", "knn": "mean"}
+
+
+class Imputador:
+    def __init__(self, estrategia="media", k=K_VECINOS):
+        if estrategia not in ESTRATEGIAS_IMPUTACION:
+            raise ValueError(f"Estrategia de imputación desconocida: {estrategia}")
+        self.estrategia = estrategia
+        self.k = k
+        self.grupos = []
+        # Fila i: estadísticos del grupo i; última fila: los de toda la tabla
+        self.estadisticos = np.empty((1, len(COLUMNAS_AGENTE)))
+        self.escala = np.ones(len(COLUMNAS_MODELO))
+        self.referencia = {}
+        # sha256 del pickle con el que se exportó (lo fija entrenamiento.exportar)
+        self.origen_sha256 = ""
+
+    # --- Ajuste ---
+    def ajustar(self, df, grupos=None):
+        """
+        Estadísticos por agente de `df` (tabla limpia, con la columna del agente).
+        Con `grupos` solo se recalculan esos agentes y se conservan los demás.
+        """
+        agregacion = _AGREGACIONES[self.estrategia]
+        por_grupo = df.groupby(AGENTE)[COLUMNAS_AGENTE].agg(agregacion)
+        anteriores = dict(zip(self.grupos, self.estadisticos[:-1]))
+        nuevos = {g: fila for g, fila in zip(por_grupo.index, por_grupo.to_numpy(dtype=np.float64))
+                  if grupos is None or g in grupos}
+        if grupos is not None:
+            nuevos = {**{g: v for g, v in anteriores.items() if g in set(por_grupo.index)}, **nuevos}
+        self.grupos = sorted(nuevos)
+        total = df[COLUMNAS_AGENTE].agg(agregacion).to_numpy(dtype=np.float64)
+        self.estadisticos = np.vstack([nuevos[g] for g in self.grupos] + [total])
+        if self.estrategia == "knn":
+            X = df[COLUMNAS_MODELO].to_numpy(dtype=np.float64)
+            escala = np.nanstd(X, axis=0)
+            self.escala = np.where(np.isfinite(escala) & (escala > 0), escala, 1.0)
+            etiquetas = df[AGENTE].to_numpy()
+            self.referencia = {g: X[etiquetas == g] for g in self.grupos}
+        return self
+
+    # --- Relleno ---
+    def _codigos(self, grupos):
+        codigos = pd.Index(self.grupos).get_indexer(np.asarray(grupos, dtype=object))
+        # Agente desconocido: la última fila (estadísticos de toda la tabla)
+        return np.where(codigos < 0, len(self.grupos), codigos)
+
+    def completar(self, X, grupos):
+        """Rellena en su lugar las fracciones faltantes de `X` (n, columnas del modelo) y la devuelve."""
+        indices = [COLUMNAS_MODELO.index(c) for c in COLUMNAS_AGENTE]
+        faltantes = np.isnan(X[:, indices])
+        if not faltantes.any():
+            return X
+        codigos = self._codigos(grupos)
+        estadisticos = np.where(np.isnan(self.estadisticos), self.estadisticos[-1], self.estadisticos)
+        if self.estrategia == "knn":
+            valores = self._vecinos(X, codigos, indices, faltantes)
+            valores = np.where(np.isnan(valores), estadisticos[codigos], valores)
+        else:
+            valores = estadisticos[codigos]
+        for j, col in enumerate(indices):
+            X[:, col] = np.where(faltantes[:, j], valores[:, j], X[:, col])
+        return X
+
+    def _vecinos(self, X, codigos, indices, faltantes):
+        valores = np.full((len(X), len(indices)), np.nan)
+        filas = np.flatnonzero(faltantes.any(axis=1))
+        for codigo in np.unique(codigos[filas]):
+            if codigo == len(self.grupos):
+                continue  # sin grupo: se queda con el estadístico global
+            referencia = self.referencia[self.grupos[codigo]] / self.escala
+            del_grupo = filas[codigos[filas] == codigo]
+            for inicio in range(0, len(del_grupo), FILAS_BLOQUE):
+                bloque = del_grupo[inicio:inicio + FILAS_BLOQUE]
+                distancias = _distancia_nan(X[bloque] / self.escala, referencia)
+                for j, col in enumerate(indices):
+                    # Vecinos posibles: filas de referencia con el valor
+                    con_valor = ~np.isnan(referencia[:, col])
+                    if not con_valor.any():
+                        continue
+                    d = np.where(con_valor, distancias, np.inf)
+                    k = min(self.k, int(con_valor.sum()))
+                    cercanos = np.argpartition(d, k - 1, axis=1)[:, :k]
+                    valores[bloque, j] = (referencia[cercanos, col] * self.escala[col]).mean(axis=1)
+        return valores
+
+    def transformar(self, df):
+        """Copia de `df` con las fracciones faltantes rellenas."""
+        X = self.completar(df[COLUMNAS_MODELO].to_numpy(dtype=np.float64, copy=True), df[AGENTE].to_numpy())
+        df = df.copy()
+        for col in COLUMNAS_AGENTE:
+            df[col] = X[:, COLUMNAS_MODELO.index(col)]
+        return df
+
+    # --- Serialización ---
+    def a_dict(self):
+        estado = {
+            "estrategia": self.estrategia,
+            "k": self.k,
+            "columnas": COLUMNAS_AGENTE,
+            "grupos": self.grupos,
+            "estadisticos": _lista(self.estadisticos),
+            "origen_sha256": self.origen_sha256,
+        }
+        if self.estrategia == "knn":
+            estado["escala"] = self.escala.tolist()
+            estado["referencia"] = {g: _lista(filas) for g, filas in self.referencia.items()}
+        return estado
+
+    @classmethod
+    def desde_dict(cls, estado):
+        if estado["columnas"] != COLUMNAS_AGENTE:
+            raise ValueError("El imputador se ajustó con otras columnas")
+        imputador = cls(estado["estrategia"], estado["k"])
+        imputador.grupos = list(estado["grupos"])
+        imputador.estadisticos = _matriz(estado["estadisticos"], len(COLUMNAS_AGENTE))
+        imputador.origen_sha256 = estado.get("origen_sha256", "")
+        if imputador.estrategia == "knn":
+            imputador.escala = np.asarray(estado["escala"], dtype=np.float64)
+            imputador.referencia = {g: _matriz(filas, len(COLUMNAS_MODELO))
+                                    for g, filas in estado["referencia"].items()}
+        return imputador
+
+    def guardar(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.a_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with open(ruta, encoding="utf-8") as f:
+            return cls.desde_dict(json.load(f))
+
+
+def _distancia_nan(A, B):
+    """Distancia euclídea con NaN (nan_euclidean de sklearn): solo coordenadas presentes en ambas filas."""
+    presentes_a, presentes_b = ~np.isnan(A), ~np.isnan(B)
+    A0, B0 = np.where(presentes_a, A, 0.0), np.where(presentes_b, B, 0.0)
+    cuadrados = ((A0 ** 2) @ presentes_b.T + presentes_a @ (B0 ** 2).T - 2 * A0 @ B0.T)
+    comunes = presentes_a.astype(np.float64) @ presentes_b.T.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        distancias = np.sqrt(np.maximum(cuadrados, 0) * A.shape[1] / comunes)
+    return np.where(comunes > 0, distancias, np.inf)
+
+
+def _lista(matriz):
+    # JSON no tiene NaN estándar: se guardan como null
+    return [[None if np.isnan(v) else float(v) for v in fila] for fila in np.asarray(matriz)]
+
+
+def _matriz(filas, columnas):
+    return np.array(filas, dtype=np.float64).reshape(-1, columnas)
+
+
+def imputar(df, estrategia="media"):
+    """Ajusta un imputador sobre `df` y devuelve (tabla rellena, imputador)."""
+    imputador = Imputador(estrategia).ajustar(df)
+    return imputador.transformar(df), imputador
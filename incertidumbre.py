@@ -0,0 +1,57 @@
+"""
+Predicción con bandas de incertidumbre a partir de un ensamble bootstrap.
+
+El ensamble son N árboles con la configuración del modelo exportado, cada uno
+ajustado sobre una remuestra bootstrap de los datos de entrenamiento
+(entrenamiento.py --ensamble N), guardados como un solo BosqueCompilado en
+regressor_bootstrap_ensamble.npz. Todos los miembros se evalúan en una pasada;
+H2/CO, energía y aplicación se calculan por miembro y de ahí salen los
+percentiles y la probabilidad de cada aplicación.
+"""
+
+import numpy as np
+import pandas as pd
+
+from calculos import (
+    APLICACIONES, aplicacion_columnas, calcular_energia_syngas, relacion_h2_co_columnas,
+)
+
+PERCENTILES = (5, 50, 95)
+VARIABLES = ["H2", "CO", "CH4", "H2/CO", "Energía"]
+
+
+def predecir_bandas(ensamble, X, percentiles=PERCENTILES):
+    """
+    Devuelve (bandas, probabilidades):
+    - bandas[variable] = dict con "media" y "p<k>" por percentil, arrays de forma (n_filas,).
+    - probabilidades[aplicacion] = fracción de miembros que sugieren esa aplicación, forma (n_filas,).
+    """
+    miembros = ensamble.predict_miembros(X)  # (n_arboles, n_filas, 3)
+    h2, co, ch4 = miembros[..., 0], miembros[..., 1], miembros[..., 2]
+    relacion = relacion_h2_co_columnas(h2, co)
+    valores = {"H2": h2, "CO": co, "CH4": ch4, "H2/CO": relacion,
+               "Energía": calcular_energia_syngas(h2, co, ch4)}
+
+    cuantiles = {variable: np.percentile(v, percentiles, axis=0) for variable, v in valores.items()}
+    bandas = {}
+    for variable, v in valores.items():
+        bandas[variable] = {"media": v.mean(axis=0)}
+        bandas[variable].update({f"p{p}": cuantiles[variable][i] for i, p in enumerate(percentiles)})
+
+    aplicaciones = aplicacion_columnas(relacion, valores["Energía"])
+    probabilidades = {aplicacion: (aplicaciones == aplicacion).mean(axis=0) for aplicacion in APLICACIONES}
+    return bandas, probabilidades
+
+
+def tabla_bandas(bandas, fila=0):
+    """Bandas de una fila como tabla (variables × estadísticos) para mostrar en la app."""
+    return pd.DataFrame({variable: {estadistico: float(v[fila]) for estadistico, v in estadisticos.items()}
+                         for variable, estadisticos in bandas.items()}).T
+
+
+def cobertura(ensamble, X, y, inferior=PERCENTILES[0], superior=PERCENTILES[-1]):
+    """Fracción de valores reales dentro de la banda [inferior, superior] por objetivo."""
+    miembros = ensamble.predict_miembros(X)
+    bajo, alto = np.percentile(miembros, [inferior, superior], axis=0)
+    y = np.asarray(y, dtype=np.float64)
+    return ((y >= bajo) & (y <= alto)).mean(axis=0)
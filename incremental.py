@@ -0,0 +1,279 @@
+"""
+Reentrenamiento incremental cuando crece la base de literatura.
+
+Cada fila de la base se identifica por una huella (hash de sus columnas
+usadas). Al volver a entrenar se compara con el estado guardado en
+artefactos_entrenamiento/incremental/ y solo se rehace lo afectado:
+
+- limpieza: solo de las filas nuevas o cambiadas;
+- imputación: solo los estadísticos de los agentes que tienen filas
+  añadidas o eliminadas; los demás se reutilizan;
+- división: por huella (una fila siempre cae del mismo lado), así que añadir
+  filas no mueve las existentes entre entrenamiento y prueba;
+- remuestreo: cada clase se identifica por el hash de sus filas; si no
+  cambió, se reutilizan sus filas sintéticas (y solo se generan las que falten
+  si el objetivo creció);
+- búsqueda: parte de los mejores hiperparámetros anteriores y evalúa sus
+  vecinos en la grilla, moviéndose mientras alguno mejore, en lugar de la
+  grilla completa.
+
+El ajuste final, la evaluación y la exportación son los de entrenamiento.py.
+La primera ejecución construye el estado desde cero (grilla completa).
+
+    python entrenamiento.py "DATABASE BIOMASA RESIDUAL FINAL COPIA.xlsm" --incremental
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import ParameterGrid
+
+import remuestreo
+from almacen import cargar_tabla, guardar_tabla
+from busqueda import PLIEGUES, buscar
+from dominio import Dominio
+from entrenamiento import (
+    DIRECTORIO_ARTEFACTOS, ESTRATEGIAS, FAMILIAS, FRACCION_PRUEBA, N_ENSAMBLE, PRESUPUESTO, SEMILLA,
+    Etapas, _separar, _sha256_archivo, cargar_datos, finalizar, parametros_remuestreo, predictores_y_objetivos,
+)
+from imputacion import Imputador
+from limpieza import AGENTE, CLASE, COLUMNAS_SELECCIONADAS, limpiar
+
+VERSION_ESTADO = 2
+BLOQUE_SINTETICAS = 1024
+PARTES_PRUEBA = 10_000
+COLUMNAS_HUELLA = [c for c in COLUMNAS_SELECCIONADAS if c != CLASE]
+
+
+def _sha(*partes):
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(parte if isinstance(parte, bytes) else json.dumps(parte, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+# --- Filas ---
+def huellas(df):
+    """Hash de 64 bits de cada fila (solo las columnas que usa el pipeline)."""
+    return pd.util.hash_pandas_object(df[COLUMNAS_HUELLA], index=False).to_numpy()
+
+
+def _con_ocurrencia(h):
+    # Filas idénticas repetidas: (huella, n-ésima aparición) las distingue
+    return pd.MultiIndex.from_arrays([h, pd.Series(h).groupby(h).cumcount().to_numpy()])
+
+
+def comparar(anteriores, nuevas):
+    """Máscaras (conservadas entre las anteriores, añadidas entre las nuevas)."""
+    viejas, actuales = _con_ocurrencia(anteriores), _con_ocurrencia(nuevas)
+    return viejas.isin(actuales), ~actuales.isin(viejas)
+
+
+def es_prueba(h):
+    """División estable por huella: la misma fila siempre cae del mismo lado."""
+    return (h % PARTES_PRUEBA) < int(FRACCION_PRUEBA * PARTES_PRUEBA)
+
+
+# --- Remuestreo por clase ---
+def _archivo_clase(directorio, estrategia, clave):
+    return os.path.join(directorio, f"{estrategia}-{clave[:16]}.npy")
+
+
+def remuestrear_clases(df, estrategia, previo, directorio):
+    """
+    Como entrenamiento.remuestrear, pero con las filas sintéticas de cada clase
+    guardadas por el hash de sus filas. Devuelve (tabla, estado de las clases,
+    filas sintéticas generadas en esta llamada).
+    """
+    X, y = _separar(df)
+    X_num, y_num = X.to_numpy(dtype=np.float64), y.to_numpy()
+    objetivo, parametros = parametros_remuestreo(estrategia)
+    partes_X, partes_y = [X_num], [y_num]
+    estado, generadas = {}, 0
+    for cls, n in remuestreo.filas_a_generar(y_num, objetivo).items():
+        X_cls = np.ascontiguousarray(X_num[y_num == cls])
+        clave = _sha(estrategia, parametros, X_cls.tobytes())
+        ruta = _archivo_clase(directorio, estrategia, clave)
+        anterior = previo.get(cls)
+        guardadas = (np.load(ruta) if anterior and anterior["clave"] == clave and os.path.exists(ruta)
+                     else np.empty((0, X_num.shape[1])))
+        if len(guardadas) < n:
+            muestreador = remuestreo.ajustado(estrategia, X_cls, **parametros)
+            semilla = [SEMILLA, int(clave[:8], 16)]
+            extra = remuestreo.generar_rango(muestreador, len(guardadas), n, semilla, BLOQUE_SINTETICAS)
+            generadas += len(extra)
+            guardadas = np.concatenate([guardadas, extra])
+            temporal = ruta + ".tmp.npy"
+            np.save(temporal, guardadas)
+            os.replace(temporal, ruta)
+        partes_X.append(guardadas[:n])
+        partes_y.append(np.full(n, cls, dtype=y_num.dtype))
+        estado[cls] = {"clave": clave, "n": n}
+    tabla = pd.DataFrame(np.concatenate(partes_X), columns=X.columns).assign(**{CLASE: np.concatenate(partes_y)})
+    return tabla, estado, generadas
+
+
+# --- Búsqueda con arranque en caliente ---
+def vecinos(grid, parametros):
+    """El punto y sus vecinos en la grilla (cada parámetro una posición arriba o abajo)."""
+    puntos = [dict(parametros)]
+    for nombre, valores in grid.items():
+        i = valores.index(parametros[nombre])
+        for j in (i - 1, i + 1):
+            if 0 <= j < len(valores):
+                puntos.append({**parametros, nombre: valores[j]})
+    return puntos
+
+
+def buscar_desde(conjuntos, familias, mejores, registro, procesos=None):
+    """
+    Búsqueda local desde `mejores[estrategia][familia]`: en cada ronda se
+    evalúan los vecinos de los mejores actuales y se repite mientras alguno
+    cambie. Los ajustes se guardan en `registro`, así que un punto ya evaluado
+    no se vuelve a ajustar. Devuelve el mismo formato que busqueda.buscar.
+    """
+    actuales = {(e, f): mejores[e][f] for e in conjuntos for f in familias}
+    while True:
+        espacios = {}
+        for familia in familias:
+            estimador, grid = FAMILIAS[familia]
+            puntos = {}
+            for estrategia in conjuntos:
+                for punto in vecinos(grid, actuales[estrategia, familia]):
+                    puntos[json.dumps(punto, sort_keys=True)] = {k: [v] for k, v in punto.items()}
+            # Orden fijo de los puntos: ante empates siempre gana el mismo y la búsqueda termina
+            espacios[familia] = (estimador, [puntos[k] for k in sorted(puntos)])
+        resultado = buscar(conjuntos, espacios, registro=registro, procesos=procesos)
+        nuevos = {(e, f): resultado[e][f]["parametros"] for e, f in actuales}
+        if nuevos == actuales:
+            return resultado
+        actuales = nuevos
+
+
+def _completa(mejores, familias):
+    """Hay mejores anteriores para todo y siguen dentro de las grillas actuales."""
+    return all(f in mejores.get(e, {})
+               and all(mejores[e][f].get(p) in v for p, v in FAMILIAS[f][1].items())
+               and set(mejores[e][f]) == set(FAMILIAS[f][1])
+               for e in ESTRATEGIAS for f in familias)
+
+
+# --- Estado ---
+def _leer_estado(directorio):
+    ruta = os.path.join(directorio, "estado.json")
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        estado = json.load(f)
+    return estado if estado.get("version") == VERSION_ESTADO else None
+
+
+def _escribir_estado(directorio, estado):
+    temporal = os.path.join(directorio, "estado.json.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, os.path.join(directorio, "estado.json"))
+
+
+def actualizar(ruta_datos, hoja=0, directorio=DIRECTORIO_ARTEFACTOS, salida="regressor_bootstrap.pkl",
+               estrategia_exportada=None, procesos=None, familias=tuple(FAMILIAS), presupuesto=PRESUPUESTO,
+               n_ensamble=N_ENSAMBLE, imputacion="media"):
+    inicio = time.perf_counter()
+    etapas = Etapas(directorio)
+    base = os.path.join(directorio, "incremental")
+    sinteticas = os.path.join(base, "sinteticas")
+    os.makedirs(sinteticas, exist_ok=True)
+    estado = _leer_estado(base) or {"version": VERSION_ESTADO, "limpio": None, "imputador": None,
+                                    "clases": {}, "mejores": {}}
+
+    clave_c = etapas.clave("carga", _sha256_archivo(ruta_datos), hoja)
+    crudo = etapas.ejecutar("carga", clave_c, "tabla", lambda: cargar_datos(ruta_datos, hoja))
+    h_nuevas = huellas(crudo)
+
+    # Limpieza: solo las filas nuevas o cambiadas
+    if estado["limpio"]:
+        anterior = cargar_tabla(os.path.join(base, estado["limpio"]))
+        # El almacén guarda los textos faltantes como ""
+        anterior[AGENTE] = anterior[AGENTE].replace("", np.nan)
+        h_anteriores = np.load(os.path.join(base, estado["limpio"], "huellas.npy"))
+    else:
+        anterior, h_anteriores = None, np.empty(0, dtype=np.uint64)
+    conservadas, anadidas = comparar(h_anteriores, h_nuevas)
+    nuevas = limpiar(crudo[anadidas]) if anadidas.any() else None
+    quitadas = anterior[~conservadas] if anterior is not None else None
+    limpio = pd.concat([anterior[conservadas] if anterior is not None else None, nuevas], ignore_index=True)
+    h_limpio = np.concatenate([h_anteriores[conservadas], h_nuevas[anadidas]])
+    print(f"[filas] {len(limpio)} filas: {int(anadidas.sum())} nuevas o cambiadas, "
+          f"{int((~conservadas).sum())} eliminadas o cambiadas")
+
+    # Imputación: solo los estadísticos de los agentes con filas añadidas o eliminadas
+    previo = estado["imputador"]
+    if previo and previo["estrategia"] == imputacion:
+        imputador = Imputador.desde_dict(previo)
+        agentes = {a for df in (nuevas, quitadas) if df is not None for a in df[AGENTE]}
+        imputador.ajustar(limpio, agentes)
+    else:
+        imputador, agentes = Imputador(imputacion).ajustar(limpio), None
+    recalculados = "todos" if agentes is None else ", ".join(sorted(map(str, agentes))) or "ninguno"
+    print(f"[imputacion] agentes recalculados: {recalculados}")
+    datos = imputador.transformar(limpio).drop(columns=[AGENTE])
+
+    prueba_mascara = es_prueba(h_limpio)
+    entrenamiento, prueba = datos[~prueba_mascara].reset_index(drop=True), datos[prueba_mascara].reset_index(drop=True)
+    clave_datos = _sha(pd.util.hash_pandas_object(datos, index=False).to_numpy().tobytes())
+    clave_d = _sha("division", clave_datos, prueba_mascara.tobytes())
+
+    # Remuestreo por clase
+    remuestreados, claves_r, clases = {}, {}, {}
+    for estrategia in ESTRATEGIAS:
+        tabla, clases[estrategia], generadas = remuestrear_clases(
+            entrenamiento, estrategia, estado["clases"].get(estrategia, {}), sinteticas)
+        remuestreados[estrategia] = tabla
+        claves_r[estrategia] = _sha(estrategia, clave_d, clases[estrategia])[:16]
+        print(f"[remuestreo_{estrategia}] {len(tabla)} filas, {generadas} sintéticas nuevas")
+
+    # Búsqueda: local desde los mejores anteriores, o completa la primera vez
+    conjuntos = {}
+    for estrategia, df in remuestreados.items():
+        X, y = predictores_y_objetivos(df)
+        conjuntos[estrategia] = (X.to_numpy(), y.to_numpy())
+    os.makedirs(os.path.join(directorio, "busqueda"), exist_ok=True)
+    registro = os.path.join(directorio, "busqueda", f"incremental-{_sha(claves_r)[:16]}.jsonl")
+    if _completa(estado["mejores"], familias):
+        busqueda = buscar_desde(conjuntos, familias, estado["mejores"], registro, procesos)
+    else:
+        busqueda = buscar(conjuntos, {f: FAMILIAS[f] for f in familias}, registro=registro, procesos=procesos)
+    evaluados = sum(r["evaluados"] for por_familia in busqueda.values() for r in por_familia.values())
+    completa = sum(len(ParameterGrid(FAMILIAS[f][1])) for f in familias) * PLIEGUES * len(conjuntos)
+    print(f"[busqueda] {evaluados} ajustes de validación cruzada (grilla completa: {completa})")
+
+    dominio = Dominio.construir(predictores_y_objetivos(entrenamiento)[0].to_numpy())
+    candidatos = finalizar(etapas, directorio, ruta_datos, clave_datos[:16], remuestreados, claves_r,
+                           busqueda, prueba, familias, salida, estrategia_exportada, presupuesto, n_ensamble,
+                           imputador, procesos, dominio)
+
+    # El estado nuevo se escribe al final: si algo falla, la próxima ejecución parte del anterior
+    nombre_limpio = f"limpio-{clave_datos[:16]}"
+    if nombre_limpio != estado["limpio"]:
+        guardar_tabla(limpio, os.path.join(base, nombre_limpio))
+        np.save(os.path.join(base, nombre_limpio, "huellas.npy"), h_limpio)
+    mejores = {e: {**estado["mejores"].get(e, {}), **{f: r["parametros"] for f, r in por_familia.items()}}
+               for e, por_familia in busqueda.items()}
+    anterior_limpio = estado["limpio"]
+    _escribir_estado(base, {"version": VERSION_ESTADO, "limpio": nombre_limpio, "imputador": imputador.a_dict(),
+                            "clases": clases, "mejores": mejores})
+    if anterior_limpio and anterior_limpio != nombre_limpio:
+        shutil.rmtree(os.path.join(base, anterior_limpio), ignore_errors=True)
+    # Filas sintéticas de clases que ya no existen
+    vigentes = {os.path.basename(_archivo_clase(sinteticas, e, c["clave"]))
+                for e, por_clase in clases.items() for c in por_clase.values()}
+    for archivo in os.listdir(sinteticas):
+        if archivo not in vigentes:
+            os.remove(os.path.join(sinteticas, archivo))
+    print(f"Actualización incremental en {time.perf_counter() - inicio:.1f} s")
+    return candidatos
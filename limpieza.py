@@ -0,0 +1,90 @@
+"""
+Limpieza y etiquetado de la base de literatura, por columnas.
+
+Hace lo mismo que el notebook sin recorrer filas en Python:
+
+- los textos se normalizan sobre sus valores únicos (agentes y referencias se
+  repiten mucho) y se vuelven a expandir con los códigos de `pd.factorize`;
+- la aplicación final de cada fila sale de `calculos.aplicacion_columnas`
+  (np.select) con el criterio de literatura, la misma regla que la app usa en
+  `sugerir_aplicacion` con otros límites;
+- el perfil de nulos y tipos se calcula en una pasada sobre toda la tabla.
+
+    python limpieza.py "DATABASE BIOMASA RESIDUAL FINAL COPIA.xlsm"
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from calculos import COLUMNAS_MODELO, CRITERIO_LITERATURA, aplicacion_columnas, clasificar_aplicacion
+
+AGENTE = 'Gasifying agent '
+CLASE = 'End-use application'
+H2_CO = 'H2 to CO ratio'
+ENERGIA = 'Fuel gas energy content HHV (d.b.) [MJ/m3]'
+COLUMNAS_SELECCIONADAS = (
+    ['Gasification temperature [°C]', AGENTE] + COLUMNAS_MODELO[1:]
+    + ['H2_dry', 'CH4_dry', 'CO_dry', ENERGIA, H2_CO, CLASE]
+)
+
+
+def categorize_syngas(h2_co, fuel_energy):
+    return clasificar_aplicacion(h2_co, fuel_energy, CRITERIO_LITERATURA)
+
+
+def _es_texto(serie):
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+
+def normalizar_texto(serie):
+    """`serie.str.strip()` aplicado solo a los valores distintos."""
+    codigos, unicos = pd.factorize(serie)
+    limpios = pd.Series(unicos).str.strip()
+    return pd.Series(limpios.array.take(codigos, allow_fill=True), index=serie.index, name=serie.name)
+
+
+def etiquetar(df):
+    """Aplicación final de cada fila según su H2/CO y energía."""
+    return aplicacion_columnas(df[H2_CO].to_numpy(dtype=np.float64), df[ENERGIA].to_numpy(dtype=np.float64),
+                               CRITERIO_LITERATURA)
+
+
+def limpiar(df):
+    # Solo las columnas que usa el pipeline: el resto no se normaliza
+    df = df[[c for c in COLUMNAS_SELECCIONADAS if c != CLASE]].copy()
+    for column in df.columns:
+        if _es_texto(df[column]):
+            df[column] = normalizar_texto(df[column])
+    df[CLASE] = etiquetar(df)
+    return df
+
+
+def perfil_nulos(df):
+    """Nulos, total, porcentaje y tipo de cada columna (la tabla df_null del notebook)."""
+    nulos = df.isna().sum()
+    return pd.DataFrame({
+        'column': df.columns,
+        'null': nulos.to_numpy(),
+        'total': len(df),
+        '%': nulos.to_numpy() / max(len(df), 1) * 100,
+        'dtype': df.dtypes.astype(str).to_numpy(),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Limpia y etiqueta la base de literatura")
+    parser.add_argument("datos", help="Base de datos de literatura (.xlsm/.xlsx)")
+    parser.add_argument("--hoja", default=0, help="Nombre o índice de la hoja")
+    args = parser.parse_args(argv)
+
+    hoja = int(args.hoja) if str(args.hoja).isdigit() else args.hoja
+    limpio = limpiar(pd.read_excel(args.datos, sheet_name=hoja))
+    print(limpio[CLASE].value_counts().to_string())
+    print()
+    print(perfil_nulos(limpio).to_string(index=False, float_format="{:.1f}".format))
+
+
+if __name__ == "__main__":
+    main()
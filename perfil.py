@@ -0,0 +1,113 @@
+"""
+Perfil de arranque de la app.
+
+Con PERFIL_ARRANQUE=1 (o `streamlit run app.py -- --perfil`) app.py mide el
+tiempo de cada etapa de una ejecución (importaciones, carga del modelo, lectura
+de la tabla de biomasas y primer render), lo muestra en la barra lateral y lo
+escribe en stderr como una línea "perfil_arranque {...}". Solo usa la
+biblioteca estándar para poder importarse antes que todo lo demás.
+
+Desde la línea de comandos se mide el arranque en frío: cada repetición es un
+proceso nuevo que ejecuta la app sin servidor (streamlit.testing) con
+`-X importtime`, y se informa la mediana de cada etapa y los módulos que más
+tardan en importarse:
+
+    python perfil.py --repeticiones 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ACTIVO = os.environ.get("PERFIL_ARRANQUE") == "1" or "--perfil" in sys.argv
+PREFIJO = "perfil_arranque "
+
+
+class Cronometro:
+    def __init__(self):
+        self.inicio = self._ultima = time.perf_counter()
+        self.etapas = {}
+
+    def marca(self, etapa):
+        """Cierra `etapa` con el tiempo transcurrido desde la marca anterior."""
+        ahora = time.perf_counter()
+        self.etapas[etapa] = self.etapas.get(etapa, 0.0) + (ahora - self._ultima) * 1000
+        self._ultima = ahora
+
+    def total(self):
+        return (self._ultima - self.inicio) * 1000
+
+    def informe(self):
+        datos = {etapa: round(ms, 1) for etapa, ms in self.etapas.items()}
+        datos["total"] = round(self.total(), 1)
+        print(PREFIJO + json.dumps(datos, ensure_ascii=False), file=sys.stderr, flush=True)
+        return datos
+
+
+_EJECUTAR_APP = """
+import sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_ms = (time.perf_counter() - inicio) * 1000
+AppTest.from_file(sys.argv[1], default_timeout=120).run()
+print("perfil_streamlit " + str(round(streamlit_ms, 1)), file=sys.stderr)
+"""
+
+
+def _importaciones(lineas):
+    """Tiempo acumulado (ms) de los módulos de primer nivel según -X importtime."""
+    tiempos = {}
+    for linea in lineas:
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, modulo = linea.split("|")
+        nombre = modulo.rstrip()
+        if nombre.startswith("  ") or not acumulado.strip().isdigit():
+            continue  # submódulo: ya está contado en su paquete
+        tiempos[nombre.strip()] = tiempos.get(nombre.strip(), 0) + int(acumulado) / 1000
+    return tiempos
+
+
+def medir(ruta_app="app.py", repeticiones=3):
+    """Arranques en frío de la app en procesos nuevos; devuelve (etapas, importaciones) por repetición."""
+    entorno = dict(os.environ, PERFIL_ARRANQUE="1")
+    etapas, importaciones = [], []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", _EJECUTAR_APP, ruta_app],
+                                 capture_output=True, text=True, env=entorno,
+                                 cwd=os.path.dirname(os.path.abspath(ruta_app)))
+        proceso_ms = (time.perf_counter() - inicio) * 1000
+        lineas = proceso.stderr.splitlines()
+        perfil = next((json.loads(linea[len(PREFIJO):]) for linea in lineas if linea.startswith(PREFIJO)), None)
+        if perfil is None:
+            raise RuntimeError("La app no escribió su perfil:\n" + proceso.stderr[-2000:])
+        streamlit_ms = next(float(linea.split()[1]) for linea in lineas if linea.startswith("perfil_streamlit "))
+        etapas.append({"streamlit": streamlit_ms, **perfil, "proceso": proceso_ms})
+        importaciones.append(_importaciones(lineas))
+    return etapas, importaciones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de arranque en frío de la app")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--modulos", type=int, default=10, help="Módulos más lentos a mostrar")
+    args = parser.parse_args(argv)
+
+    etapas, importaciones = medir(args.app, args.repeticiones)
+    print(f"Mediana de {args.repeticiones} arranques en frío (ms):")
+    for etapa in etapas[0]:
+        print(f"  {etapa:<12} {statistics.median(e[etapa] for e in etapas):8.1f}")
+    modulos = {m: statistics.median(i.get(m, 0.0) for i in importaciones) for m in importaciones[0]}
+    print("Importaciones más lentas (ms, acumulado):")
+    for modulo, ms in sorted(modulos.items(), key=lambda x: -x[1])[:args.modulos]:
+        print(f"  {modulo:<40} {ms:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
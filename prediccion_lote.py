@@ -0,0 +1,215 @@
+"""
+Predicción por lotes de escenarios de gasificación (sin Streamlit).
+
+Cada escenario es una fila con las columnas:
+    biomasa, humedad, temperatura, agente, ratio
+donde `biomasa` es un nombre de "Biomass residue" de biomass_compositions.xlsx
+y `agente` uno de los agentes de la app ("Aire", "Oxígeno", "Vapor de agua",
+"Mezcla O2 + H2O"). Si falta el `ratio` de un escenario, las fracciones del
+agente se rellenan con el imputador exportado junto al modelo (imputacion.py),
+con los mismos estadísticos por agente que en el entrenamiento. Con el dominio
+exportado junto al modelo (dominio.py) cada resultado lleva además su distancia
+al dominio de entrenamiento y si está fuera de él, para revisarlo aparte.
+
+Uso desde línea de comandos:
+    python prediccion_lote.py escenarios.csv resultados.csv
+    python prediccion_lote.py escenarios.parquet resultados.parquet --bloque 200000
+
+Los archivos se leen y escriben por bloques; Parquet necesita pyarrow.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from arbol_compilado import ArbolCompilado
+from cache import RUTA_MODELO, cargar_biomasa, cargar_dominio, cargar_imputador, cargar_predictor
+from calculos import (
+    COLUMNAS_MODELO, OBJETIVOS,
+    aplicacion_columnas, calcular_energia_syngas, columnas_biomasa, fracciones_agente_columnas,
+    lhv_columnas, rebalance_columnas, relacion_h2_co_columnas,
+)
+from imputacion import GRUPOS_APP
+
+COLUMNAS_ESCENARIO = ['biomasa', 'humedad', 'temperatura', 'agente', 'ratio']
+TAMANO_BLOQUE = 100_000
+# Argumento no indicado: se carga el del modelo por defecto (None significa "sin él")
+_POR_DEFECTO = object()
+
+
+def _indice_biomasa(df_biomasa, nombres):
+    catalogo = pd.Index(df_biomasa["Biomass residue"])
+    codigos = catalogo.get_indexer(nombres)
+    if (codigos < 0).any():
+        desconocidas = pd.unique(np.asarray(nombres)[codigos < 0])
+        raise ValueError(f"Biomasas no encontradas en la tabla: {list(desconocidas[:10])}")
+    return codigos
+
+
+def construir_entrada(escenarios, df_biomasa, imputador=None):
+    """Devuelve la matriz (n, 15) de entrada al modelo en el orden de COLUMNAS_MODELO."""
+    faltantes = [c for c in COLUMNAS_ESCENARIO if c not in escenarios.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en los escenarios: {faltantes}")
+
+    codigos = _indice_biomasa(df_biomasa, escenarios['biomasa'].to_numpy())
+    humedad = escenarios['humedad'].to_numpy(dtype=np.float64)
+
+    composicion, old_moisture = columnas_biomasa(df_biomasa)
+    composicion = {col: valores[codigos] for col, valores in composicion.items()}
+    fila = rebalance_columnas(composicion, humedad, old_moisture[codigos])
+    fracciones = fracciones_agente_columnas(escenarios['agente'].to_numpy(),
+                                            escenarios['ratio'].to_numpy(dtype=np.float64))
+    lhv = lhv_columnas(fila['C_norm'], fila['H_norm'], fila['O_norm'], fila['N_norm'],
+                       fila['S_norm'], fila['Ash [%] _norm'], humedad)
+
+    columnas = {
+        'Gasification temperature [°C]': escenarios['temperatura'].to_numpy(dtype=np.float64),
+        'O2_gasifying agent (wt/wt)': fracciones["O2"],
+        'N2_gasifying agent (wt/wt)': fracciones["N2"],
+        'Steam_gasifying agent (wt/wt)': fracciones["H2O"],
+        'Biomass Energy Content (LHV) [MJ/kg]': lhv,
+        **fila,
+    }
+    X = np.empty((len(escenarios), len(COLUMNAS_MODELO)), dtype=np.float64)
+    for j, col in enumerate(COLUMNAS_MODELO):
+        X[:, j] = columnas[col]
+    if imputador is not None:
+        agentes = escenarios['agente'].map(GRUPOS_APP).to_numpy()
+        imputador.completar(X, agentes)
+    return X
+
+
+def predecir_matriz(modelo, X):
+    if isinstance(modelo, ArbolCompilado):
+        return modelo.predict(X)
+    # El modelo de sklearn se ajustó con un DataFrame: se conservan los nombres para evitar avisos
+    return modelo.predict(pd.DataFrame(X, columns=COLUMNAS_MODELO, copy=False))
+
+
+def resumir_prediccion(prediccion):
+    h2, co, ch4 = prediccion[:, 0], prediccion[:, 1], prediccion[:, 2]
+    h2_co = relacion_h2_co_columnas(h2, co)
+    fuel_energy = calcular_energia_syngas(h2, co, ch4)
+    return pd.DataFrame({
+        OBJETIVOS[0]: h2,
+        OBJETIVOS[1]: co,
+        OBJETIVOS[2]: ch4,
+        'H2 to CO ratio': h2_co,
+        'Fuel gas energy content [MJ/Nm3]': fuel_energy,
+        'End-use application': aplicacion_columnas(h2_co, fuel_energy),
+    })
+
+
+def predecir_lote(escenarios, modelo=None, df_biomasa=None, imputador=None, dominio=None):
+    """Predice un DataFrame de escenarios con una sola llamada a `predict`."""
+    modelo = cargar_predictor() if modelo is None else modelo
+    df_biomasa = cargar_biomasa() if df_biomasa is None else df_biomasa
+    X = construir_entrada(escenarios, df_biomasa, imputador)
+    resultado = resumir_prediccion(predecir_matriz(modelo, X))
+    if dominio is not None:
+        marcas = dominio.evaluar(X)
+        resultado['Domain distance'] = marcas["distancia"]
+        resultado['Out of domain'] = marcas["fuera_dominio"]
+    resultado.index = escenarios.index
+    return pd.concat([escenarios[COLUMNAS_ESCENARIO], resultado], axis=1)
+
+
+def _es_parquet(ruta):
+    return os.path.splitext(ruta)[1].lower() in (".parquet", ".pq")
+
+
+def leer_bloques(ruta, tamano_bloque=TAMANO_BLOQUE):
+    if _es_parquet(ruta):
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(ruta)
+        for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=COLUMNAS_ESCENARIO):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(ruta, chunksize=tamano_bloque)
+
+
+class _EscritorBloques:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._parquet = _es_parquet(ruta)
+        self._escritor = None
+        self._primero = True
+
+    def escribir(self, df):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            tabla = pa.Table.from_pandas(df, preserve_index=False)
+            if self._escritor is None:
+                self._escritor = pq.ParquetWriter(self.ruta, tabla.schema)
+            self._escritor.write_table(tabla)
+        else:
+            df.to_csv(self.ruta, mode="w" if self._primero else "a", header=self._primero, index=False)
+        self._primero = False
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+
+
+def procesar_archivo(ruta_entrada, ruta_salida, modelo=None, df_biomasa=None,
+                     tamano_bloque=TAMANO_BLOQUE, imputador=_POR_DEFECTO, dominio=_POR_DEFECTO):
+    """
+    Lee escenarios por bloques, predice cada bloque y escribe el resultado en
+    streaming. Devuelve (filas, filas fuera de dominio). Sin `imputador` o
+    `dominio` se usan los del modelo por defecto; con None no se imputa (los
+    faltantes quedan NaN) o no se marca nada.
+    """
+    modelo = cargar_predictor() if modelo is None else modelo
+    df_biomasa = cargar_biomasa() if df_biomasa is None else df_biomasa
+    imputador = cargar_imputador() if imputador is _POR_DEFECTO else imputador
+    dominio = cargar_dominio() if dominio is _POR_DEFECTO else dominio
+    escritor = _EscritorBloques(ruta_salida)
+    n_filas = n_fuera = 0
+    try:
+        for bloque in leer_bloques(ruta_entrada, tamano_bloque):
+            resultado = predecir_lote(bloque, modelo, df_biomasa, imputador, dominio)
+            escritor.escribir(resultado)
+            n_filas += len(bloque)
+            if dominio is not None:
+                n_fuera += int(resultado['Out of domain'].sum())
+    finally:
+        escritor.cerrar()
+    return n_filas, n_fuera
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predicción por lotes de la composición del syngas")
+    parser.add_argument("entrada", help="CSV o Parquet con columnas " + ", ".join(COLUMNAS_ESCENARIO))
+    parser.add_argument("salida", help="CSV o Parquet de resultados")
+    parser.add_argument("--modelo", default=RUTA_MODELO)
+    parser.add_argument("--biomasa", default=None, help="Excel o esquema.json del almacén (por defecto el vigente)")
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE, help="Filas por bloque")
+    parser.add_argument("--imputacion", default=None,
+                        help="Imputador exportado por entrenamiento.py (por defecto, <modelo>_imputacion.json)")
+    parser.add_argument("--dominio", default=None,
+                        help="Dominio exportado por entrenamiento.py (por defecto, <modelo>_dominio.npz)")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    args.imputacion = args.imputacion or os.path.splitext(args.modelo)[0] + "_imputacion.json"
+    args.dominio = args.dominio or os.path.splitext(args.modelo)[0] + "_dominio.npz"
+    # Solo los del propio modelo: nunca los de otro entrenamiento
+    imputador = cargar_imputador(args.imputacion, args.modelo)
+    dominio = cargar_dominio(args.dominio, args.modelo)
+    if imputador is None:
+        print(f"Sin imputador para {args.modelo}: las fracciones faltantes del agente quedan sin rellenar")
+    n_filas, n_fuera = procesar_archivo(args.entrada, args.salida, cargar_predictor(args.modelo),
+                                        cargar_biomasa(args.biomasa), args.bloque, imputador, dominio)
+    duracion = time.perf_counter() - inicio
+    print(f"{n_filas} escenarios en {duracion:.2f} s ({n_filas / max(duracion, 1e-9):,.0f} escenarios/s)")
+    if dominio is not None:
+        print(f"{n_fuera} escenarios fuera del dominio de entrenamiento (columna 'Out of domain')")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Índice exacto de las regiones (hojas) del árbol de decisión.
+
+Cada hoja del árbol es una caja alineada con los ejes en el espacio de las 15
+variables de entrada: en cada nodo, `x <= umbral` va a la izquierda. El índice
+recorre el árbol una vez y guarda, por hoja, los límites (inferior, superior]
+de cada columna y la predicción. Las consultas ("¿qué intervalos de
+temperatura y ABR dan CH4 > 8 % con esta biomasa?") son una sola pasada
+vectorizada sobre las hojas, sin muestrear.
+
+Para una biomasa y un agente, cada columna del modelo es lineal en una sola
+variable de operación (temperatura, ratio o humedad; el LHV con su mínimo de
+3.5 MJ/kg), así que la caja de cada hoja se traduce en intervalos exactos de
+esas variables.
+
+    python regiones.py --biomasa "Corn straw" --agente Aire --humedad 10 --min CH4 8
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from arbol_compilado import HOJA, ArbolCompilado, BosqueCompilado
+from barrido import RANGOS_RATIO
+from cache import RUTA_MODELO, cargar_biomasa, cargar_predictor
+from calculos import (
+    COLUMNAS_MODELO, LHV_MINIMO, aplicacion_columnas, calcular_energia_syngas,
+    fracciones_agente_columnas, lhv_sin_minimo, rebalance_tabla, relacion_h2_co_columnas,
+)
+
+VARIABLES_OPERACION = ["Temperatura", "Ratio", "Humedad"]
+RANGOS_OPERACION = {"Temperatura": (600.0, 1000.0), "Humedad": (0.0, 30.0)}
+COLUMNA_LHV = COLUMNAS_MODELO.index('Biomass Energy Content (LHV) [MJ/kg]')
+
+
+class IndiceRegiones:
+    def __init__(self, inferior, superior, valores, hojas):
+        self.inferior = inferior  # (n_hojas, n_columnas), límite abierto
+        self.superior = superior  # (n_hojas, n_columnas), límite cerrado
+        self.valores = valores    # (n_hojas, 3): H2, CO, CH4
+        self.hojas = hojas        # índice del nodo de cada hoja en el árbol
+        h2, co, ch4 = valores[:, 0], valores[:, 1], valores[:, 2]
+        self.salidas = {
+            "H2": h2, "CO": co, "CH4": ch4,
+            "H2/CO": relacion_h2_co_columnas(h2, co),
+            "Energía": calcular_energia_syngas(h2, co, ch4),
+        }
+
+    @classmethod
+    def desde_arbol(cls, arbol):
+        """`arbol` es un ArbolCompilado o un DecisionTreeRegressor ajustado."""
+        if isinstance(arbol, BosqueCompilado) or hasattr(arbol, "estimators_"):
+            raise ValueError("El índice de regiones solo admite un árbol de decisión simple")
+        if not isinstance(arbol, ArbolCompilado):
+            arbol = ArbolCompilado.desde_sklearn(arbol)
+        n_columnas = arbol.n_features
+        inferior, superior, hojas = [], [], []
+        # Recorrido en profundidad con la caja acumulada de cada nodo
+        pila = [(0, np.full(n_columnas, -np.inf), np.full(n_columnas, np.inf))]
+        while pila:
+            nodo, bajo, alto = pila.pop()
+            if arbol.feature[nodo] == HOJA:
+                hojas.append(nodo)
+                inferior.append(bajo)
+                superior.append(alto)
+                continue
+            j, umbral = arbol.feature[nodo], arbol.threshold[nodo]
+            alto_izquierda = alto.copy()
+            alto_izquierda[j] = min(alto[j], umbral)
+            bajo_derecha = bajo.copy()
+            bajo_derecha[j] = max(bajo[j], umbral)
+            pila.append((arbol.right[nodo], bajo_derecha, alto))
+            pila.append((arbol.left[nodo], bajo, alto_izquierda))
+        hojas = np.array(hojas, dtype=np.intp)
+        return cls(np.array(inferior), np.array(superior), arbol.value[hojas], hojas)
+
+    def __len__(self):
+        return len(self.hojas)
+
+    def filtrar_salida(self, condiciones):
+        """Máscara de las hojas cuya predicción cumple `condiciones` (variable -> (mínimo, máximo), [mín, máx))."""
+        mascara = np.ones(len(self), dtype=bool)
+        for variable, (minimo, maximo) in (condiciones or {}).items():
+            v = self.salidas[variable]
+            if minimo is not None:
+                mascara &= v >= minimo
+            if maximo is not None:
+                mascara &= v < maximo
+        return mascara
+
+    def hoja_de(self, X):
+        """Índice (en el índice de regiones) de la caja que contiene cada fila de X."""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        dentro = (X[:, None, :] > self.inferior[None]) & (X[:, None, :] <= self.superior[None])
+        return dentro.all(axis=2).argmax(axis=1)
+
+
+# --- Traducción a variables de operación ---
+def coeficientes(fila_biomasa, agente):
+    """
+    Cada columna del modelo como a + b·v, con v su variable de operación.
+    Devuelve (variable, a, b): variable[j] es 0 (temperatura), 1 (ratio) o 2 (humedad).
+    El LHV se da sin su mínimo; se aplica aparte.
+    """
+    variable = np.empty(len(COLUMNAS_MODELO), dtype=np.intp)
+    a = np.zeros(len(COLUMNAS_MODELO))
+    b = np.zeros(len(COLUMNAS_MODELO))
+
+    fracciones = fracciones_agente_columnas(agente, 1.0)
+    # Composición a humedad 0 y 1: es lineal en la humedad
+    comp = {col: valores[0] for col, valores in rebalance_tabla(fila_biomasa, [0.0, 1.0]).items()}
+    lhv = lhv_sin_minimo(comp['C_norm'], comp['H_norm'], comp['O_norm'], comp['N_norm'],
+                         comp['S_norm'], comp['Ash [%] _norm'], np.array([0.0, 1.0]))
+    for j, col in enumerate(COLUMNAS_MODELO):
+        if col == 'Gasification temperature [°C]':
+            variable[j], b[j] = 0, 1.0
+        elif col in ('O2_gasifying agent (wt/wt)', 'N2_gasifying agent (wt/wt)', 'Steam_gasifying agent (wt/wt)'):
+            gas = {"O": "O2", "N": "N2", "S": "H2O"}[col[0]]
+            variable[j], b[j] = 1, float(fracciones[gas])
+        else:
+            serie = lhv if j == COLUMNA_LHV else comp[col]
+            variable[j], a[j], b[j] = 2, serie[0], serie[1] - serie[0]
+    return variable, a, b
+
+
+def _preimagen(a, b, bajo, alto, minimo=None):
+    """
+    Intervalo de v con bajo < max(minimo, a + b·v) <= alto, vectorizado sobre
+    las hojas. Devuelve (v_min, v_max); vacío si v_min >= v_max.
+    """
+    if minimo is not None:
+        # Con el mínimo: el límite inferior se cumple siempre si bajo < minimo,
+        # y el superior no se cumple nunca si alto < minimo
+        bajo = np.where(bajo < minimo, -np.inf, bajo)
+        alto = np.where(alto < minimo, np.nan, alto)
+    if b == 0:
+        dentro = (bajo < a) & (a <= alto)
+        return np.where(dentro, -np.inf, np.inf), np.where(dentro, np.inf, -np.inf)
+    with np.errstate(invalid="ignore"):
+        v1, v2 = (bajo - a) / b, (alto - a) / b
+        v_min, v_max = np.minimum(v1, v2), np.maximum(v1, v2)
+    vacio = np.isnan(alto)
+    return np.where(vacio, np.inf, v_min), np.where(vacio, -np.inf, v_max)
+
+
+def intervalos(indice, fila_biomasa, agente, condiciones=None, temperatura=None, ratio=None, humedad=None):
+    """
+    Regiones de operación de una biomasa y un agente que cumplen `condiciones`
+    sobre la salida. Las variables fijadas (temperatura, ratio, humedad) se
+    mantienen; las demás se devuelven como intervalos exactos dentro del rango
+    de la app. Una fila por hoja alcanzable.
+    """
+    variable, a, b = coeficientes(fila_biomasa, agente)
+    fijas = [temperatura, ratio, humedad]
+    rangos = [RANGOS_OPERACION["Temperatura"], RANGOS_RATIO[agente], RANGOS_OPERACION["Humedad"]]
+    mascara = indice.filtrar_salida(condiciones)
+    bajo, alto = indice.inferior[mascara], indice.superior[mascara]
+
+    v_min = [np.full(len(bajo), r[0] if f is None else f, dtype=np.float64) for r, f in zip(rangos, fijas)]
+    v_max = [np.full(len(bajo), r[1] if f is None else f, dtype=np.float64) for r, f in zip(rangos, fijas)]
+    valida = np.ones(len(bajo), dtype=bool)
+    for j in range(len(COLUMNAS_MODELO)):
+        k = variable[j]
+        minimo = LHV_MINIMO if j == COLUMNA_LHV else None
+        if fijas[k] is not None:
+            # Variable fija: se comprueba el valor de la columna directamente
+            x = a[j] + b[j] * fijas[k]
+            if minimo is not None:
+                x = max(minimo, x)
+            x = np.float64(np.float32(x))  # el árbol compara en float32
+            valida &= (bajo[:, j] < x) & (x <= alto[:, j])
+            continue
+        p_min, p_max = _preimagen(a[j], b[j], bajo[:, j], alto[:, j], minimo)
+        v_min[k] = np.maximum(v_min[k], p_min)
+        v_max[k] = np.minimum(v_max[k], p_max)
+    for k, fija in enumerate(fijas):
+        if fija is None:
+            valida &= v_min[k] < v_max[k]
+
+    filas = {}
+    for k, nombre in enumerate(VARIABLES_OPERACION):
+        filas[f"{nombre} min"] = v_min[k][valida]
+        filas[f"{nombre} max"] = v_max[k][valida]
+    for nombre, valores in indice.salidas.items():
+        filas[nombre] = valores[mascara][valida]
+    resultado = pd.DataFrame(filas)
+    resultado["Aplicación"] = aplicacion_columnas(resultado["H2/CO"].to_numpy(), resultado["Energía"].to_numpy())
+    return resultado.sort_values([f"{n} min" for n in VARIABLES_OPERACION], kind="stable").reset_index(drop=True)
+
+
+def _condicion(condiciones, variable, valor, posicion):
+    minimo, maximo = condiciones.get(variable, (None, None))
+    condiciones[variable] = (valor, maximo) if posicion == 0 else (minimo, valor)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Intervalos de operación exactos que cumplen una condición")
+    parser.add_argument("--biomasa", required=True)
+    parser.add_argument("--agente", choices=list(RANGOS_RATIO), required=True)
+    parser.add_argument("--temperatura", type=float, default=None, help="Fijar la temperatura")
+    parser.add_argument("--ratio", type=float, default=None, help="Fijar el ratio del agente")
+    parser.add_argument("--humedad", type=float, default=None, help="Fijar la humedad")
+    parser.add_argument("--min", nargs=2, action="append", default=[], metavar=("VARIABLE", "VALOR"))
+    parser.add_argument("--max", nargs=2, action="append", default=[], metavar=("VARIABLE", "VALOR"))
+    parser.add_argument("--modelo", default=RUTA_MODELO)
+    args = parser.parse_args(argv)
+
+    condiciones = {}
+    for variable, valor in args.min:
+        _condicion(condiciones, variable, float(valor), 0)
+    for variable, valor in args.max:
+        _condicion(condiciones, variable, float(valor), 1)
+    df_biomasa = cargar_biomasa()
+    fila = df_biomasa[df_biomasa["Biomass residue"] == args.biomasa]
+    if fila.empty:
+        raise SystemExit(f"Biomasa desconocida: {args.biomasa}")
+
+    indice = IndiceRegiones.desde_arbol(cargar_predictor(args.modelo))
+    resultado = intervalos(indice, fila, args.agente, condiciones, args.temperatura, args.ratio, args.humedad)
+    print(f"{len(resultado)} regiones de {len(indice)} hojas")
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(resultado.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
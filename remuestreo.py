@@ -0,0 +1,235 @@
+"""
+Motor de remuestreo (Bootstrap, KDE, SMOTE) por bloques.
+
+Cada estrategia se ajusta una vez por clase (`ajustado`): el bootstrap guarda
+las filas, el KDE gaussiano las filas y el ancho de banda, y SMOTE además la
+tabla de vecinos más cercanos. Los ajustes se reutilizan entre llamadas con
+los mismos datos. Las filas sintéticas se generan en bloques de tamaño fijo y
+se escriben en arrays preasignados, en memoria (`remuestrear`) o memory-mapped
+en disco con el formato de almacen.py (`remuestrear_a_disco`), así que el uso
+de memoria depende del tamaño del bloque y no del objetivo de sobremuestreo.
+
+    python remuestreo.py base_literatura base_kde --estrategia kde --objetivo 1000000
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from almacen import archivo_columna, cargar_columnas, escribir_esquema
+
+TAMANO_BLOQUE = 65_536
+ESTRATEGIAS = ("bootstrap", "kde", "smote")
+K_VECINOS = 5
+MAX_AJUSTES = 32
+
+
+class MuestreadorBootstrap:
+    def __init__(self, X):
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+
+    def muestrear(self, n, rng):
+        return self.X[rng.integers(0, len(self.X), n)]
+
+
+class MuestreadorKDE:
+    """Equivalente a KernelDensity(kernel='gaussian').sample: una fila al azar más ruido normal."""
+
+    def __init__(self, X, ancho_banda=0.5):
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+        self.ancho_banda = float(ancho_banda)
+
+    def muestrear(self, n, rng):
+        base = self.X[rng.integers(0, len(self.X), n)]
+        base += rng.normal(scale=self.ancho_banda, size=base.shape)
+        return base
+
+
+class MuestreadorSMOTE:
+    """Interpolación entre una fila y uno de sus k vecinos de la misma clase."""
+
+    def __init__(self, X, k_vecinos=K_VECINOS):
+        from sklearn.neighbors import NearestNeighbors
+
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+        k = min(k_vecinos, len(self.X) - 1)
+        if k > 0:
+            vecinos = NearestNeighbors(n_neighbors=k + 1).fit(self.X)
+            # La primera columna es la propia fila
+            self.vecinos = vecinos.kneighbors(self.X, return_distance=False)[:, 1:]
+        else:
+            self.vecinos = np.zeros((len(self.X), 0), dtype=np.intp)
+
+    def muestrear(self, n, rng):
+        i = rng.integers(0, len(self.X), n)
+        if self.vecinos.shape[1] == 0:
+            return self.X[i]  # una sola fila: no hay con quién interpolar
+        j = self.vecinos[i, rng.integers(0, self.vecinos.shape[1], n)]
+        origen = self.X[i]
+        origen += rng.random((n, 1)) * (self.X[j] - origen)
+        return origen
+
+
+MUESTREADORES = {"bootstrap": MuestreadorBootstrap, "kde": MuestreadorKDE, "smote": MuestreadorSMOTE}
+
+_ajustes = OrderedDict()
+
+
+def ajustado(estrategia, X, **parametros):
+    """Muestreador ajustado a `X`; se reutiliza si ya se ajustó con los mismos datos y parámetros."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    clave = (estrategia, X.shape, hashlib.sha256(X.tobytes()).hexdigest(), tuple(sorted(parametros.items())))
+    if clave in _ajustes:
+        _ajustes.move_to_end(clave)
+        return _ajustes[clave]
+    if estrategia not in MUESTREADORES:
+        raise ValueError(f"Estrategia de remuestreo desconocida: {estrategia}")
+    muestreador = MUESTREADORES[estrategia](X, **parametros)
+    _ajustes[clave] = muestreador
+    if len(_ajustes) > MAX_AJUSTES:
+        _ajustes.popitem(last=False)
+    return muestreador
+
+
+def filas_a_generar(y, objetivo=None):
+    """
+    Filas sintéticas por clase. Sin `objetivo` se igualan todas las clases a la
+    mayoritaria; con un entero, todas llegan a ese total; con un dict
+    clase -> total, solo las clases indicadas (como sampling_strategy de SMOTE).
+    """
+    clases, conteos = np.unique(np.asarray(y), return_counts=True)
+    actuales = dict(zip(clases.tolist(), conteos.tolist()))
+    if objetivo is None:
+        objetivo = max(actuales.values())
+    if not isinstance(objetivo, dict):
+        objetivo = dict.fromkeys(actuales, objetivo)
+    return {cls: int(total) - actuales[cls] for cls, total in objetivo.items()
+            if cls in actuales and total > actuales[cls]}
+
+
+def generar(X, y, estrategia, objetivo=None, bloque=TAMANO_BLOQUE, semilla=42, **parametros):
+    """
+    Produce pares (X_bloque, clases) por bloques: primero las filas originales y
+    luego las sintéticas de cada clase. `X` puede ser un array memory-mapped.
+    """
+    y = np.asarray(y)
+    for inicio in range(0, len(X), bloque):
+        yield np.asarray(X[inicio:inicio + bloque], dtype=np.float64), y[inicio:inicio + bloque]
+
+    rng = np.random.default_rng(semilla)
+    for cls, n in filas_a_generar(y, objetivo).items():
+        muestreador = ajustado(estrategia, X[y == cls], **parametros)
+        for inicio in range(0, n, bloque):
+            yield muestreador.muestrear(min(bloque, n - inicio), rng), cls
+
+
+def generar_rango(muestreador, inicio, fin, semilla, bloque=TAMANO_BLOQUE):
+    """
+    Filas sintéticas [inicio, fin) de una secuencia fija: cada bloque tiene su
+    propia semilla, así que pedir más filas extiende la secuencia sin cambiar
+    las ya generadas (lo usa el reentrenamiento incremental).
+    """
+    partes = []
+    for b in range(inicio // bloque, -(-fin // bloque)):
+        filas = muestreador.muestrear(bloque, np.random.default_rng([semilla, b]))
+        partes.append(filas[max(inicio - b * bloque, 0):min(fin - b * bloque, bloque)])
+    if not partes:
+        return np.empty((0, muestreador.X.shape[1]), dtype=np.float64)
+    return np.concatenate(partes)
+
+
+def _total(y, objetivo):
+    return len(y) + sum(filas_a_generar(y, objetivo).values())
+
+
+def remuestrear(X, y, estrategia, objetivo=None, bloque=TAMANO_BLOQUE, semilla=42, **parametros):
+    """Versión en memoria: devuelve (X, y) remuestreados en arrays preasignados."""
+    y = np.asarray(y)
+    n = _total(y, objetivo)
+    X_salida = np.empty((n, X.shape[1]), dtype=np.float64)
+    y_salida = np.empty(n, dtype=y.dtype)
+    fila = 0
+    for X_bloque, clases in generar(X, y, estrategia, objetivo, bloque, semilla, **parametros):
+        X_salida[fila:fila + len(X_bloque)] = X_bloque
+        y_salida[fila:fila + len(X_bloque)] = clases
+        fila += len(X_bloque)
+    return X_salida, y_salida
+
+
+def remuestrear_a_disco(columnas, clase, directorio, estrategia, objetivo=None, bloque=TAMANO_BLOQUE,
+                        semilla=42, **parametros):
+    """
+    `columnas` es un dict nombre -> array 1-D (p. ej. de almacen.cargar_columnas)
+    con las variables numéricas y la columna `clase`. El resultado se escribe en
+    `directorio` como tabla del almacén.
+    """
+    y = np.asarray(columnas[clase]).astype(str)
+    numericas = [nombre for nombre in columnas if nombre != clase]
+    n = _total(y, objetivo)
+
+    os.makedirs(directorio, exist_ok=True)
+    salidas, meta = [], []
+    for i, nombre in enumerate(numericas + [clase]):
+        dtype = np.float64 if nombre != clase else y.dtype
+        archivo = archivo_columna(i)
+        salidas.append(np.lib.format.open_memmap(os.path.join(directorio, archivo), mode="w+",
+                                                 dtype=dtype, shape=(n,)))
+        meta.append({"nombre": nombre, "archivo": archivo, "dtype": "float64" if nombre != clase else "str"})
+
+    # Las filas originales se leen por bloques, sin apilar toda la tabla
+    X = _VistaColumnas([columnas[nombre] for nombre in numericas])
+    fila = 0
+    for X_bloque, clases in generar(X, y, estrategia, objetivo, bloque, semilla, **parametros):
+        for j, salida in enumerate(salidas[:-1]):
+            salida[fila:fila + len(X_bloque)] = X_bloque[:, j]
+        salidas[-1][fila:fila + len(X_bloque)] = clases
+        fila += len(X_bloque)
+    for salida in salidas:
+        salida.flush()
+    del salidas
+    return escribir_esquema(directorio, meta, n)
+
+
+class _VistaColumnas:
+    """Columnas separadas vistas como matriz (n, d) solo al indexar un trozo."""
+
+    def __init__(self, columnas):
+        self.columnas = columnas
+        self.shape = (len(columnas[0]), len(columnas))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, filas):
+        return np.column_stack([np.asarray(col[filas], dtype=np.float64) for col in self.columnas])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remuestreo por bloques de una tabla del almacén")
+    parser.add_argument("entrada", help="Directorio de la tabla (almacen.py)")
+    parser.add_argument("salida")
+    parser.add_argument("--estrategia", choices=ESTRATEGIAS, default="bootstrap")
+    parser.add_argument("--clase", default="End-use application")
+    parser.add_argument("--objetivo", type=int, default=None, help="Filas por clase (por defecto, la mayoritaria)")
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--ancho-banda", type=float, default=0.5, help="Solo KDE")
+    args = parser.parse_args(argv)
+
+    columnas = cargar_columnas(args.entrada)
+    # Solo columnas numéricas además de la clase
+    columnas = {nombre: valores for nombre, valores in columnas.items()
+                if nombre == args.clase or valores.dtype.kind in "biuf"}
+    parametros = {"ancho_banda": args.ancho_banda} if args.estrategia == "kde" else {}
+    inicio = time.perf_counter()
+    meta = remuestrear_a_disco(columnas, args.clase, args.salida, args.estrategia, args.objetivo,
+                               args.bloque, args.semilla, **parametros)
+    print(f"{args.entrada} -> {args.salida}: {meta['n_filas']} filas en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
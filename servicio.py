@@ -0,0 +1,274 @@
+"""
+Servicio HTTP/JSON de predicción con micro-lotes (solo biblioteca estándar).
+
+Expone el mismo flujo que la app (rebalance de humedad, LHV, predicción y
+aplicación sugerida) para otros sistemas. El modelo y la tabla de biomasas se
+cargan una vez al arrancar. Las peticiones concurrentes se acumulan en una
+cola y se predicen juntas con una sola llamada a `predict`: un lote se cierra
+al llegar a `max_lote` escenarios o al pasar `espera_ms` desde la primera
+petición del lote.
+
+    python servicio.py --puerto 8000 --max-lote 256 --espera-ms 5
+
+Rutas:
+    POST /predecir   un escenario {"biomasa", "humedad", "temperatura", "agente", "ratio"}
+                     o una lista de escenarios; la respuesta tiene la misma forma
+    GET  /salud      estado del servicio y estadísticas de los lotes
+
+Si junto al modelo está su dominio de entrenamiento (dominio.py), cada
+resultado incluye "Domain distance" y "Out of domain".
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import pandas as pd
+
+from cache import RUTA_MODELO, cargar_biomasa, cargar_dominio, cargar_predictor
+from calculos import AGENTES, COLUMNAS_MODELO
+from prediccion_lote import COLUMNAS_ESCENARIO, construir_entrada, predecir_matriz, resumir_prediccion
+
+MAX_LOTE = 256
+ESPERA_MS = 5.0
+MAX_CUERPO = 10 * 1024 * 1024
+COLUMNA_LHV = COLUMNAS_MODELO.index('Biomass Energy Content (LHV) [MJ/kg]')
+
+
+def validar_escenario(escenario, biomasas):
+    """Comprueba un escenario recibido y lo devuelve con los números como float."""
+    if not isinstance(escenario, dict):
+        raise ValueError("Cada escenario debe ser un objeto JSON")
+    faltantes = [c for c in COLUMNAS_ESCENARIO if c not in escenario]
+    if faltantes:
+        raise ValueError(f"Faltan campos: {faltantes}")
+    for campo in ("biomasa", "agente"):
+        if not isinstance(escenario[campo], str):
+            raise ValueError(f"'{campo}' debe ser un texto")
+    if escenario["biomasa"] not in biomasas:
+        raise ValueError(f"Biomasa desconocida: {escenario['biomasa']}")
+    if escenario["agente"] not in AGENTES:
+        raise ValueError(f"Agente desconocido: {escenario['agente']} (opciones: {AGENTES})")
+    limpio = {"biomasa": escenario["biomasa"], "agente": escenario["agente"]}
+    for campo in ("humedad", "temperatura", "ratio"):
+        valor = escenario[campo]
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            raise ValueError(f"'{campo}' debe ser un número")
+        try:
+            # Un entero JSON enorme no cabe en un float (OverflowError)
+            valor = float(valor)
+        except (OverflowError, TypeError):
+            raise ValueError(f"'{campo}' debe ser un número") from None
+        if not math.isfinite(valor):
+            raise ValueError(f"'{campo}' debe ser un número")
+        limpio[campo] = valor
+    return limpio
+
+
+class Agrupador:
+    """Junta las peticiones concurrentes en lotes y predice cada lote de una vez."""
+
+    def __init__(self, modelo, df_biomasa, max_lote=MAX_LOTE, espera_ms=ESPERA_MS, dominio=None):
+        self.modelo = modelo
+        self.df_biomasa = df_biomasa
+        self.dominio = dominio
+        self.biomasas = frozenset(df_biomasa["Biomass residue"])
+        self.max_lote = max_lote
+        self.espera = espera_ms / 1000
+        self.lotes = 0
+        self.escenarios = 0
+        self.fuera_dominio = 0
+        self._cola = asyncio.Queue()
+        # Un solo hilo: el bucle sigue aceptando peticiones mientras se predice un lote
+        self._hilo = ThreadPoolExecutor(max_workers=1)
+
+    async def predecir(self, escenarios):
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((escenarios, futuro))
+        return await futuro
+
+    async def _siguiente_lote(self):
+        loop = asyncio.get_running_loop()
+        pendientes = [await self._cola.get()]
+        n = len(pendientes[0][0])
+        limite = loop.time() + self.espera
+        while n < self.max_lote:
+            if self._cola.empty():
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    pendientes.append(await asyncio.wait_for(self._cola.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                pendientes.append(self._cola.get_nowait())
+            n += len(pendientes[-1][0])
+        return pendientes
+
+    def _predecir(self, filas):
+        escenarios = pd.DataFrame(filas, columns=COLUMNAS_ESCENARIO)
+        X = construir_entrada(escenarios, self.df_biomasa)
+        resultado = resumir_prediccion(predecir_matriz(self.modelo, X))
+        resultado.insert(0, 'Biomass Energy Content (LHV) [MJ/kg]', X[:, COLUMNA_LHV])
+        if self.dominio is not None:
+            marcas = self.dominio.evaluar(X)
+            resultado['Domain distance'] = marcas["distancia"]
+            resultado['Out of domain'] = marcas["fuera_dominio"]
+            self.fuera_dominio += int(marcas["fuera_dominio"].sum())
+        return pd.concat([escenarios, resultado], axis=1).to_dict("records")
+
+    async def ejecutar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pendientes = await self._siguiente_lote()
+            filas = [escenario for escenarios, _ in pendientes for escenario in escenarios]
+            try:
+                resultados = await loop.run_in_executor(self._hilo, self._predecir, filas)
+            except Exception as error:
+                for _, futuro in pendientes:
+                    if not futuro.done():
+                        futuro.set_exception(error)
+                continue
+            self.lotes += 1
+            self.escenarios += len(filas)
+            inicio = 0
+            for escenarios, futuro in pendientes:
+                # La conexión puede haberse cerrado mientras tanto
+                if not futuro.done():
+                    futuro.set_result(resultados[inicio:inicio + len(escenarios)])
+                inicio += len(escenarios)
+
+    def estadisticas(self):
+        return {
+            "lotes": self.lotes,
+            "escenarios": self.escenarios,
+            "lote_medio": self.escenarios / self.lotes if self.lotes else 0.0,
+            "fuera_dominio": self.fuera_dominio,
+            "dominio": self.dominio is not None,
+            "en_cola": self._cola.qsize(),
+            "max_lote": self.max_lote,
+            "espera_ms": self.espera * 1000,
+        }
+
+
+async def _leer_peticion(reader):
+    """Devuelve (método, ruta, cabeceras, cuerpo) o None si el cliente cerró la conexión."""
+    linea = await reader.readline()
+    if not linea.strip():
+        return None
+    metodo, ruta, version = linea.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    cabeceras = {"_version": version}
+    while True:
+        linea = await reader.readline()
+        if linea in (b"\r\n", b"\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        cabeceras[nombre.strip().lower()] = valor.strip()
+    longitud = int(cabeceras.get("content-length", 0))
+    if longitud > MAX_CUERPO:
+        raise ValueError("Cuerpo demasiado grande")
+    cuerpo = await reader.readexactly(longitud) if longitud else b""
+    return metodo, ruta.split("?", 1)[0], cabeceras, cuerpo
+
+
+def _respuesta(estado, datos, mantener):
+    cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+    cabecera = (f"HTTP/1.1 {estado.value} {estado.phrase}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(cuerpo)}\r\n"
+                f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n")
+    return cabecera.encode("latin-1") + cuerpo
+
+
+async def _atender(agrupador, metodo, ruta, cuerpo):
+    if ruta == "/salud":
+        if metodo != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use GET"}
+        return HTTPStatus.OK, {"estado": "ok", **agrupador.estadisticas()}
+    if ruta != "/predecir":
+        return HTTPStatus.NOT_FOUND, {"error": f"Ruta desconocida: {ruta}"}
+    if metodo != "POST":
+        return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST"}
+
+    try:
+        datos = json.loads(cuerpo)
+        varios = isinstance(datos, list)
+        escenarios = [validar_escenario(e, agrupador.biomasas) for e in (datos if varios else [datos])]
+    except ValueError as error:  # incluye JSONDecodeError
+        return HTTPStatus.BAD_REQUEST, {"error": str(error)}
+    if not escenarios:
+        return HTTPStatus.OK, []
+    try:
+        resultados = await agrupador.predecir(escenarios)
+    except Exception as error:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)}
+    return HTTPStatus.OK, resultados if varios else resultados[0]
+
+
+async def _conexion(agrupador, reader, writer):
+    try:
+        while True:
+            try:
+                peticion = await _leer_peticion(reader)
+            except (ValueError, asyncio.IncompleteReadError) as error:
+                writer.write(_respuesta(HTTPStatus.BAD_REQUEST, {"error": str(error) or "Petición incompleta"}, False))
+                break
+            if peticion is None:
+                break
+            metodo, ruta, cabeceras, cuerpo = peticion
+            conexion = cabeceras.get("connection", "").lower()
+            mantener = conexion != "close" and (cabeceras["_version"] != "HTTP/1.0" or conexion == "keep-alive")
+            estado, datos = await _atender(agrupador, metodo, ruta, cuerpo)
+            writer.write(_respuesta(estado, datos, mantener))
+            await writer.drain()
+            if not mantener:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def servir(host="127.0.0.1", puerto=8000, modelo=None, df_biomasa=None,
+                 max_lote=MAX_LOTE, espera_ms=ESPERA_MS, dominio=None):
+    modelo = cargar_predictor() if modelo is None else modelo
+    df_biomasa = cargar_biomasa() if df_biomasa is None else df_biomasa
+    agrupador = Agrupador(modelo, df_biomasa, max_lote, espera_ms, dominio)
+    tarea = asyncio.create_task(agrupador.ejecutar())
+    servidor = await asyncio.start_server(lambda r, w: _conexion(agrupador, r, w), host, puerto)
+    print(f"Sirviendo en http://{host}:{puerto} (max_lote={max_lote}, espera={espera_ms} ms)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        tarea.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP de predicción con micro-lotes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--max-lote", type=int, default=MAX_LOTE, help="Escenarios máximos por lote")
+    parser.add_argument("--espera-ms", type=float, default=ESPERA_MS,
+                        help="Espera máxima para completar un lote")
+    parser.add_argument("--modelo", default=RUTA_MODELO)
+    parser.add_argument("--dominio", default=None,
+                        help="Dominio exportado por entrenamiento.py (por defecto, <modelo>_dominio.npz)")
+    parser.add_argument("--biomasa", default=None, help="Excel o esquema.json del almacén (por defecto el vigente)")
+    args = parser.parse_args(argv)
+    args.dominio = args.dominio or os.path.splitext(args.modelo)[0] + "_dominio.npz"
+
+    try:
+        asyncio.run(servir(args.host, args.puerto, cargar_predictor(args.modelo), cargar_biomasa(args.biomasa),
+                           args.max_lote, args.espera_ms, cargar_dominio(args.dominio, args.modelo)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Tabla precalculada con la predicción de todas las combinaciones de la app.
+
+La app solo ofrece un espacio finito de entradas: las biomasas de
+biomass_compositions.xlsx, humedad 0–30 % en pasos de 0.1, temperatura
+600–1000 °C en pasos de 10 y tres ratios por agente. Este módulo evalúa todas
+esas combinaciones una sola vez y guarda, para cada una, el índice de la hoja
+del árbol (uint8/uint16/uint32) en un .npy que se abre memory-mapped; la predicción
+en la app pasa a ser una búsqueda O(1) por coordenadas discretas.
+
+    python tabla_precalculada.py              # construir
+    python tabla_precalculada.py --verificar  # comparar contra el modelo
+
+Los archivos se escriben en tabla_precalculada/ (hojas.npy, valores.npy,
+meta.json).
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from arbol_compilado import ArbolCompilado, BosqueCompilado
+from barrido import malla_entrada
+from cache import (
+    RUTA_MODELO, CacheArchivo, cargar_biomasa, cargar_predictor, hash_archivo, ruta_biomasa,
+)
+from prediccion_lote import predecir_lote
+
+DIRECTORIO_TABLA = "tabla_precalculada"
+
+# Mismo espacio de entradas que los controles de app.py
+HUMEDADES = np.round(np.arange(0, 301) / 10, 1)
+TEMPERATURAS = np.arange(600, 1001, 10)
+RATIOS = {
+    "Aire": np.round(np.linspace(0.14, 0.30, num=3), 2),
+    "Oxígeno": np.round(np.linspace(0.2, 0.4, num=3), 2),
+    "Vapor de agua": np.round(np.linspace(0.84, 1.1, num=3), 2),
+}
+AGENTES_APP = list(RATIOS)
+
+
+def comprobar_arbol(modelo):
+    # Cada celda guarda una hoja: bosques y boosting no tienen una sola hoja por entrada
+    if isinstance(modelo, BosqueCompilado) or not (isinstance(modelo, ArbolCompilado) or hasattr(modelo, "tree_")):
+        raise ValueError(f"La tabla precalculada solo admite un árbol de decisión simple "
+                         f"(el modelo es {type(modelo).__name__})")
+
+
+def construir(modelo, df_biomasa, directorio=DIRECTORIO_TABLA, hash_modelo="", hash_biomasa=""):
+    comprobar_arbol(modelo)
+    if not isinstance(modelo, ArbolCompilado):
+        modelo = ArbolCompilado.desde_sklearn(modelo, hash_modelo)
+    n_ratios = len(RATIOS[AGENTES_APP[0]])
+    # El tipo más pequeño que alcanza para todos los nodos
+    dtype = next(t for t in (np.uint8, np.uint16, np.uint32) if len(modelo.value) <= np.iinfo(t).max + 1)
+    forma = (len(df_biomasa), len(HUMEDADES), len(TEMPERATURAS), len(AGENTES_APP) * n_ratios)
+
+    os.makedirs(directorio, exist_ok=True)
+    hojas = np.lib.format.open_memmap(os.path.join(directorio, "hojas.npy"), mode="w+",
+                                      dtype=dtype, shape=forma)
+    for i in range(len(df_biomasa)):
+        fila = df_biomasa.iloc[[i]]
+        for a, agente in enumerate(AGENTES_APP):
+            X = malla_entrada(fila, agente, TEMPERATURAS, RATIOS[agente], HUMEDADES)
+            bloque = modelo.hojas(X).reshape(len(HUMEDADES), len(TEMPERATURAS), n_ratios)
+            hojas[i, :, :, a * n_ratios:(a + 1) * n_ratios] = bloque
+    hojas.flush()
+    del hojas
+    np.save(os.path.join(directorio, "valores.npy"), modelo.value)
+
+    meta = {
+        "biomasas": df_biomasa["Biomass residue"].tolist(),
+        "humedad": {"inicio": 0.0, "paso": 0.1, "n": len(HUMEDADES)},
+        "temperatura": {"inicio": int(TEMPERATURAS[0]), "paso": 10, "n": len(TEMPERATURAS)},
+        "ratios": {agente: valores.tolist() for agente, valores in RATIOS.items()},
+        "hash_modelo": hash_modelo or modelo.origen_sha256,
+        "hash_biomasa": hash_biomasa,
+    }
+    with open(os.path.join(directorio, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return forma
+
+
+class TablaPrecalculada:
+    def __init__(self, directorio=DIRECTORIO_TABLA):
+        with open(os.path.join(directorio, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.hojas = np.load(os.path.join(directorio, "hojas.npy"), mmap_mode="r")
+        self.valores = np.load(os.path.join(directorio, "valores.npy"))
+        self._biomasas = {nombre: i for i, nombre in enumerate(self.meta["biomasas"])}
+        # (agente, ratio redondeado) -> última coordenada de la tabla
+        self._ratios = {}
+        for a, (agente, valores) in enumerate(self.meta["ratios"].items()):
+            for r, valor in enumerate(valores):
+                self._ratios[agente, round(valor, 6)] = a * len(valores) + r
+
+    def vigente(self, hash_modelo, hash_biomasa):
+        return self.meta["hash_modelo"] == hash_modelo and self.meta["hash_biomasa"] == hash_biomasa
+
+    def coordenadas(self, biomasa, humedad, temperatura, agente, ratio):
+        """Índices discretos de la combinación, o None si no está en la tabla."""
+        i = self._biomasas.get(biomasa)
+        r = self._ratios.get((agente, round(float(ratio), 6)))
+        if i is None or r is None:
+            return None
+        h = self.meta["humedad"]
+        k = int(round((humedad - h["inicio"]) / h["paso"]))
+        t = self.meta["temperatura"]
+        j = int(round((temperatura - t["inicio"]) / t["paso"]))
+        if not (0 <= k < h["n"] and abs(h["inicio"] + k * h["paso"] - humedad) < 1e-6):
+            return None
+        if not (0 <= j < t["n"] and t["inicio"] + j * t["paso"] == temperatura):
+            return None
+        return i, k, j, r
+
+    def buscar(self, biomasa, humedad, temperatura, agente, ratio):
+        """Predicción (H2, CO, CH4) de la tabla, o None si la combinación no está."""
+        coordenadas = self.coordenadas(biomasa, humedad, temperatura, agente, ratio)
+        if coordenadas is None:
+            return None
+        return self.valores[self.hojas[coordenadas]]
+
+
+cache_tablas_precalculadas = CacheArchivo(
+    lambda ruta: TablaPrecalculada(os.path.dirname(ruta)))
+
+
+def cargar_tabla(directorio=DIRECTORIO_TABLA, ruta_modelo=RUTA_MODELO, ruta_tabla_biomasa=None):
+    """Tabla vigente para el modelo y la biomasa actuales, o None."""
+    try:
+        tabla = cache_tablas_precalculadas.obtener(os.path.join(directorio, "meta.json"))
+        if tabla.vigente(hash_archivo(ruta_modelo), hash_archivo(ruta_tabla_biomasa or ruta_biomasa())):
+            return tabla
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    return None
+
+
+def verificar(tabla, modelo, df_biomasa, n_muestras=20_000, semilla=0):
+    """Compara combinaciones al azar de la tabla contra el modelo; devuelve el nº de diferencias."""
+    rng = np.random.default_rng(semilla)
+    agentes = rng.choice(AGENTES_APP, n_muestras)
+    escenarios = {
+        "biomasa": rng.choice(df_biomasa["Biomass residue"].to_numpy(), n_muestras),
+        "humedad": rng.choice(HUMEDADES, n_muestras),
+        "temperatura": rng.choice(TEMPERATURAS, n_muestras),
+        "agente": agentes,
+        "ratio": [rng.choice(RATIOS[a]) for a in agentes],
+    }
+    escenarios = pd.DataFrame(escenarios)
+    esperado = predecir_lote(escenarios, modelo, df_biomasa)[["H2_dry", "CO_dry", "CH4_dry"]].to_numpy()
+    obtenido = np.array([tabla.buscar(*fila) for fila in escenarios.itertuples(index=False)])
+    return int((~np.isclose(esperado, obtenido, rtol=0, atol=1e-9).all(axis=1)).sum())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tabla precalculada de predicciones de la app")
+    parser.add_argument("--modelo", default=RUTA_MODELO)
+    parser.add_argument("--biomasa", default=None, help="Excel o esquema.json del almacén (por defecto el vigente)")
+    parser.add_argument("--directorio", default=DIRECTORIO_TABLA)
+    parser.add_argument("--verificar", action="store_true", help="Comparar la tabla existente contra el modelo")
+    args = parser.parse_args(argv)
+
+    modelo = cargar_predictor(args.modelo)
+    try:
+        comprobar_arbol(modelo)
+    except ValueError as error:
+        parser.error(str(error))
+    args.biomasa = args.biomasa or ruta_biomasa()
+    df_biomasa = cargar_biomasa(args.biomasa)
+    if args.verificar:
+        tabla = TablaPrecalculada(args.directorio)
+        diferencias = verificar(tabla, modelo, df_biomasa)
+        print(f"{diferencias} combinaciones difieren del modelo")
+        raise SystemExit(1 if diferencias else 0)
+
+    inicio = time.perf_counter()
+    forma = construir(modelo, df_biomasa, args.directorio,
+                      hash_archivo(args.modelo), hash_archivo(args.biomasa))
+    print(f"{int(np.prod(forma))} combinaciones {forma} en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()